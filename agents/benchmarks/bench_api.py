@@ -0,0 +1,364 @@
+"""
+FastAPI uygulamasının uçtan uca kıyaslaması (sahte LLM ile).
+
+Uygulama süreç içinde (ASGI üzerinden) sürülür; LLM çağrıları
+LLM_PROVIDER=fake ile çevrimdışı, belirlenimci sağlayıcıya gider. Böylece
+ölçümler ağdan ve API kotasından bağımsız, sürümler arasında karşılaştırılabilir
+olur. Senaryolar:
+
+    latency:     3, 10 ve 50 düğümlü zincirlerde tek yürütmenin gecikmesi
+    throughput:  1 - 500 eşzamanlı yürütmede istek/sn ve gecikme
+    plan:        Plan derleme ve doğrulamanın graf boyutuyla ölçeklenmesi
+    crud:        İş akışı CRUD uç noktalarının depo boyutuyla ölçeklenmesi
+
+Her satır bir JSON nesnesidir (p50/p95/p99 ms, istek/sn, en yüksek RSS).
+
+Kullanım (agents/ klasöründen):
+    python -m benchmarks.bench_api
+    python -m benchmarks.bench_api --scenarios latency throughput --latency-ms 20
+    python -m benchmarks.bench_api --output sonuclar.jsonl
+"""
+
+from typing import Dict, List, Any, Awaitable, Callable, Optional
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import sys
+import time
+
+from benchmarks.bench_sort import build_chain
+
+SCENARIOS = ("latency", "throughput", "plan", "crud")
+DEFAULT_CHAIN_SIZES = [3, 10, 50]
+DEFAULT_CONCURRENCY = [1, 10, 50, 100, 500]
+DEFAULT_GRAPH_SIZES = [10, 100, 1000, 10000]
+DEFAULT_STORE_SIZES = [100, 1000, 10000]
+
+# Kıyaslama ortamı: sahte sağlayıcı, sınırsız kota, önbelleksiz LLM çağrıları
+BENCH_ENV = {
+    "LLM_PROVIDER": "fake",
+    "LLM_RPM": "1000000000",
+    "LLM_TPM": "1000000000000",
+    "LLM_CACHE_ENABLED": "false",
+    "STORAGE_BACKEND": "memory",
+    "FAKE_LLM_SEED": "0",
+}
+
+
+def percentiles(timings: List[float]) -> Dict[str, float]:
+    """Süre listesinin (saniye) p50/p95/p99 değerlerini ms olarak döndürür."""
+    ordered = sorted(timings)
+
+    def rank(p: float) -> float:
+        index = min(len(ordered) - 1, max(0, int(round(p * len(ordered))) - 1))
+        return ordered[index] * 1000
+
+    return {
+        "count": len(ordered),
+        "p50_ms": rank(0.50),
+        "p95_ms": rank(0.95),
+        "p99_ms": rank(0.99),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def peak_rss_mb() -> float:
+    """Sürecin şimdiye kadarki en yüksek bellek kullanımı (MB)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux kilobayt, macOS bayt cinsinden döndürür
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def chain_workflow(size: int, agent_id: str) -> Dict[str, Any]:
+    """START -> ajan x (size - 2) -> END zincirinin iş akışı gövdesi."""
+    nodes, edges = build_chain(max(size, 3))
+    for node in nodes:
+        if node["id"] not in ("START", "END"):
+            node["data"]["agentId"] = agent_id
+    return {
+        "name": f"bench-chain-{size}",
+        "description": "Kıyaslama zinciri",
+        "nodes": nodes,
+        "edges": edges,
+    }
+
+
+async def timed(
+    calls: int, concurrency: int, call: Callable[[int], Awaitable[Any]]
+) -> Dict[str, Any]:
+    """
+    `call(i)` çağrılarını en fazla `concurrency` eşzamanlı olarak yürütür.
+
+    Returns:
+        Gecikme yüzdelikleri, istek/sn ve hata sayısı
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    timings: List[float] = []
+    errors = 0
+
+    async def run(index: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await call(index)
+            except Exception:
+                errors += 1
+                return
+            timings.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run(index) for index in range(calls)))
+    elapsed = time.perf_counter() - started
+    return {
+        **(percentiles(timings) if timings else {"count": 0}),
+        "errors": errors,
+        "rps": calls / elapsed if elapsed else 0.0,
+        "elapsed_s": elapsed,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+class ApiBench:
+    """Uygulamayı ASGI taşıyıcısıyla süren kıyaslama oturumu."""
+
+    def __init__(self, app, db):
+        import httpx
+
+        self.app = app
+        self.db = db
+        self.client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://bench",
+            timeout=None,
+        )
+
+    async def request(self, method: str, path: str, **kwargs) -> Any:
+        response = await self.client.request(method, path, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    def agent_id(self) -> str:
+        for agent in self.db.agents:
+            if agent.get("type") != "system":
+                return agent["id"]
+        raise RuntimeError("Kıyaslama için GPT ajanı bulunamadı")
+
+    async def create_chain(self, size: int) -> str:
+        workflow = await self.request(
+            "POST", "/workflows", json=chain_workflow(size, self.agent_id())
+        )
+        return workflow["id"]
+
+    async def execute(self, workflow_id: str, index: int) -> None:
+        result = await self.request(
+            "POST",
+            f"/workflows/{workflow_id}/execute",
+            # Her yürütme farklı girdi alır; birleştirme (coalescing) ölçümü bozmasın
+            json={"input_text": f"Kıyaslama konusu {index}"},
+        )
+        if result["status"] != "success":
+            raise RuntimeError("İş akışı başarısız")
+
+    async def latency(self, sizes: List[int], runs: int) -> List[Dict[str, Any]]:
+        rows = []
+        for size in sizes:
+            workflow_id = await self.create_chain(size)
+            stats = await timed(runs, 1, lambda i: self.execute(workflow_id, i))
+            rows.append({"benchmark": "latency", "nodes": size, **stats})
+        return rows
+
+    async def throughput(
+        self, levels: List[int], size: int, runs_per_level: int
+    ) -> List[Dict[str, Any]]:
+        workflow_id = await self.create_chain(size)
+        rows = []
+        for concurrency in levels:
+            calls = max(concurrency * runs_per_level, runs_per_level)
+            stats = await timed(
+                calls, concurrency, lambda i: self.execute(workflow_id, i)
+            )
+            rows.append(
+                {
+                    "benchmark": "throughput",
+                    "nodes": size,
+                    "concurrency": concurrency,
+                    **stats,
+                }
+            )
+        return rows
+
+    async def crud(self, sizes: List[int], calls: int) -> List[Dict[str, Any]]:
+        rows = []
+        body = chain_workflow(3, self.agent_id())
+        for size in sizes:
+            # Depo doğrudan doldurulur; yalnızca uç noktaların maliyeti ölçülür
+            for workflow in list(self.db.workflows):
+                self.db.workflows.delete(workflow["id"])
+            now = time.time()
+            self.db.workflows.add_many(
+                {
+                    **body,
+                    "id": f"bench-{index}",
+                    "user_id": f"user-{index % 100}",
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for index in range(size)
+            )
+            created: List[str] = []
+
+            async def create(index: int) -> None:
+                created.append(
+                    (await self.request("POST", "/workflows", json=body))["id"]
+                )
+
+            operations = {
+                "create": create,
+                "get": lambda i: self.request("GET", f"/workflows/bench-{i % size}"),
+                "list_user": lambda i: self.request(
+                    "GET", "/workflows", params={"user_id": f"user-{i % 100}"}
+                ),
+                "delete": lambda i: self.request("DELETE", f"/workflows/{created[i]}"),
+            }
+            for operation, call in operations.items():
+                stats = await timed(calls, 1, call)
+                rows.append(
+                    {
+                        "benchmark": "crud",
+                        "operation": operation,
+                        "store_size": size,
+                        **stats,
+                    }
+                )
+        return rows
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def plan_scaling(sizes: List[int], min_time: float) -> List[Dict[str, Any]]:
+    """
+    Plan derlemenin ve doğrulamalı yürütme planının graf boyutuyla ölçeklenmesi.
+
+    `compile` yalnızca topolojik sıralamayı (eski sort_workflow_nodes),
+    `validate` ise ajan çözümleme ve yapı doğrulaması dahil tüm derlemeyi ölçer.
+    """
+    from benchmarks.bench_sort import measure
+    from src.plan import compile_execution_plan, compile_workflow_plan
+
+    def execution_plan(nodes, edges):
+        workflow = {"id": "bench", "nodes": nodes, "edges": edges}
+        compile_execution_plan(workflow, lambda agent_id: {"id": agent_id})
+
+    rows = []
+    for size in sizes:
+        nodes, edges = build_chain(max(size, 2))
+        rows.append(
+            {
+                "benchmark": "plan",
+                "nodes": len(nodes),
+                "compile": measure(compile_workflow_plan, nodes, edges, min_time),
+                "validate": measure(execution_plan, nodes, edges, min_time),
+                "peak_rss_mb": peak_rss_mb(),
+            }
+        )
+    return rows
+
+
+async def run_api_scenarios(args) -> List[Dict[str, Any]]:
+    import main as api
+
+    app = api.create_app()
+    rows: List[Dict[str, Any]] = []
+    async with app.router.lifespan_context(app):
+        bench = ApiBench(app, api.get_db())
+        try:
+            if "latency" in args.scenarios:
+                rows += await bench.latency(args.chain_sizes, args.runs)
+            if "throughput" in args.scenarios:
+                rows += await bench.throughput(
+                    args.concurrency, args.throughput_nodes, args.runs_per_level
+                )
+            if "crud" in args.scenarios:
+                rows += await bench.crud(args.store_sizes, args.runs)
+        finally:
+            await bench.close()
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS)
+    )
+    parser.add_argument(
+        "--chain-sizes", type=int, nargs="+", default=DEFAULT_CHAIN_SIZES
+    )
+    parser.add_argument(
+        "--concurrency", type=int, nargs="+", default=DEFAULT_CONCURRENCY
+    )
+    parser.add_argument(
+        "--graph-sizes", type=int, nargs="+", default=DEFAULT_GRAPH_SIZES
+    )
+    parser.add_argument(
+        "--store-sizes", type=int, nargs="+", default=DEFAULT_STORE_SIZES
+    )
+    parser.add_argument("--runs", type=int, default=30, help="Senaryo başına ölçüm")
+    parser.add_argument(
+        "--runs-per-level",
+        type=int,
+        default=4,
+        help="Eşzamanlılık düzeyi başına yürütme sayısı (x eşzamanlılık)",
+    )
+    parser.add_argument("--throughput-nodes", type=int, default=3)
+    parser.add_argument(
+        "--latency-ms", type=float, default=20, help="Sahte LLM gecikmesi"
+    )
+    parser.add_argument(
+        "--tokens-per-sec",
+        type=float,
+        default=2000,
+        help="Sahte LLM üretim hızı (0: bekleme yok)",
+    )
+    parser.add_argument("--min-time", type=float, default=0.5)
+    parser.add_argument("--output", help="Sonuçların ekleneceği JSONL dosyası")
+    args = parser.parse_args()
+
+    # Ortam, uygulama içe aktarılmadan önce ayarlanmalı
+    for name, value in BENCH_ENV.items():
+        os.environ.setdefault(name, value)
+    os.environ.setdefault("FAKE_LLM_LATENCY_MS", str(args.latency_ms))
+    os.environ.setdefault("FAKE_LLM_TOKENS_PER_SEC", str(args.tokens_per_sec))
+    for name in ("agent-workflow", "httpx"):
+        logging.getLogger(name).setLevel(logging.ERROR)
+
+    rows: List[Dict[str, Any]] = []
+    if "plan" in args.scenarios:
+        rows += plan_scaling(args.graph_sizes, args.min_time)
+    if set(args.scenarios) - {"plan"}:
+        rows += asyncio.run(run_api_scenarios(args))
+
+    meta = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "fake_latency_ms": float(os.environ["FAKE_LLM_LATENCY_MS"]),
+        "fake_tokens_per_sec": float(os.environ["FAKE_LLM_TOKENS_PER_SEC"]),
+    }
+    output: Optional[Any] = open(args.output, "a") if args.output else None
+    try:
+        for row in rows:
+            line = json.dumps({**row, **meta})
+            print(line, flush=True)
+            if output:
+                output.write(line + "\n")
+    finally:
+        if output:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Soğuk açılış (import) süresi bütçe kontrolü.
+
+`main` modülünü her seferinde yeni bir Python sürecinde içe aktarır ve
+süreyi ölçer. Medyan süre bütçeyi aşarsa sıfırdan farklı kodla çıkar; CI'da
+açılışı yavaşlatan bir içe aktarma (ör. modül düzeyinde SDK yükleme, istemci
+ya da depo oluşturma) eklendiğinde yakalamak için kullanılır. Sonuç tek
+satırlık bir JSON nesnesi olarak yazdırılır.
+
+Kullanım (agents/ klasöründen):
+    python -m benchmarks.bench_import
+    python -m benchmarks.bench_import --budget-ms 600 --runs 7 --top 10
+"""
+
+from typing import Dict, List, Any, Tuple
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Varsayılan bütçe (ms); IMPORT_BUDGET_MS ile değiştirilebilir
+DEFAULT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1000"))
+
+# İçe aktarıldığında yüklenmemesi gereken (ilk kullanımda yüklenen) modüller
+LAZY_MODULES = ("openai", "httpx", "src.fake_llm", "src.sqlite_store")
+
+_PROBE = (
+    "import sys, time\n"
+    "started = time.perf_counter()\n"
+    "import {module}\n"
+    "elapsed = time.perf_counter() - started\n"
+    "print(elapsed, ','.join(m for m in {lazy!r} if m in sys.modules))\n"
+)
+
+
+def _clean_env() -> Dict[str, str]:
+    env = dict(os.environ)
+    # Ölçüm sırasında log çıktısı süreyi etkilemesin
+    env.setdefault("LOG_LEVEL", "WARNING")
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    return env
+
+
+def measure_import(module: str) -> Tuple[float, float, List[str]]:
+    """
+    Modülü yeni bir süreçte içe aktarır.
+
+    Returns:
+        (süreç süresi ms, yalnızca import süresi ms, yüklenmiş tembel modüller)
+    """
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(module=module, lazy=LAZY_MODULES)],
+        capture_output=True,
+        text=True,
+        env=_clean_env(),
+        check=True,
+    )
+    process_ms = (time.perf_counter() - started) * 1000
+    elapsed, loaded = completed.stdout.strip().splitlines()[-1].partition(" ")[::2]
+    return process_ms, float(elapsed) * 1000, [m for m in loaded.split(",") if m]
+
+
+def slowest_imports(module: str, top: int) -> List[Dict[str, Any]]:
+    """`-X importtime` çıktısından en yavaş kümülatif içe aktarmaları döndürür."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=_clean_env(),
+        check=True,
+    )
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        rows.append({"module": name.strip(), "cumulative_ms": int(cumulative) / 1000})
+    rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+    return rows[:top]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=0)
+    args = parser.parse_args()
+
+    # İlk süreç dosya önbelleğini ısıtır; ölçüme katılmaz
+    measure_import(args.module)
+    samples = [measure_import(args.module) for _ in range(max(1, args.runs))]
+    import_ms = statistics.median(sample[1] for sample in samples)
+    loaded = sorted({name for sample in samples for name in sample[2]})
+
+    result: Dict[str, Any] = {
+        "benchmark": "import",
+        "module": args.module,
+        "runs": len(samples),
+        "import_ms": round(import_ms, 1),
+        "process_ms": round(statistics.median(sample[0] for sample in samples), 1),
+        "budget_ms": args.budget_ms,
+        "eager_lazy_modules": loaded,
+        "ok": import_ms <= args.budget_ms and not loaded,
+    }
+    if args.top:
+        result["slowest"] = slowest_imports(args.module, args.top)
+    print(json.dumps(result, ensure_ascii=False))
+    sys.exit(0 if result["ok"] else 1)
+
+
+if __name__ == "__main__":
+    main()
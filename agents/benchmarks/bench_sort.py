@@ -0,0 +1,141 @@
+"""
+sort_workflow_nodes mikro kıyaslaması.
+
+Kahn algoritmasına dayalı `compile_workflow_plan` ile eski liste tabanlı
+sıralamayı 10 - 10.000 düğümlü graflarda karşılaştırır. Sonuçlar satır başına
+bir JSON nesnesi olarak yazdırılır.
+
+Kullanım (agents/ klasöründen):
+    python -m benchmarks.bench_sort
+    python -m benchmarks.bench_sort --sizes 10 100 1000 --legacy-limit 2000
+"""
+
+from typing import Dict, List, Any, Tuple
+import argparse
+import json
+import logging
+import random
+import time
+
+from src.plan import compile_workflow_plan
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+
+
+def legacy_sort_workflow_nodes(
+    nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """Karşılaştırma için eski O(N²·E) sıralama (loglama olmadan)."""
+    sorted_nodes = nodes.copy()
+    if not sorted_nodes:
+        return []
+
+    start_node_index = None
+    for i, node in enumerate(sorted_nodes):
+        if node["data"]["label"] == "START":
+            start_node_index = i
+            break
+
+    if start_node_index is not None:
+        start_node = sorted_nodes.pop(start_node_index)
+        sorted_nodes.insert(0, start_node)
+
+    edge_map = {}
+    for edge in edges:
+        edge_map.setdefault(edge["source"], []).append(edge["target"])
+
+    if start_node_index is not None:
+        visited = set([sorted_nodes[0]["id"]])
+        i = 0
+        while i < len(sorted_nodes):
+            current_node_id = sorted_nodes[i]["id"]
+            if current_node_id in edge_map:
+                for target_id in edge_map[current_node_id]:
+                    target_index = None
+                    for j, node in enumerate(sorted_nodes):
+                        if node["id"] == target_id and target_id not in visited:
+                            target_index = j
+                            break
+                    if target_index is not None:
+                        target_node = sorted_nodes.pop(target_index)
+                        sorted_nodes.insert(i + 1, target_node)
+                        visited.add(target_id)
+            i += 1
+
+    # Eski sürüm her çağrıda tüm etiket dizisini birleştirip logluyordu
+    " -> ".join([node["data"]["label"] for node in sorted_nodes])
+    return sorted_nodes
+
+
+def build_chain(
+    size: int, seed: int = 0
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """START -> n1 -> ... -> END zinciri üretir; düğüm listesi karıştırılır."""
+    ids = ["START"] + [f"n{i}" for i in range(size - 2)] + ["END"]
+    nodes = [
+        {
+            "id": node_id,
+            "type": "agentNode",
+            "position": {"x": 0, "y": 0},
+            "data": {"label": node_id, "agentId": node_id},
+        }
+        for node_id in ids
+    ]
+    edges = [
+        {"id": f"e{i}", "source": ids[i], "target": ids[i + 1]}
+        for i in range(len(ids) - 1)
+    ]
+    random.Random(seed).shuffle(nodes)
+    return nodes, edges
+
+
+def measure(fn, nodes, edges, min_time: float) -> Dict[str, float]:
+    """Fonksiyonu en az `min_time` saniye boyunca çalıştırıp süreleri ölçer."""
+    timings = []
+    deadline = time.perf_counter() + min_time
+    while True:
+        started = time.perf_counter()
+        fn(nodes, edges)
+        timings.append(time.perf_counter() - started)
+        if time.perf_counter() >= deadline and len(timings) >= 3:
+            break
+    timings.sort()
+    return {
+        "runs": len(timings),
+        "best_ms": timings[0] * 1000,
+        "median_ms": timings[len(timings) // 2] * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument(
+        "--legacy-limit",
+        type=int,
+        default=5000,
+        help="Bu boyutun üzerindeki graflarda eski sıralama ölçülmez",
+    )
+    parser.add_argument("--min-time", type=float, default=0.5)
+    args = parser.parse_args()
+
+    logging.getLogger("agent-workflow").setLevel(logging.ERROR)
+
+    for size in args.sizes:
+        nodes, edges = build_chain(max(size, 2))
+        row = {
+            "benchmark": "sort_workflow_nodes",
+            "nodes": len(nodes),
+            "edges": len(edges),
+            "plan": measure(compile_workflow_plan, nodes, edges, args.min_time),
+        }
+        if size <= args.legacy_limit:
+            row["legacy"] = measure(
+                legacy_sort_workflow_nodes, nodes, edges, args.min_time
+            )
+            row["speedup"] = row["legacy"]["median_ms"] / row["plan"]["median_ms"]
+        print(json.dumps(row), flush=True)
+
+
+if __name__ == "__main__":
+    main()
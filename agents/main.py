@@ -1,52 +1,157 @@
-from fastapi import FastAPI, HTTPException, Body, status
+from fastapi import (
+    APIRouter,
+    FastAPI,
+    HTTPException,
+    Body,
+    File,
+    Header,
+    UploadFile,
+    status,
+)
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, Any, Optional
+from typing import TYPE_CHECKING, Dict, List, Any, Optional
+from contextlib import asynccontextmanager
+import argparse
+import tempfile
+import threading
 import uuid
 from datetime import datetime
 import os
-import openai
 import json
 from dotenv import load_dotenv
 
 # Modüler yapı için diğer modülleri import et
-from src.utils import (
-    load_environment,
-    initialize_openai_client,
-    logger,
-)
+from src.utils import load_environment, logger
 from src.models import (
     WorkflowBase,
     Agent,
     WorkflowExecutionResult,
     WorkflowExecuteRequest,
+    WorkflowJob,
+    WorkflowBatchRequest,
+    AgentBatchFileRequest,
 )
-from src.agents import get_default_agents, process_with_agent
-from src.workflow import execute_workflow_pipeline
-
-# Çevresel değişkenler
-load_environment()
-load_dotenv()  # Agent creation için ek dotenv yükleme
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
-openai_client = initialize_openai_client()
-
-# FastAPI uygulaması
-app = FastAPI(title="AI Agent Creation & Workflow API", version="2.0.0")
-
-# CORS ayarları - her iki uygulama için gerekli origin'leri dahil et
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*", "http://localhost:3001", "http://127.0.0.1:3001"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+from src.agents import (
+    build_agent_request,
+    seed_default_agents,
+    process_with_agent_async,
+)
+from src.workflow import execute_workflow_pipeline_async
+from src.plan import PlanCache
+from src.llm import (
+    acomplete,
+    bypass_llm_cache,
+    close_llm_clients,
+    evict_llm_response,
+    get_async_client,
+    get_coalescing_stats,
+    get_llm_cache,
+    get_pool_stats,
+    llm_api_key,
+    stream_llm_tokens,
+)
+from src.storage import create_store
+from src.jobs import JobManager
+from src.batch import batch_items, batch_items_from_jsonl, run_batch
+from src.llm_batch import BatchFileBuilder, fetch_batch_results, submit_batch_file
+from src.ratelimit import Priority, get_llm_scheduler, llm_priority
+from src.context import ContextBudget
+from src.streaming import SSE_HEADERS, EventEmitter, sse_event_stream
+from src.json_stream import JSONObjectStream
+from src.metrics import METRICS_CONTENT_TYPE, MetricsMiddleware, render_metrics
+
+if TYPE_CHECKING:
+    import openai
+
+# Uygulama sürümü
+API_TITLE = "AI Agent Creation & Workflow API"
+API_VERSION = "2.0.0"
+
+# Paylaşılan kaynaklar ilk kullanımda oluşturulur; modülü içe aktarmak
+# ortam dosyası okumaz, istemci ya da depo açmaz.
+_resources_lock = threading.Lock()
+_environment_loaded = False
+_db = None
+_plan_cache: Optional[PlanCache] = None
+_jobs: Optional[JobManager] = None
+
+
+def _ensure_environment() -> None:
+    """Çevresel değişkenleri .env dosyasından bir kez yükler."""
+    global _environment_loaded
+    if not _environment_loaded:
+        load_environment()
+        load_dotenv()  # Agent creation için ek dotenv yükleme
+        _environment_loaded = True
+
+
+def get_db():
+    """
+    Veritabanını döndürür; ilk çağrıda oluşturur ve eksik varsayılan ajanları ekler.
+
+    Varsayılan olarak bellek içi, STORAGE_BACKEND=sqlite ile kalıcıdır.
+    """
+    global _db
+    if _db is None:
+        with _resources_lock:
+            if _db is None:
+                _ensure_environment()
+                db = create_store()
+                # Kalıcı depoda yeniden tohumlama yapılmaz
+                seed_default_agents(db)
+                _db = db
+    return _db
+
+
+def get_plan_cache() -> PlanCache:
+    """
+    İş akışı sürümüne göre derlenmiş yürütme planlarının önbelleğini döndürür.
+
+    Depo işçi süreçleri arasında paylaşılıyorsa ajan değişiklikleri diğer
+    süreçlerin önbelleklerine depodaki nesil sayacıyla bildirilir.
+    """
+    global _plan_cache
+    if _plan_cache is None:
+        db = get_db()
+        with _resources_lock:
+            if _plan_cache is None:
+                _plan_cache = PlanCache(state=db.state if db.shared else None)
+    return _plan_cache
+
+
+def get_jobs() -> JobManager:
+    """Uzun süren yürütmeler için arka plan iş kuyruğunu döndürür."""
+    global _jobs
+    if _jobs is None:
+        db = get_db()
+        with _resources_lock:
+            if _jobs is None:
+                _jobs = JobManager(db, _run_job)
+    return _jobs
+
+
+def openai_api_key() -> str:
+    """Yapılandırılmış API anahtarını döndürür (.env dosyası yüklendikten sonra)."""
+    _ensure_environment()
+    return llm_api_key()
+
+
+def resolve_agent(agent_id: str) -> Optional[Dict[str, Any]]:
+    """Plan derleme sırasında ajanı kimliğine göre bulur."""
+    return get_db().agents.get(agent_id)
+
+
+# Ajan yapılandırmasında zorunlu metin alanları
+AGENT_CONFIG_TEXT_FIELDS = (
+    "agent_name",
+    "agent_description",
+    "system_prompt",
+    "query_prompt",
+    "reasoning",
 )
-
-# In-memory veritabanı
-DB = {"workflows": [], "agents": []}
-
-# Başlangıçta örnek ajanları ekle
-DB["agents"] = get_default_agents()
 
 
 # Agent creation için yeni Pydantic modelleri
@@ -54,6 +159,7 @@ class AgentCreationRequest(BaseModel):
     description: str
     temperature: Optional[float] = 0.7
     max_tokens: Optional[int] = 2000
+    bypass_cache: bool = False
 
 
 class ToolSelection(BaseModel):
@@ -85,6 +191,7 @@ class ConversationRequest(BaseModel):
     query_prompt: str
     temperature: Optional[float] = 0.7
     max_tokens: Optional[int] = 1000
+    bypass_cache: bool = False
 
 
 class ConversationResponse(BaseModel):
@@ -95,8 +202,12 @@ class ConversationResponse(BaseModel):
 
 # Agent Creator Class
 class AgentCreator:
-    def __init__(self, client: openai.OpenAI):
+    def __init__(self, client: "openai.AsyncOpenAI"):
         self.client = client
+        self.output_format = os.getenv(
+            "AGENT_CONFIG_RESPONSE_FORMAT", "json_object"
+        ).lower()
+        self.repair_retries = int(os.getenv("AGENT_CONFIG_REPAIR_RETRIES", "1"))
         self.available_tools = {
             "tool1": "General purpose tool for basic operations",
             "webSearch": "Web search capability for finding information online",
@@ -141,76 +252,242 @@ Requirements:
 6. Agent name should be professional and descriptive
 """
 
-    def generate_agent_config(
-        self, user_description: str, temperature: float = 0.7, max_tokens: int = 2000
+    def response_format(self) -> Optional[Dict[str, Any]]:
+        """
+        Sağlayıcıdan istenen yanıt biçimi.
+
+        AGENT_CONFIG_RESPONSE_FORMAT: `json_object` (JSON modu, varsayılan),
+        `json_schema` (şemaya bağlı yapılandırılmış çıktı) ya da `off`.
+        """
+        if self.output_format == "json_object":
+            return {"type": "json_object"}
+        if self.output_format == "json_schema":
+            tools = {name: {"type": "boolean"} for name in self.available_tools}
+            properties: Dict[str, Any] = {
+                field: {"type": "string"} for field in AGENT_CONFIG_TEXT_FIELDS
+            }
+            properties["selected_tools"] = {
+                "type": "object",
+                "properties": tools,
+                "required": list(tools),
+                "additionalProperties": False,
+            }
+            return {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "agent_configuration",
+                    "strict": True,
+                    "schema": {
+                        "type": "object",
+                        "properties": properties,
+                        "required": list(properties),
+                        "additionalProperties": False,
+                    },
+                },
+            }
+        return None
+
+    def validate_config(self, config: Dict[str, Any]) -> None:
+        """Zorunlu alanları denetler; eksik ya da hatalı tipte alan varsa ValueError."""
+        problems = [
+            field
+            for field in AGENT_CONFIG_TEXT_FIELDS
+            if not isinstance(config.get(field), str)
+        ]
+        if not isinstance(config.get("selected_tools"), dict):
+            problems.append("selected_tools")
+        if problems:
+            raise ValueError(f"Missing or invalid fields: {', '.join(problems)}")
+
+    async def generate_agent_config(
+        self,
+        user_description: str,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        bypass_cache: bool = False,
+        on_event: Optional[EventEmitter] = None,
     ) -> Dict[str, Any]:
-        """Generate agent configuration using GPT-4.1-mini"""
-        try:
-            prompt = self.create_agent_prompt(user_description)
-
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",  # Using gpt-4o-mini as it's the available model
-                messages=[
+        """
+        Generate agent configuration using GPT-4.1-mini.
+
+        The completion is streamed through an incremental JSON parser, so
+        output that cannot become a valid object stops the generation early.
+        Invalid output is sent back to the model for a bounded number of
+        repair attempts (AGENT_CONFIG_REPAIR_RETRIES).
+
+        Args:
+            user_description: What the agent should do
+            temperature: Sampling temperature
+            max_tokens: Completion token limit per attempt
+            bypass_cache: Skip the LLM response cache
+            on_event: Optional emitter for `field_delta` (text of a top-level
+                string field as it is generated), `field` (a completed
+                top-level field) and `retry` events
+
+        Returns:
+            The parsed agent configuration
+        """
+        emit = on_event or (lambda event, data: None)
+        messages = [
+            {
+                "role": "system",
+                "content": "You are an expert AI agent configuration generator. Always respond with valid JSON.",
+            },
+            {"role": "user", "content": self.create_agent_prompt(user_description)},
+        ]
+        params: Dict[str, Any] = {
+            "model": "gpt-4o-mini",  # Using gpt-4o-mini as it's the available model
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+        response_format = self.response_format()
+        if response_format is not None:
+            params["response_format"] = response_format
+
+        attempt = 0
+        while True:
+            parser = JSONObjectStream(
+                on_delta=lambda field, delta: emit(
+                    "field_delta", {"field": field, "delta": delta}
+                ),
+                on_field=lambda field, value: emit(
+                    "field", {"field": field, "value": value}
+                ),
+            )
+            try:
+                with stream_llm_tokens(parser.feed):
+                    await acomplete(
+                        self.client,
+                        messages=messages,
+                        bypass_cache=bypass_cache,
+                        **params,
+                    )
+                config = parser.result()
+                self.validate_config(config)
+                return config
+            except ValueError as e:
+                # Tamamlanıp önbelleğe yazılmış bozuk yanıt sonraki özdeş
+                # isteklerde tekrar dönmesin
+                await evict_llm_response(messages=messages, **params)
+                # MalformedJSONError dahil; bozuk çıktı en fazla N kez düzelttirilir
+                if attempt >= self.repair_retries:
+                    raise HTTPException(
+                        status_code=500, detail=f"Error parsing JSON response: {e}"
+                    )
+                attempt += 1
+                logger.warning(
+                    "Ajan yapılandırması geçersiz, düzeltme denemesi %d: %s",
+                    attempt,
+                    e,
+                )
+                emit("retry", {"attempt": attempt, "error": str(e)})
+                messages = messages[:2] + [
+                    {"role": "assistant", "content": parser.text},
                     {
-                        "role": "system",
-                        "content": "You are an expert AI agent configuration generator. Always respond with valid JSON.",
+                        "role": "user",
+                        "content": f"Your previous response could not be used: {e}. "
+                        "Reply with only the complete JSON object in the requested "
+                        "structure, with no other text.",
                     },
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=temperature,
-                max_tokens=max_tokens,
-            )
+                ]
+            except Exception as e:
+                raise HTTPException(
+                    status_code=500, detail=f"Error generating agent config: {str(e)}"
+                )
 
-            # Parse the JSON response
-            config_text = response.choices[0].message.content.strip()
 
-            # Remove markdown code blocks if present
-            if config_text.startswith("```json"):
-                config_text = config_text[7:]
-            if config_text.endswith("```"):
-                config_text = config_text[:-3]
+# OpenAI client için yardımcı fonksiyon
+def get_openai_client() -> "openai.AsyncOpenAI":
+    """Paylaşılan, bağlantı havuzlu asenkron OpenAI istemcisini döndürür."""
+    _ensure_environment()
+    client = get_async_client()
+    if client is None:
+        raise HTTPException(status_code=500, detail="OpenAI API key not configured")
+    return client
 
-            config = json.loads(config_text.strip())
-            return config
 
-        except json.JSONDecodeError as e:
-            raise HTTPException(
-                status_code=500, detail=f"Error parsing JSON response: {str(e)}"
-            )
-        except Exception as e:
-            raise HTTPException(
-                status_code=500, detail=f"Error generating agent config: {str(e)}"
-            )
+_agent_creator: Optional[AgentCreator] = None
 
 
-# OpenAI client için yardımcı fonksiyon
-def get_openai_client():
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise HTTPException(status_code=500, detail="OpenAI API key not configured")
-    return openai.OpenAI(api_key=api_key)
+def get_agent_creator() -> AgentCreator:
+    """Paylaşılan istemciyi kullanan tek AgentCreator örneğini döndürür."""
+    global _agent_creator
+    client = get_openai_client()
+    if _agent_creator is None or _agent_creator.client is not client:
+        _agent_creator = AgentCreator(client)
+    return _agent_creator
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Uygulama ömrünü yönetir.
+
+    Açılışta depoyu hazırlar, iş işçilerini başlatıp kalıcı kuyruğu geri
+    yükler; kapanışta işçileri, paylaşılan LLM bağlantılarını ve depoyu kapatır.
+    """
+    await get_jobs().start()
+    try:
+        yield
+    finally:
+        await close_resources()
+
+
+async def close_resources() -> None:
+    """Oluşturulmuş paylaşılan kaynakları kapatır; sonraki kullanımda yeniden açılır."""
+    global _db, _plan_cache, _jobs, _agent_creator
+    with _resources_lock:
+        db, jobs = _db, _jobs
+        _db = _plan_cache = _jobs = _agent_creator = None
+    if jobs is not None:
+        await jobs.stop()
+    await close_llm_clients()
+    if db is not None:
+        db.close()
+
+
+# Tüm endpoint'ler bu router'a eklenir; uygulama `create_app` ile kurulur
+router = APIRouter()
 
 
 # Root endpoint'ler
-@app.get("/")
+@router.get("/")
 async def root():
-    return {"message": "AI Agent Creation & Workflow API", "version": "2.0.0"}
+    return {"message": API_TITLE, "version": API_VERSION}
 
 
-@app.get("/health")
+@router.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "ai-agent-creation-workflow-api"}
 
 
+@router.get("/metrics/llm")
+async def llm_metrics():
+    """LLM bağlantı havuzu ve yanıt önbelleği istatistiklerini döndürür."""
+    cache = get_llm_cache()
+    return {
+        **get_pool_stats(),
+        "cache": cache.stats() if cache else {"enabled": False},
+        "coalescing": get_coalescing_stats(),
+        "rate_limits": get_llm_scheduler().stats(),
+    }
+
+
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Yürütme, LLM ve HTTP ölçümlerini Prometheus metin biçiminde döndürür."""
+    return PlainTextResponse(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
 # Ajan endpoint'leri
-@app.get("/agents")
-async def get_agents():
+@router.get("/agents")
+def get_agents():
     """Tüm ajanları listeler."""
-    return DB["agents"]
+    return get_db().agents.all()
 
 
-@app.post("/agents")
-async def create_agent(agent: Agent):
+@router.post("/agents")
+def create_agent(agent: Agent):
     """Yeni bir ajan oluşturur."""
     # Use provided ID if available, otherwise generate new one
     agent_id = getattr(agent, "id", None) or str(uuid.uuid4())
@@ -222,70 +499,124 @@ async def create_agent(agent: Agent):
         "created_at": datetime.utcnow(),
     }
 
-    DB["agents"].append(new_agent)
-    logger.info(f"Yeni ajan oluşturuldu: {agent.name}")
+    get_db().agents.add(new_agent)
+    get_plan_cache().invalidate_agent(agent_id)
+    logger.info("Yeni ajan oluşturuldu: %s", agent.name)
 
     return new_agent
 
 
-@app.get("/agents/{agent_id}")
-async def get_agent(agent_id: str):
+@router.get("/agents/{agent_id}")
+def get_agent(agent_id: str):
     """Belirli bir ajanın detaylarını getirir."""
-    for agent in DB["agents"]:
-        if agent["id"] == agent_id:
-            return agent
+    agent = get_db().agents.get(agent_id)
+    if agent:
+        return agent
 
     raise HTTPException(status_code=404, detail="Ajan bulunamadı")
 
 
-@app.delete("/agents/{agent_id}")
-async def delete_agent(agent_id: str):
+@router.delete("/agents/{agent_id}")
+def delete_agent(agent_id: str):
     """Bir ajanı siler."""
-    for i, agent in enumerate(DB["agents"]):
-        if agent["id"] == agent_id:
-            del DB["agents"][i]
-            logger.info(f"Ajan silindi: {agent['name']}")
-            return {"message": "Ajan başarıyla silindi"}
+    agent = get_db().agents.delete(agent_id)
+    if agent:
+        get_plan_cache().invalidate_agent(agent_id)
+        logger.info("Ajan silindi: %s", agent["name"])
+        return {"message": "Ajan başarıyla silindi"}
 
     raise HTTPException(status_code=404, detail="Ajan bulunamadı")
 
 
+@router.post("/agents/{agent_id}/batch-file")
+async def build_agent_batch_file(agent_id: str, request: AgentBatchFileRequest):
+    """
+    Ajanın girdiler üzerindeki çağrıları için toplu API dosyası oluşturur.
+
+    Gecikmenin önemsiz olduğu toplu işlerde istekler sağlayıcının toplu
+    API'sine daha düşük maliyetle gönderilebilir. Özdeş istekler tek satıra
+    indirgenir; `manifest` her girdinin `custom_id` değerini verir. `submit`
+    seçilirse dosya sağlayıcıya gönderilir.
+    """
+    agent = await run_in_threadpool(get_db().agents.get, agent_id)
+    if not agent:
+        raise HTTPException(status_code=404, detail="Ajan bulunamadı")
+    if agent.get("type") == "system":
+        raise HTTPException(
+            status_code=400, detail="Sistem ajanları LLM çağrısı yapmaz"
+        )
+
+    builder = BatchFileBuilder()
+    invalid = []
+    for item in batch_items(request.inputs):
+        item_id = item["id"] if item["id"] is not None else item["index"]
+        if "error" in item:
+            invalid.append({"item_id": item_id, "error": item["error"]})
+            continue
+        builder.add(item_id, build_agent_request(agent, item["input_text"]))
+
+    response = {
+        "requests": len(builder.manifest),
+        "unique_requests": len(builder),
+        "manifest": builder.manifest,
+        "invalid": invalid,
+    }
+    if request.submit and len(builder):
+        response.update(
+            await submit_batch_file(
+                get_openai_client(), builder, metadata={"agent_id": agent_id}
+            )
+        )
+    else:
+        response["file"] = builder.to_bytes().decode("utf-8")
+    return response
+
+
+@router.get("/llm/batches/{batch_id}")
+async def get_llm_batch(batch_id: str):
+    """
+    Sağlayıcıdaki toplu işin durumunu döndürür.
+
+    İş tamamlandıysa sonuçlar `custom_id` ile döner ve LLM önbelleğine yazılır.
+    """
+    return await fetch_batch_results(get_openai_client(), batch_id)
+
+
 # Yeni Agent Creation endpoint'leri
-@app.post("/api/generate-agent", response_model=AgentCreationResponse)
+def _agent_configuration(config: Dict[str, Any]) -> AgentConfiguration:
+    """Validate and structure a generated configuration"""
+    tools = config.get("selected_tools", {})
+    return AgentConfiguration(
+        agent_name=config.get("agent_name", ""),
+        agent_description=config.get("agent_description", ""),
+        system_prompt=config.get("system_prompt", ""),
+        query_prompt=config.get("query_prompt", ""),
+        selected_tools=ToolSelection(
+            tool1=tools.get("tool1", False),
+            webSearch=tools.get("webSearch", False),
+            codeExecution=tools.get("codeExecution", False),
+            fileAnalysis=tools.get("fileAnalysis", False),
+        ),
+        reasoning=config.get("reasoning", ""),
+    )
+
+
+@router.post("/api/generate-agent", response_model=AgentCreationResponse)
 async def generate_agent(request: AgentCreationRequest):
     """Generate an AI agent configuration based on user description"""
     try:
-        # Get OpenAI client
-        client = get_openai_client()
-
-        # Create agent creator
-        creator = AgentCreator(client)
+        # Get shared agent creator
+        creator = get_agent_creator()
 
         # Generate configuration
-        config = creator.generate_agent_config(
-            request.description, request.temperature, request.max_tokens
-        )
-
-        # Validate and structure the response
-        agent_config = AgentConfiguration(
-            agent_name=config.get("agent_name", ""),
-            agent_description=config.get("agent_description", ""),
-            system_prompt=config.get("system_prompt", ""),
-            query_prompt=config.get("query_prompt", ""),
-            selected_tools=ToolSelection(
-                tool1=config.get("selected_tools", {}).get("tool1", False),
-                webSearch=config.get("selected_tools", {}).get("webSearch", False),
-                codeExecution=config.get("selected_tools", {}).get(
-                    "codeExecution", False
-                ),
-                fileAnalysis=config.get("selected_tools", {}).get(
-                    "fileAnalysis", False
-                ),
-            ),
-            reasoning=config.get("reasoning", ""),
+        config = await creator.generate_agent_config(
+            request.description,
+            request.temperature,
+            request.max_tokens,
+            bypass_cache=request.bypass_cache,
         )
 
-        return AgentCreationResponse(success=True, data=agent_config)
+        return AgentCreationResponse(success=True, data=_agent_configuration(config))
 
     except HTTPException:
         raise
@@ -293,29 +624,71 @@ async def generate_agent(request: AgentCreationRequest):
         return AgentCreationResponse(success=False, error=str(e))
 
 
-@app.post("/api/conversation", response_model=ConversationResponse)
+@router.post("/api/generate-agent/stream")
+async def stream_generate_agent(request: AgentCreationRequest):
+    """
+    Generate an agent configuration and stream it as Server-Sent Events.
+
+    Emits `field_delta` events (`field`, `delta`) while string fields such
+    as `agent_name` and `system_prompt` are generated, a `field` event
+    (`field`, `value`) when a top-level field is complete, `retry` when
+    invalid output is sent back for repair (partial fields should be
+    discarded) and a final `done` event with the `/api/generate-agent`
+    response body, or `error` on failure.
+    """
+    creator = get_agent_creator()
+
+    async def produce(emit):
+        config = await creator.generate_agent_config(
+            request.description,
+            request.temperature,
+            request.max_tokens,
+            bypass_cache=request.bypass_cache,
+            on_event=emit,
+        )
+        return AgentCreationResponse(
+            success=True, data=_agent_configuration(config)
+        ).dict()
+
+    return StreamingResponse(
+        sse_event_stream(produce, final_event="done"),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+async def _complete_conversation(
+    request: ConversationRequest, client: "openai.AsyncOpenAI"
+):
+    """Run a conversation turn with the agent's system and query prompts"""
+    # Combine system prompt and query prompt for context
+    system_message = f"{request.system_prompt}\n\n{request.query_prompt}"
+
+    return await acomplete(
+        client,
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": request.message},
+        ],
+        temperature=request.temperature,
+        max_tokens=request.max_tokens,
+        bypass_cache=request.bypass_cache,
+    )
+
+
+@router.post("/api/conversation", response_model=ConversationResponse)
 async def chat_with_agent(request: ConversationRequest):
     """Chat with an AI agent using its system and query prompts"""
     try:
         # Get OpenAI client
         client = get_openai_client()
 
-        # Combine system prompt and query prompt for context
-        system_message = f"{request.system_prompt}\n\n{request.query_prompt}"
-
         # Create the conversation
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": request.message},
-            ],
-            temperature=request.temperature,
-            max_tokens=request.max_tokens,
-        )
+        response = await _complete_conversation(request, client)
 
         # Extract the response
-        agent_response = response.choices[0].message.content.strip()
+        agent_response = response.content.strip()
 
         return ConversationResponse(success=True, response=agent_response)
 
@@ -323,7 +696,29 @@ async def chat_with_agent(request: ConversationRequest):
         return ConversationResponse(success=False, error=str(e))
 
 
-@app.get("/api/tools")
+@router.post("/api/conversation/stream")
+async def stream_chat_with_agent(request: ConversationRequest):
+    """
+    Stream an agent's reply as Server-Sent Events.
+
+    Emits `token` events with `delta` text as the model produces it and a
+    final `done` event with the full response, or `error` on failure.
+    """
+    client = get_openai_client()
+
+    async def produce(emit):
+        with stream_llm_tokens(lambda delta: emit("token", {"delta": delta})):
+            response = await _complete_conversation(request, client)
+        return {"success": True, "response": response.content.strip()}
+
+    return StreamingResponse(
+        sse_event_stream(produce, final_event="done"),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+@router.get("/api/tools")
 async def get_available_tools():
     """Get list of available tools"""
     return {
@@ -353,26 +748,28 @@ async def get_available_tools():
 
 
 # İş akışı endpoint'leri
-@app.post("/workflows")
-async def create_workflow(workflow: WorkflowBase):
+@router.post("/workflows")
+def create_workflow(workflow: WorkflowBase):
     """Yeni iş akışı oluşturur veya mevcut iş akışını günceller."""
     if workflow.id:
         # Mevcut workflow'u güncelle
-        for i, wf in enumerate(DB["workflows"]):
-            if wf["id"] == workflow.id:
-                updated_workflow = {
-                    "id": workflow.id,
-                    "name": workflow.name,
-                    "description": workflow.description,
-                    "nodes": [node.dict() for node in workflow.nodes],
-                    "edges": [edge.dict() for edge in workflow.edges],
-                    "user_id": wf.get("user_id", "demo_user"),
-                    "created_at": wf["created_at"],
-                    "updated_at": datetime.utcnow(),
-                }
-                DB["workflows"][i] = updated_workflow
-                logger.info(f"İş akışı güncellendi: {workflow.name}")
-                return updated_workflow
+        wf = get_db().workflows.get(workflow.id)
+        if wf:
+            updated_workflow = {
+                "id": workflow.id,
+                "name": workflow.name,
+                "description": workflow.description,
+                "nodes": [node.dict() for node in workflow.nodes],
+                "edges": [edge.dict() for edge in workflow.edges],
+                "user_id": wf.get("user_id"),
+                "created_at": wf["created_at"],
+                "updated_at": datetime.utcnow(),
+            }
+            # Derleme hatası olan iş akışı kaydedilmesin diye önce derlenir
+            get_plan_cache().compile(updated_workflow, resolve_agent)
+            get_db().workflows.add(updated_workflow)
+            logger.info("İş akışı güncellendi: %s", workflow.name)
+            return updated_workflow
 
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -388,35 +785,39 @@ async def create_workflow(workflow: WorkflowBase):
             "description": workflow.description,
             "nodes": [node.dict() for node in workflow.nodes],
             "edges": [edge.dict() for edge in workflow.edges],
-            "user_id": "demo_user",
+            # Kimliği doğrulanmış kullanıcı yoksa sahipsiz (Prisma'da NULL) kaydedilir
+            "user_id": None,
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow(),
         }
 
-        DB["workflows"].append(new_workflow)
-        logger.info(f"Yeni iş akışı oluşturuldu: {workflow.name}")
+        get_plan_cache().compile(new_workflow, resolve_agent)
+        get_db().workflows.add(new_workflow)
+        logger.info("Yeni iş akışı oluşturuldu: %s", workflow.name)
 
         return new_workflow
     except Exception as e:
-        logger.error(f"İş akışı oluşturma hatası: {str(e)}")
+        logger.error("İş akışı oluşturma hatası: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"İş akışı oluşturulamadı: {str(e)}",
         )
 
 
-@app.get("/workflows")
-async def get_workflows():
-    """Tüm iş akışlarını listeler."""
-    return DB["workflows"]
+@router.get("/workflows")
+def get_workflows(user_id: Optional[str] = None):
+    """Tüm iş akışlarını ya da bir kullanıcının iş akışlarını listeler."""
+    if user_id is not None:
+        return get_db().workflows.find_by("user_id", user_id)
+    return get_db().workflows.all()
 
 
-@app.get("/workflows/{workflow_id}")
-async def get_workflow(workflow_id: str):
+@router.get("/workflows/{workflow_id}")
+def get_workflow(workflow_id: str):
     """Belirli bir iş akışının detaylarını getirir."""
-    for workflow in DB["workflows"]:
-        if workflow["id"] == workflow_id:
-            return workflow
+    workflow = get_db().workflows.get(workflow_id)
+    if workflow:
+        return workflow
 
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
@@ -424,15 +825,14 @@ async def get_workflow(workflow_id: str):
     )
 
 
-@app.delete("/workflows/{workflow_id}")
-async def delete_workflow(workflow_id: str):
+@router.delete("/workflows/{workflow_id}")
+def delete_workflow(workflow_id: str):
     """Bir iş akışını siler."""
-    for i, workflow in enumerate(DB["workflows"]):
-        if workflow["id"] == workflow_id:
-            workflow_name = workflow["name"]
-            del DB["workflows"][i]
-            logger.info(f"İş akışı silindi: {workflow_name}")
-            return {"message": "İş akışı başarıyla silindi"}
+    workflow = get_db().workflows.delete(workflow_id)
+    if workflow:
+        get_plan_cache().invalidate_workflow(workflow_id)
+        logger.info("İş akışı silindi: %s", workflow["name"])
+        return {"message": "İş akışı başarıyla silindi"}
 
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
@@ -441,39 +841,67 @@ async def delete_workflow(workflow_id: str):
 
 
 # İş akışı yürütme endpoint'i
-@app.post("/workflows/{workflow_id}/execute", response_model=WorkflowExecutionResult)
-async def execute_workflow(
-    workflow_id: str, execute_request: WorkflowExecuteRequest = Body(...)
-):
-    """Bir iş akışını yürütür."""
+def _read_executable_workflow(workflow_id: str):
+    """İş akışını ve derlenmiş planını döndürür; yürütülemiyorsa hata fırlatır."""
     # İş akışını bul
-    workflow = None
-    for wf in DB["workflows"]:
-        if wf["id"] == workflow_id:
-            workflow = wf
-            break
-
+    workflow = get_db().workflows.get(workflow_id)
     if not workflow:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="İş akışı bulunamadı"
         )
 
     # API anahtarını kontrol et
-    if not OPENAI_API_KEY:
+    if not openai_api_key():
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="OpenAI API anahtarı sunucu tarafında tanımlanmamış. Lütfen sunucu yöneticisine başvurun.",
         )
 
-    # İş akışını yürüt
-    result = execute_workflow_pipeline(
-        workflow=workflow,
-        input_text=execute_request.input_text,
-        db=DB,
-        openai_client=openai_client,
-        openai_api_key=OPENAI_API_KEY,
-        process_with_agent_fn=process_with_agent,
-    )
+    # Derlenmiş planı önbellekten al (sürüm değiştiyse yeniden derlenir)
+    return workflow, get_plan_cache().get_or_compile(workflow, resolve_agent)
+
+
+async def _load_executable_workflow(workflow_id: str):
+    """
+    İş akışını ve planını iş parçacığı havuzunda okur.
+
+    Depo okuması ve plan derlemesi senkrondur; olay döngüsünde yapılırsa
+    yavaş bir veritabanı çağrısı devam eden tüm SSE akışlarını durdurur.
+    """
+    return await run_in_threadpool(_read_executable_workflow, workflow_id)
+
+
+async def _run_workflow(
+    workflow, plan, execute_request: WorkflowExecuteRequest, on_event=None
+):
+    """İş akışını yürütür (LLM çağrıları olay döngüsünü bloklamaz)."""
+    with bypass_llm_cache(execute_request.bypass_cache):
+        return await execute_workflow_pipeline_async(
+            workflow=workflow,
+            input_text=execute_request.input_text,
+            db=get_db(),
+            openai_client=get_async_client(),
+            openai_api_key=openai_api_key(),
+            process_with_agent_fn=process_with_agent_async,
+            max_concurrency=execute_request.max_concurrency,
+            plan=plan,
+            on_event=on_event,
+            context_budget=ContextBudget.from_env().override(
+                strategy=execute_request.context_strategy,
+                max_tokens=execute_request.context_max_tokens,
+                keep_last=execute_request.context_keep_last,
+            ),
+            verbose=execute_request.verbose,
+        )
+
+
+@router.post("/workflows/{workflow_id}/execute", response_model=WorkflowExecutionResult)
+async def execute_workflow(
+    workflow_id: str, execute_request: WorkflowExecuteRequest = Body(...)
+):
+    """Bir iş akışını yürütür."""
+    workflow, plan = await _load_executable_workflow(workflow_id)
+    result = await _run_workflow(workflow, plan, execute_request)
 
     # Sonucu döndür
     return WorkflowExecutionResult(
@@ -481,14 +909,281 @@ async def execute_workflow(
         results=result["results"],
         execution_time=result["execution_time"],
         status=result["status"],
+        usage=result.get("usage"),
+        skipped_nodes=result.get("skipped_nodes"),
+        branches=result.get("branches"),
     )
 
 
-if __name__ == "__main__":
+async def _run_job(job, on_event):
+    """Kuyruktaki bir işi, iş akışının güncel planıyla yürütür."""
+    workflow, plan = await _load_executable_workflow(job["workflow_id"])
+    execute_request = WorkflowExecuteRequest(**job["request"])
+    # Arka plan işleri etkileşimli isteklerin arkasında kuyruğa girer
+    with llm_priority(Priority.BATCH):
+        return await _run_workflow(workflow, plan, execute_request, on_event=on_event)
+
+
+@router.post(
+    "/workflows/{workflow_id}/jobs",
+    response_model=WorkflowJob,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def submit_workflow_job(
+    workflow_id: str,
+    execute_request: WorkflowExecuteRequest = Body(...),
+    tenant_id: Optional[str] = Header(None, alias="X-Tenant-ID"),
+):
+    """
+    İş akışı yürütmesini kuyruğa alır ve iş kimliğini hemen döndürür.
+
+    Bir kiracının aynı anda çalışan iş sayısı `JOB_MAX_PER_TENANT` ile
+    sınırlanır (varsayılan 2, 0 sınırsız). Kiracı `X-Tenant-ID` başlığından,
+    başlık yoksa iş akışının sahibinden belirlenir. Kimlik doğrulama henüz
+    iş akışlarına bağlı olmadığından ikisi de yoksa iş ortak `anonymous`
+    kiracısına düşer ve bu kiracıya sınır uygulanmaz; sınırın geçerli olması
+    için istemciler başlığı göndermelidir.
+    """
+    workflow, _ = await _load_executable_workflow(workflow_id)
+    return await get_jobs().submit(
+        workflow_id,
+        execute_request.dict(),
+        user_id=workflow.get("user_id"),
+        tenant=tenant_id,
+    )
+
+
+@router.get("/jobs", response_model=List[WorkflowJob])
+def list_jobs(user_id: Optional[str] = None, status: Optional[str] = None):
+    """İşleri kullanıcıya ve/veya duruma göre listeler."""
+    return get_jobs().list(user_id=user_id, status=status)
+
+
+@router.get("/jobs/{job_id}", response_model=WorkflowJob)
+def get_job(job_id: str):
+    """İşin durumunu, tamamlanan düğüm sonuçlarını ve nihai sonucunu döndürür."""
+    job = get_jobs().get(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="İş bulunamadı"
+        )
+    return job
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=WorkflowJob)
+async def cancel_job(job_id: str):
+    """Kuyruktaki ya da çalışan bir işi iptal eder."""
+    job = await get_jobs().cancel(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="İş bulunamadı"
+        )
+    return job
+
+
+def _batch_response(workflow, plan, items, options: WorkflowBatchRequest):
+    """Girdileri tek bir derlenmiş planla yürütüp sonuçları JSONL olarak akıtır."""
+
+    async def run_item(input_text: str):
+        execute_request = WorkflowExecuteRequest(
+            input_text=input_text,
+            max_concurrency=options.node_concurrency,
+            bypass_cache=options.bypass_cache,
+        )
+        with llm_priority(Priority.BATCH):
+            return await _run_workflow(workflow, plan, execute_request)
+
+    async def lines():
+        async for record in run_batch(
+            items,
+            run_item,
+            max_concurrency=options.max_concurrency,
+            include_results=options.include_results,
+        ):
+            yield json.dumps(record, ensure_ascii=False, default=str) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.post("/workflows/{workflow_id}/batch")
+async def execute_workflow_batch(
+    workflow_id: str, batch_request: WorkflowBatchRequest = Body(...)
+):
+    """
+    Bir iş akışını girdi listesi üzerinde yürütür.
+
+    İş akışı bir kez derlenir; sonuçlar bitiş sırasıyla, her girdi için bir
+    satır olacak şekilde JSONL (application/x-ndjson) olarak akıtılır.
+    """
+    workflow, plan = await _load_executable_workflow(workflow_id)
+    return _batch_response(
+        workflow, plan, batch_items(batch_request.inputs), batch_request
+    )
+
+
+@router.post("/workflows/{workflow_id}/batch/upload")
+async def execute_workflow_batch_upload(
+    workflow_id: str,
+    file: UploadFile = File(...),
+    max_concurrency: Optional[int] = None,
+    node_concurrency: Optional[int] = None,
+    include_results: bool = False,
+    bypass_cache: bool = False,
+):
+    """
+    Yüklenen JSONL dosyasındaki girdiler üzerinde iş akışını yürütür.
+
+    Her satır bir JSON metni ya da {"id", "input_text"} nesnesidir; satırlar
+    yürütme ilerledikçe ayrıştırılır. Yanıt biçimi `/batch` ile aynıdır.
+    """
+    workflow, plan = await _load_executable_workflow(workflow_id)
+    options = WorkflowBatchRequest(
+        inputs=[],
+        max_concurrency=max_concurrency,
+        node_concurrency=node_concurrency,
+        include_results=include_results,
+        bypass_cache=bypass_cache,
+    )
+    # Yüklenen dosya yanıt akışı başlamadan kapatılır; içerik önceden okunur
+    content = await file.read()
+    return _batch_response(
+        workflow, plan, batch_items_from_jsonl(content.splitlines()), options
+    )
+
+
+@router.post("/workflows/{workflow_id}/execute/stream")
+async def stream_workflow_execution(
+    workflow_id: str, execute_request: WorkflowExecuteRequest = Body(...)
+):
+    """
+    Bir iş akışını yürütür ve ilerlemeyi Server-Sent Events olarak aktarır.
+
+    Olaylar: `node_started`, `token` (düğüm kimliği ve metin parçası),
+    `node_finished` (süre ve çıktı) ve son olarak `execute` yanıtıyla aynı
+    alanları taşıyan `run_finished`.
+    """
+    workflow, plan = await _load_executable_workflow(workflow_id)
+
+    async def produce(emit):
+        return await _run_workflow(workflow, plan, execute_request, on_event=emit)
+
+    return StreamingResponse(
+        sse_event_stream(produce, final_event="run_finished"),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+def create_app() -> FastAPI:
+    """
+    FastAPI uygulamasını kurar.
+
+    Kaynaklar (istemciler, depo, önbellekler) burada değil, ilk kullanımda
+    ya da `lifespan` açılışında oluşturulur; bu yüzden uygulamayı kurmak ucuzdur.
+    """
+    app = FastAPI(title=API_TITLE, version=API_VERSION, lifespan=lifespan)
+
+    # CORS ayarları - her iki uygulama için gerekli origin'leri dahil et
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*", "http://localhost:3001", "http://127.0.0.1:3001"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # İstek sayısı ve süresi ölçümleri (/metrics)
+    app.add_middleware(MetricsMiddleware)
+
+    app.include_router(router)
+    return app
+
+
+app = create_app()
+
+
+def _configure_workers(workers: int) -> int:
+    """
+    Çok işçili çalışma için paylaşılan arka uçları ortamda ayarlar.
+
+    İşçi süreçleri ortamı devralır: LLM yanıt önbelleğine süreçlerin
+    paylaştığı bir disk katmanı eklenir ve sağlayıcı hız sınırları işçi
+    sayısına bölünür. Depo kendiliğinden değiştirilmez; birden çok işçi için
+    STORAGE_BACKEND=sqlite (ve tercihen ayrı bir SQLITE_PATH) açıkça
+    verilmelidir.
+
+    Returns:
+        Çalıştırılacak işçi sayısı
+
+    Raises:
+        ValueError: Birden çok işçi istendi ama paylaşılan depo seçilmediyse
+    """
+    if workers == 1:
+        return 1
+    backend = os.getenv("STORAGE_BACKEND", "").lower()
+    if backend != "sqlite":
+        raise ValueError(
+            f"{workers} işçi için paylaşılan depo gerekli: STORAGE_BACKEND=sqlite "
+            "ayarlayın ya da --workers 1 ile çalıştırın"
+        )
+    os.environ.setdefault(
+        "LLM_CACHE_DIR", os.path.join(tempfile.gettempdir(), "agent-workflow-llm")
+    )
+    os.environ.setdefault("LLM_RATE_LIMIT_WORKERS", str(workers))
+    logger.info(
+        "Çok işçili çalışma: %d işçi, depo: %s, LLM önbellek dizini: %s",
+        workers,
+        backend,
+        os.environ["LLM_CACHE_DIR"],
+    )
+    return workers
+
+
+def run_server(argv: Optional[List[str]] = None) -> None:
+    """
+    Uygulamayı uvicorn ile çalıştırır.
+
+    Varsayılan tek işçidir; birden çok işçi `--workers`/WEB_CONCURRENCY ile
+    ve yalnızca STORAGE_BACKEND=sqlite ile açılır. Geliştirme için `--reload`
+    verilebilir (tek işçiyle). Varsayılanlar ortamdan okunur: HOST, PORT,
+    WEB_CONCURRENCY (işçi sayısı), UVICORN_RELOAD.
+    """
     import uvicorn
 
-    print("🚀 Starting AI Agent Creation & Workflow API...")
-    print("📍 Server will be available at: http://localhost:8000")
-    print("📚 API Documentation: http://localhost:8000/docs")
-    print("🔍 Alternative docs: http://localhost:8000/redoc")
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
+    _ensure_environment()
+
+    parser = argparse.ArgumentParser(description=API_TITLE)
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("WEB_CONCURRENCY", "1")),
+    )
+    parser.add_argument(
+        "--reload",
+        action="store_true",
+        default=os.getenv("UVICORN_RELOAD", "false").lower() == "true",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        workers = 1 if args.reload else _configure_workers(max(1, args.workers))
+    except ValueError as e:
+        parser.error(str(e))
+
+    print(f"🚀 Starting {API_TITLE} ({workers} worker)...")
+    print(f"📍 Server will be available at: http://localhost:{args.port}")
+    print(f"📚 API Documentation: http://localhost:{args.port}/docs")
+    uvicorn.run(
+        "main:create_app",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        reload=args.reload,
+    )
+
+
+if __name__ == "__main__":
+    run_server()
@@ -1,8 +1,77 @@
-from typing import Dict, List, Any, Union, Optional
+from typing import Dict, List, Any, Callable, Union, Optional
 from datetime import datetime
+from difflib import SequenceMatcher
+from functools import partial
 import time
 import uuid
-from src.utils import logger
+import os
+from src.utils import clip, get_logger, lazy, log_node_event
+from src.llm import LLMResponse, acomplete, complete, stream_llm_tokens
+from src.context import truncate_text
+from src.metrics import FALLBACKS
+from src.ratelimit import LLMUnavailableError, estimate_request_tokens
+from src.looping import LOOP_AGENT_ID, LoopSettings
+from src.routing import (
+    ROUTER_AGENT_ID,
+    build_classifier_request,
+    select_classified_route,
+    select_route,
+)
+
+logger = get_logger(__name__)
+
+# Ajanların kullandığı model ve üretim parametreleri. Regresyon koşuları
+# AGENT_TEMPERATURE=0 ile belirlenimci (ve önbelleğe alınabilir) hale gelir.
+GPT_MODEL = "gpt-4.1-mini"
+GPT_MAX_TOKENS = 2000
+GPT_TEMPERATURE = float(os.getenv("AGENT_TEMPERATURE", "0.7"))
+
+# LLM çağırmayan sistem ajanlarının sabit kimlikleri
+SYSTEM_AGENT_IDS = frozenset(("START", "END", LOOP_AGENT_ID, ROUTER_AGENT_ID))
+
+# Hakem modele gönderilen her sürümün en fazla token sayısı
+LOOP_JUDGE_MAX_TOKENS = 2000
+
+
+class AgentOutput:
+    """
+    Bir ajanın başarılı çıktısı.
+
+    Sonraki düğümlere aktarılan metin (`text`) yalnızca bir kez tutulur.
+    İşlem detaylarını içeren Türkçe rapor metni saklanmaz; `render()`
+    çağrıldığında, gerekli küçük alanlardan o anda oluşturulur.
+    """
+
+    __slots__ = ("text", "info", "_banner")
+
+    def __init__(
+        self,
+        text: str,
+        banner: Optional[Callable[[str], str]] = None,
+        info: Optional[Dict[str, Any]] = None,
+    ):
+        self.text = text
+        self.info = info
+        self._banner = banner
+
+    def render(self) -> str:
+        """Metni ayrıntılı rapor biçiminde döndürür."""
+        if self._banner is None:
+            return self.text
+        return self._banner(self.text)
+
+
+def _bulleted(details: List[str]) -> str:
+    return "\n".join([f"- {detail}" for detail in details])
+
+
+# Örnek ajan kimlikleri bu ad alanından türetilir; her açılışta aynı kalır
+DEFAULT_AGENT_NAMESPACE = uuid.UUID("6f1c2b9e-4d3a-5e8f-9b7c-0a1d2e3f4a5b")
+
+
+def default_agent_id(key: str) -> str:
+    """Örnek ajan için anahtarından belirlenimci (uuid5) kimlik üretir."""
+    return str(uuid.uuid5(DEFAULT_AGENT_NAMESPACE, key))
 
 
 # Örnek ajanlar
@@ -31,19 +100,26 @@ def get_default_agents() -> List[Dict[str, Any]]:
             "type": "system",
         },
         {
-            "id": str(uuid.uuid4()),
+            "id": ROUTER_AGENT_ID,
+            "name": "ROUTER",
+            "description": "Girdiye göre yalnızca bir dalın çalışmasını sağlar",
+            "prompt": "Metni değiştirmeden geçirir; düğümdeki kurala göre hangi dalın çalışacağını seçer.",
+            "type": "system",
+        },
+        {
+            "id": default_agent_id("researcher"),
             "name": "Araştırmacı",
             "description": "Temel araştırma ve bilgi toplama yapan ajan",
             "prompt": "Sen deneyimli bir araştırmacısın. Görevin, verilen konu hakkında temel bilgileri toplamak, ana kavramları açıklamak ve genel bir çerçeve çizmektir.\n\nYanıtında şunlara odaklan:\n1. Konunun temel tanımı ve genel açıklaması\n2. Ana kavramların ve terimlerin açıklamaları\n3. Konunun tarihsel gelişimi veya önemli dönüm noktaları\n4. İlgili veya bağlantılı alanlar\n\nHerkesin anlayabileceği açık ve net bir dil kullan. Karmaşık terimleri basitleştir ve bilgilerin doğru olmasına özen göster. Yanıtın, konunun genel bir anlayışını sunmalıdır.\n\nTalimatlara sadık kal ve sadece doğru bilgileri içeren, 300-500 kelimelik kapsamlı bir yanıt oluştur.",
         },
         {
-            "id": str(uuid.uuid4()),
+            "id": default_agent_id("deep-researcher"),
             "name": "Derin Araştırmacı",
             "description": "Detaylı ve derinlemesine analiz yapan ajan",
             "prompt": "Sen uzman bir derin araştırmacısın. Görevin, önceden araştırılmış bir konuyu derinlemesine analiz etmek ve ileri düzey bilgiler sunmaktır.\n\nYanıtında şunlara odaklan:\n1. İleri düzey kavramlar ve teorik çerçeveler\n2. Teknik detaylar ve özelleşmiş bilgiler\n3. Alandaki güncel araştırmalar ve tartışmalar\n4. Farklı yaklaşımlar ve metodolojiler arasındaki karşılaştırmalar\n\nUzman seviyesinde bir dil kullanabilirsin, ancak karmaşık kavramları da açıkla. Bilimsel araştırmalara ve güvenilir kaynaklara dayanan bilgiler sun. Yanıtın, konuyu derinlemesine analiz etmeli ve uzmanlaşmış bilgileri içermelidir.\n\nÖnceki araştırmacı ajanın sağladığı bilgileri genişlet ve derinleştir. Tekrara düşme, bunun yerine yeni bilgiler ve derinlemesine analizler ekle. Talimatlara sadık kal ve 400-700 kelimelik kapsamlı bir yanıt oluştur.",
         },
         {
-            "id": str(uuid.uuid4()),
+            "id": default_agent_id("rnd-specialist"),
             "name": "ArGe Uzmanı",
             "description": "Yenilikçi fikirler ve çözümler üreten ajan",
             "prompt": "Sen vizyoner bir ArGe uzmanısın. Görevin, önceden araştırılmış ve derinlemesine analiz edilmiş bir konu hakkında yenilikçi fikirler, potansiyel çözümler ve gelecek uygulamalar önermektir.\n\nYanıtında şunlara odaklan:\n1. Gelecek trendleri ve yenilikçi yaklaşımlar\n2. Potansiyel uygulama alanları ve çözüm önerileri\n3. İnovasyon fırsatları ve yeni araştırma yönleri\n4. Mevcut zorluklar ve bunları aşmaya yönelik yaratıcı çözümler\n\nYaratıcı ve ileriye dönük düşün. Mevcut bilgileri genişleterek yeni fikirler ve perspektifler sun. Önerdiğin fikirler hem yaratıcı hem de uygulanabilir olmalıdır.\n\nÖnceki araştırmacı ve derin araştırmacı ajanların sağladığı bilgileri baz alarak, bunları ileriye taşıyan ve yeni perspektifler sunan öneriler geliştir. Bilgileri tekrarlama, bunun yerine yenilikçi uygulamalara ve geleceğe odaklan. Talimatlara sadık kal ve 400-700 kelimelik vizyoner bir yanıt oluştur.",
@@ -51,44 +127,411 @@ def get_default_agents() -> List[Dict[str, Any]]:
     ]
 
 
-def process_start_agent(input_text: str) -> str:
-    """START ajanı işlemi - iş akışı başlangıcı."""
+def seed_default_agents(store) -> int:
+    """
+    Depoda eksik olan varsayılan ajanları ekler.
+
+    START, END ve LOOP sistem ajanları her zaman bulunmalıdır; örnek ajanlar
+    yalnızca depo boşken (ilk açılışta) eklenir. Kalıcı bir depoda sonraki
+    açılışlarda mevcut kayıtlar korunur.
+
+    Returns:
+        Eklenen ajan sayısı
+    """
+    is_empty = len(store.agents) == 0
+    missing = [
+        agent
+        for agent in get_default_agents()
+        if (is_empty or agent.get("type") == "system")
+        and agent["id"] not in store.agents
+    ]
+    store.agents.add_many(missing)
+    if missing:
+        logger.info("Varsayılan ajanlar eklendi: %d", len(missing))
+    return len(missing)
+
+
+def _render_start_output(timestamp: str, input_text: str) -> str:
     details = [
-        f"İşlem zamanı: {datetime.now().strftime('%H:%M:%S')}",
+        f"İşlem zamanı: {timestamp}",
         f"İş akışı başlatıldı",
-        f"Başlangıç metni: {input_text}",
+        f"Başlangıç metni: {input_text[:100]}...",
     ]
 
     output = "İş Akışı Başlatıldı\n\n"
     output += "İşlem Detayları:\n"
-    output += "\n".join([f"- {detail}" for detail in details])
+    output += _bulleted(details)
     output += "\n\nBaşlangıç Metni:\n"
     output += f'"{input_text}"'
-
-    logger.info(f"START ajan işlemi tamamlandı. Girdi: {input_text[:50]}...")
     return output
 
 
-def process_end_agent(input_text: str, agent_chain: List[str]) -> str:
-    """END ajanı işlemi - iş akışı bitişi."""
-    agent_path = " -> ".join(agent_chain)
+def process_start_agent(input_text: str) -> AgentOutput:
+    """START ajanı işlemi - iş akışı başlangıcı, metni olduğu gibi geçirir."""
+    log_node_event(logger, "START ajan işlemi tamamlandı. Girdi: %s", clip(input_text))
+    return AgentOutput(
+        input_text,
+        partial(_render_start_output, datetime.now().strftime("%H:%M:%S")),
+    )
+
 
+def _render_end_output(
+    timestamp: str, agent_count: int, agent_path: str, input_text: str
+) -> str:
     details = [
-        f"İşlem zamanı: {datetime.now().strftime('%H:%M:%S')}",
+        f"İşlem zamanı: {timestamp}",
         f"İş akışı tamamlandı",
-        f"Toplam ajan sayısı: {len(agent_chain)}",
+        f"Toplam ajan sayısı: {agent_count}",
         f"Ajan zinciri: {agent_path}",
-        f"Son işlenmiş metin: {input_text}",
+        # Metnin tamamı aşağıda yer alır; burada yalnızca kısa bir önizleme
+        f"Son işlenmiş metin: {input_text[:100]}...",
     ]
 
     output = "İş Akışı Tamamlandı\n\n"
     output += "İşlem Detayları:\n"
-    output += "\n".join([f"- {detail}" for detail in details])
+    output += _bulleted(details)
     output += "\n\nSonuç Metni:\n"
     output += f'"{input_text}"'
     output += "\n\nBu iş akışı başarıyla tamamlanmıştır."
+    return output
+
+
+def process_end_agent(input_text: str, agent_chain: List[str]) -> AgentOutput:
+    """END ajanı işlemi - iş akışı bitişi, son metni sonuç olarak verir."""
+    agent_path = " -> ".join(agent_chain)
+    log_node_event(logger, "END ajan işlemi tamamlandı. Zincir: %s", agent_path)
+    return AgentOutput(
+        input_text,
+        partial(
+            _render_end_output,
+            datetime.now().strftime("%H:%M:%S"),
+            len(agent_chain),
+            agent_path,
+        ),
+    )
+
+
+def _render_router_output(
+    timestamp: str, rule: str, target: str, reason: str, input_text: str
+) -> str:
+    details = [
+        f"İşlem zamanı: {timestamp}",
+        f"Yönlendirme kuralı: {rule}",
+        f"Seçilen düğüm: {target}",
+        f"Neden: {reason}",
+    ]
+
+    output = "Yönlendirme Tamamlandı\n\n"
+    output += "İşlem Detayları:\n"
+    output += _bulleted(details)
+    output += "\n\nAktarılan Metin:\n"
+    output += f'"{input_text}"'
+    return output
+
+
+def _format_router_output(
+    config: Dict[str, Any], input_text: str, target: str, reason: str
+) -> AgentOutput:
+    """ROUTER ajanının çıktısını oluşturur; metin olduğu gibi aktarılır."""
+    log_node_event(logger, "ROUTER ajanı dal seçti: %s (%s)", target, reason)
+    return AgentOutput(
+        input_text,
+        partial(
+            _render_router_output,
+            datetime.now().strftime("%H:%M:%S"),
+            config["rule"],
+            target,
+            reason,
+        ),
+        info={
+            "route": {"rule": config["rule"], "selected": [target], "reason": reason}
+        },
+    )
+
+
+def process_router_agent(
+    input_text: str, openai_client, options: Optional[Dict[str, Any]] = None
+) -> AgentOutput:
+    """
+    ROUTER ajanı işlemi - metni geçirir ve çalışacak dalı seçer.
+
+    Kural ayarları düğüm verisindeki `router` alanında bulunur (bkz.
+    `src.routing.validate_router`). Sınıflandırıcı çağrısı başarısız olursa
+    varsayılan dal seçilir.
+    """
+    config = (options or {}).get("router") or {}
+    if config.get("rule") != "classifier":
+        target, reason = select_route(config, input_text)
+        return _format_router_output(config, input_text, target, reason)
+
+    try:
+        response = complete(
+            openai_client, **build_classifier_request(config, input_text)
+        )
+        target, reason = select_classified_route(config, response.content)
+    except LLMUnavailableError:
+        raise
+    except Exception as e:
+        logger.error("ROUTER sınıflandırma hatası: %s", e)
+        FALLBACKS.labels("router_default").inc()
+        target, reason = config["default"], f"Sınıflandırıcı hatası: {str(e)}"
+    return _format_router_output(config, input_text, target, reason)
+
+
+async def process_router_agent_async(
+    input_text: str, openai_client, options: Optional[Dict[str, Any]] = None
+) -> AgentOutput:
+    """ROUTER ajanı işleminin asenkron sürümü (AsyncOpenAI istemcisi bekler)."""
+    config = (options or {}).get("router") or {}
+    if config.get("rule") != "classifier":
+        target, reason = select_route(config, input_text)
+        return _format_router_output(config, input_text, target, reason)
+
+    try:
+        # Sınıflandırıcının yanıtı akış olarak istemciye gönderilmez
+        with stream_llm_tokens(None):
+            response = await acomplete(
+                openai_client, **build_classifier_request(config, input_text)
+            )
+        target, reason = select_classified_route(config, response.content)
+    except LLMUnavailableError:
+        raise
+    except Exception as e:
+        logger.error("ROUTER sınıflandırma hatası: %s", e)
+        FALLBACKS.labels("router_default").inc()
+        target, reason = config["default"], f"Sınıflandırıcı hatası: {str(e)}"
+    return _format_router_output(config, input_text, target, reason)
+
+
+def _find_loop_source_agent(
+    previous_agents: List[Dict[str, Any]],
+) -> Optional[Dict[str, Any]]:
+    """LOOP düğümünün promptunu kullanacağı önceki ajanı bulur."""
+    for agent in reversed(previous_agents[:-1]):  # son eleman LOOP'un kendisi
+        if agent["id"] not in ("LOOP", "START", ROUTER_AGENT_ID):
+            return agent
+    return None
+
+
+def agent_instructions(agent: Dict[str, Any]) -> str:
+    """
+    Ajanın sistem promptunu, varsa ayrı tutulan sorgu promptuyla birleştirir.
+
+    Next.js tarafında oluşturulan ajanlarda sorgu talimatları `query_prompt`
+    alanında ayrı saklanır; kayıt değiştirilmeden yalnızca istemde birleşir.
+    """
+    query_prompt = agent.get("query_prompt")
+    if query_prompt:
+        return f"{agent['prompt']}\n\n{query_prompt}"
+    return agent["prompt"]
+
+
+def _build_loop_messages(
+    previous_agent: Dict[str, Any], input_text: str
+) -> List[Dict[str, str]]:
+    """LOOP ajanı için sistem ve kullanıcı mesajlarını hazırlar."""
+    # Önceki ajanın sistem mesajını al
+    system_message = (
+        "Aşağıdaki bilgiler ile sana bir rol verecek buna uygun net bir dil kullanarak yanıt ver."
+        + "\n\n"
+        + previous_agent["prompt"]
+        + "\n\nNot: Bu metin daha önce işlenmiş ve şimdi LOOP ajanı tarafından derinleştirilecektir. Önceki içeriği genişlet ve daha detaylı hale getir."
+    )
+
+    # Kullanıcı mesajı
+    user_message = (
+        f"İşlenecek metin: {input_text}\n\nBu metni daha da derinleştir ve genişlet."
+    )
+
+    return [
+        {"role": "system", "content": system_message},
+        {"role": "user", "content": user_message},
+    ]
+
+
+def _response_tokens(response: LLMResponse) -> int:
+    # Önbellekten gelen ya da paylaşılan yanıt bütçeden düşmez
+    if response.cached or response.coalesced:
+        return 0
+    return response.prompt_tokens + response.completion_tokens
+
+
+def _texts_converged(settings: LoopSettings, previous: str, current: str) -> bool:
+    """İki ardışık LOOP çıktısının yakınsayıp yakınsamadığını döndürür."""
+    if settings.stop == "similarity":
+        ratio = SequenceMatcher(None, previous.split(), current.split()).ratio()
+        return ratio >= settings.similarity_threshold
+    if settings.stop == "length":
+        growth = (len(current) - len(previous)) / max(len(previous), 1)
+        return growth <= settings.length_tolerance
+    return False
+
+
+def _build_judge_request(previous: str, current: str) -> Dict[str, Any]:
+    """Yeni sürümün önceki sürüme bir şey katıp katmadığını soran istek."""
+    system_message = (
+        "Bir metnin iki ardışık sürümünü karşılaştıran bir değerlendiricisin. "
+        "Yeni sürüm öncekine anlamlı yeni bilgi veya derinlik katıyorsa yalnızca "
+        "DEVAM, katmıyorsa yalnızca YETERLI yaz."
+    )
+    user_message = (
+        f"Önceki sürüm:\n{truncate_text(previous, LOOP_JUDGE_MAX_TOKENS)}\n\n"
+        f"Yeni sürüm:\n{truncate_text(current, LOOP_JUDGE_MAX_TOKENS)}"
+    )
+    return {
+        "model": GPT_MODEL,
+        "messages": [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": user_message},
+        ],
+        "temperature": 0,
+        "max_tokens": 5,
+    }
+
+
+class _LoopRun:
+    """
+    Bir LOOP düğümünün yineleme durumu.
+
+    Senkron ve asenkron sürümler aynı durumu kullanır; yalnızca LLM
+    çağrısının nasıl yapıldığı farklıdır.
+    """
+
+    def __init__(
+        self, settings: LoopSettings, previous_agent: Dict[str, Any], input_text: str
+    ):
+        self.settings = settings
+        self.previous_agent = previous_agent
+        self.text = input_text
+        self.iterations = 0
+        self.tokens = 0
+        self.stop_reason = "max_iterations"
+        self.converged = False
+
+    def next_request(self) -> Optional[Dict[str, Any]]:
+        """Sonraki yinelemenin isteğini döndürür; durulacaksa None."""
+        if self.converged or self.iterations >= self.settings.max_iterations:
+            return None
+        request = {
+            "model": GPT_MODEL,
+            "messages": _build_loop_messages(self.previous_agent, self.text),
+            "max_tokens": GPT_MAX_TOKENS,
+            "temperature": GPT_TEMPERATURE,
+        }
+        budget = self.settings.max_tokens
+        # İlk yineleme her zaman yapılır; sonrakiler bütçeye sığmalı
+        if (
+            self.iterations
+            and budget is not None
+            and self.tokens + estimate_request_tokens(request) > budget
+        ):
+            self.stop_reason = "token_budget"
+            return None
+        return request
+
+    def add(self, response: LLMResponse) -> Optional[Dict[str, Any]]:
+        """
+        Yinelemenin yanıtını kaydeder ve yakınsamayı kontrol eder.
+
+        Returns:
+            Yakınsama hakem modelle kontrol edilecekse hakem isteği
+        """
+        self.iterations += 1
+        self.tokens += _response_tokens(response)
+        previous, self.text = self.text, response.content
+        if (
+            self.iterations >= self.settings.max_iterations
+            or self.settings.stop == "none"
+        ):
+            return None
+        if self.settings.stop == "judge":
+            return _build_judge_request(previous, self.text)
+        if _texts_converged(self.settings, previous, self.text):
+            self._converge()
+        return None
+
+    def add_verdict(self, response: LLMResponse) -> None:
+        """Hakem modelin kararını kaydeder."""
+        self.tokens += _response_tokens(response)
+        if response.content.strip().upper().startswith("YETERL"):
+            self._converge()
+
+    def _converge(self) -> None:
+        self.converged = True
+        self.stop_reason = "converged"
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "iterations": self.iterations,
+            "max_iterations": self.settings.max_iterations,
+            "tokens": self.tokens,
+            "stop_reason": self.stop_reason,
+        }
+
+
+def _loop_details(previous_agent: Dict[str, Any], input_text: str) -> List[str]:
+    """LOOP ajanı işlem detaylarını oluşturur."""
+    return [
+        f"İşlem zamanı: {datetime.now().strftime('%H:%M:%S')}",
+        f"LOOP ajanı çalışıyor",
+        f"Önceki ajan: {previous_agent['name']}",
+        f"Önceki ajan promptu kullanılarak metin tekrar işleniyor",
+        f"İşlenecek metin: {input_text[:100]}...",
+    ]
+
+
+def _render_loop_output(
+    previous_agent_name: str, details: List[str], gpt_response: str
+) -> str:
+    output = f"LOOP Ajanı ('{previous_agent_name}' promptu ile) İşlem Sonucu\n\n"
+    output += "İşlem Detayları:\n"
+    output += _bulleted(details)
+    output += "\n\nDerinleştirilmiş İçerik:\n"
+    output += f'"{gpt_response}"'
+    return output
+
+
+def _format_loop_output(
+    previous_agent: Dict[str, Any], details: List[str], run: _LoopRun
+) -> AgentOutput:
+    """LOOP ajanının başarılı çıktısını oluşturur."""
+    report = run.report()
+    details.append(
+        f"Yineleme: {report['iterations']}/{report['max_iterations']} "
+        f"(durma nedeni: {report['stop_reason']})"
+    )
+    details.append(f"Kullanılan token: {report['tokens']}")
+    log_node_event(
+        logger,
+        "LOOP ajan işlemi tamamlandı. Yineleme: %s, token: %s, yanıt uzunluğu: %s",
+        report["iterations"],
+        report["tokens"],
+        len(run.text),
+    )
+    return AgentOutput(
+        run.text,
+        partial(_render_loop_output, previous_agent["name"], details),
+        info={"loop": report},
+    )
+
+
+def _format_loop_error(
+    previous_agent: Dict[str, Any],
+    details: List[str],
+    input_text: str,
+    error: Exception,
+) -> str:
+    """LOOP ajanının hata çıktısını oluşturur."""
+    logger.error("LOOP işleminde hata: %s", error)
+    FALLBACKS.labels("loop_error").inc()
+
+    output = f"LOOP Ajanı İşlemi (Hata) - Önceki ajan: {previous_agent['name']}\n\n"
+    output += "İşlem Detayları:\n"
+    output += "\n".join([f"- {detail}" for detail in details])
+    output += f"\n\nHata: {str(error)}"
+    output += "\n\nBu hata nedeniyle işlenemeyen metin:\n"
+    output += f'"{input_text}"'
 
-    logger.info(f"END ajan işlemi tamamlandı. Zincir: {agent_path}")
     return output
 
 
@@ -97,8 +540,15 @@ def process_loop_agent(
     agent_chain: List[str],
     previous_agents: List[Dict[str, Any]],
     openai_client,
-) -> Union[str, Dict[str, Any]]:
-    """LOOP ajanı işlemi - önceki ajanın promptunu kullanarak tekrar çalışır."""
+    options: Optional[Dict[str, Any]] = None,
+) -> Union[str, AgentOutput]:
+    """
+    LOOP ajanı işlemi - önceki ajanın promptunu kullanarak tekrar çalışır.
+
+    Metin `options["loop"]` ayarlarına göre (bkz. `LoopSettings`) aynı düğüm
+    içinde birden çok kez derinleştirilir; çıktı yakınsarsa veya token
+    bütçesi biterse erken durulur.
+    """
     # Önceki ajanı kontrol et
     if len(agent_chain) < 2 or len(previous_agents) < 1:
         logger.warning("LOOP ajanı için önceki ajan bulunamadı")
@@ -107,12 +557,7 @@ def process_loop_agent(
         )
 
     # En son ajanı bul (LOOP'un kendisi hariç)
-    previous_agent = None
-    for agent in reversed(previous_agents[:-1]):  # son eleman LOOP'un kendisi
-        if agent["id"] != "LOOP" and agent["id"] != "START":
-            previous_agent = agent
-            break
-
+    previous_agent = _find_loop_source_agent(previous_agents)
     if not previous_agent:
         logger.warning("LOOP için uygun önceki ajan bulunamadı")
         return (
@@ -120,74 +565,258 @@ def process_loop_agent(
         )
 
     # İşleme detayları
-    details = [
-        f"İşlem zamanı: {datetime.now().strftime('%H:%M:%S')}",
-        f"LOOP ajanı çalışıyor",
-        f"Önceki ajan: {previous_agent['name']}",
-        f"Önceki ajan promptu kullanılarak metin tekrar işleniyor",
-        f"İşlenecek metin: {input_text}",
-    ]
+    details = _loop_details(previous_agent, input_text)
 
     try:
-        logger.info(
-            f"LOOP ajanı, '{previous_agent['name']}' ajanının promptunu kullanarak işlemi başlatıyor..."
+        log_node_event(
+            logger,
+            "LOOP ajanı, '%s' ajanının promptunu kullanarak işlemi başlatıyor...",
+            previous_agent["name"],
+        )
+
+        # API çağrıları
+        start_time = time.perf_counter()
+        if not openai_client:
+            raise Exception("OpenAI API istemcisi bulunamadı.")
+
+        run = _LoopRun(LoopSettings.from_options(options), previous_agent, input_text)
+        while True:
+            request = run.next_request()
+            if request is None:
+                break
+            judge_request = run.add(complete(openai_client, **request))
+            if judge_request is not None:
+                run.add_verdict(complete(openai_client, **judge_request))
+        end_time = time.perf_counter()
+
+        details.append(f"İşlem süresi: {(end_time - start_time):.2f} saniye")
+        return _format_loop_output(previous_agent, details, run)
+
+    except LLMUnavailableError:
+        raise
+    except Exception as e:
+        return _format_loop_error(previous_agent, details, input_text, e)
+
+
+async def process_loop_agent_async(
+    input_text: str,
+    agent_chain: List[str],
+    previous_agents: List[Dict[str, Any]],
+    openai_client,
+    options: Optional[Dict[str, Any]] = None,
+) -> Union[str, AgentOutput]:
+    """LOOP ajanı işleminin asenkron sürümü (AsyncOpenAI istemcisi bekler)."""
+    if len(agent_chain) < 2 or len(previous_agents) < 1:
+        logger.warning("LOOP ajanı için önceki ajan bulunamadı")
+        return (
+            f"LOOP ajanı için önceki bir ajan bulunamadı. İşlenecek metin: {input_text}"
         )
 
-        # Önceki ajanın sistem mesajını al
-        system_message = (
-            "Aşağıdaki bilgiler ile sana bir rol verecek buna uygun net bir dil kullanarak yanıt ver."
-            + "\n\n"
-            + previous_agent["prompt"]
-            + "\n\nNot: Bu metin daha önce işlenmiş ve şimdi LOOP ajanı tarafından derinleştirilecektir. Önceki içeriği genişlet ve daha detaylı hale getir."
+    previous_agent = _find_loop_source_agent(previous_agents)
+    if not previous_agent:
+        logger.warning("LOOP için uygun önceki ajan bulunamadı")
+        return (
+            f"LOOP için uygun bir önceki ajan bulunamadı. İşlenecek metin: {input_text}"
         )
 
-        # Kullanıcı mesajı
-        user_message = f"İşlenecek metin: {input_text}\n\nBu metni daha da derinleştir ve genişlet."
+    details = _loop_details(previous_agent, input_text)
 
-        # API çağrısı
-        start_time = time.time()
+    try:
+        log_node_event(
+            logger,
+            "LOOP ajanı, '%s' ajanının promptunu kullanarak işlemi başlatıyor...",
+            previous_agent["name"],
+        )
+
+        start_time = time.perf_counter()
         if not openai_client:
             raise Exception("OpenAI API istemcisi bulunamadı.")
 
-        response = openai_client.chat.completions.create(
-            model="gpt-4.1-mini",
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": user_message},
-            ],
-            max_tokens=2000,
-            temperature=0.7,
+        run = _LoopRun(LoopSettings.from_options(options), previous_agent, input_text)
+        while True:
+            request = run.next_request()
+            if request is None:
+                break
+            judge_request = run.add(await acomplete(openai_client, **request))
+            if judge_request is not None:
+                # Hakemin kararı akış olarak istemciye gönderilmez
+                with stream_llm_tokens(None):
+                    run.add_verdict(await acomplete(openai_client, **judge_request))
+        end_time = time.perf_counter()
+
+        details.append(f"İşlem süresi: {(end_time - start_time):.2f} saniye")
+        return _format_loop_output(previous_agent, details, run)
+
+    except LLMUnavailableError:
+        raise
+    except Exception as e:
+        return _format_loop_error(previous_agent, details, input_text, e)
+
+
+def _check_gpt_credentials(openai_client, openai_api_key: str) -> None:
+    """GPT çağrısı öncesi istemci ve API anahtarını kontrol eder."""
+    if not openai_client:
+        logger.error("OpenAI istemcisi bulunamadı, API anahtarını kontrol edin")
+        raise Exception(
+            "OpenAI API istemcisi oluşturulamadı. API anahtarını kontrol edin."
         )
-        end_time = time.time()
 
-        # API yanıtı
-        gpt_response = response.choices[0].message.content
+    if not openai_api_key:
+        logger.error("OpenAI API anahtarı bulunamadı")
+        raise Exception("OpenAI API anahtarı bulunamadı.")
 
-        # İşleme detayları
-        details.append(f"İşlem süresi: {(end_time - start_time):.2f} saniye")
 
-        # Çıktı
-        output = f"LOOP Ajanı ('{previous_agent['name']}' promptu ile) İşlem Sonucu\n\n"
-        output += "İşlem Detayları:\n"
-        output += "\n".join([f"- {detail}" for detail in details])
-        output += "\n\nDerinleştirilmiş İçerik:\n"
-        output += f'"{gpt_response}"'
+def _build_gpt_messages(
+    agent: Dict[str, Any], input_text: str, agent_chain: List[str]
+) -> List[Dict[str, str]]:
+    """Normal ajanlar için sistem ve kullanıcı mesajlarını hazırlar."""
+    agent_chain_text = " -> ".join(agent_chain)
 
-        logger.info(f"LOOP ajan işlemi tamamlandı. Yanıt uzunluğu: {len(gpt_response)}")
-        return {"output_text": output, "gpt_response": gpt_response}
+    system_message = (
+        "Aşağıdaki bilgiler ile sana bir rol verecek buna uygun net bir dil kullanarak yanıt ver."
+        + "\n\n"
+        + agent_instructions(agent)
+    )
 
-    except Exception as e:
-        logger.error(f"LOOP işleminde hata: {str(e)}")
+    # Önceki ajanın çıktısına göre ek bağlam
+    additional_context = ""
+    if len(agent_chain) > 1:
+        additional_context = f"\n\nBu konu daha önce '{agent_chain[-2]}' ajanı tarafından işlenmiştir. Sen bir '{agent['name']}' olarak, bu konuyu daha da geliştirmelisin."
+
+    user_message = (
+        f"İşlenecek metin: {input_text}\n\n"
+        f"Ajanlar zinciri: {agent_chain_text}{additional_context}"
+    )
+
+    return [
+        {"role": "system", "content": system_message},
+        {"role": "user", "content": user_message},
+    ]
+
+
+def build_agent_request(
+    agent: Dict[str, Any], input_text: str, agent_chain: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Ajanın bir girdi için göndereceği sohbet tamamlama isteğini döndürür.
+
+    Toplu API dosyaları bu istekten oluşturulur; zincir verilmezse ajan tek
+    başına çalışıyormuş gibi yalnızca kendi adı kullanılır.
+    """
+    return {
+        "model": GPT_MODEL,
+        "messages": _build_gpt_messages(
+            agent, input_text, agent_chain or [agent["name"]]
+        ),
+        "temperature": GPT_TEMPERATURE,
+        "max_tokens": GPT_MAX_TOKENS,
+    }
+
+
+def _render_gpt_output(
+    agent_name: str,
+    agent_chain: List[str],
+    input_preview: str,
+    input_length: int,
+    elapsed: float,
+    timestamp: str,
+    gpt_response: str,
+) -> str:
+    agent_chain_text = " -> ".join(agent_chain)
 
-        # Hata çıktısı
-        output = f"LOOP Ajanı İşlemi (Hata) - Önceki ajan: {previous_agent['name']}\n\n"
-        output += "İşlem Detayları:\n"
-        output += "\n".join([f"- {detail}" for detail in details])
-        output += f"\n\nHata: {str(e)}"
-        output += "\n\nBu hata nedeniyle işlenemeyen metin:\n"
-        output += f'"{input_text}"'
+    # İşleme detayları
+    processing_details = [
+        f"İşlem zamanı: {timestamp}",
+        f"Ajan adı: {agent_name}",
+        f"Ajan zinciri: {agent_chain_text}",
+        f"İşlenen metin: {input_preview}...",  # Uzun metinler için kısaltma
+        f"İşlem süresi: {elapsed:.2f} saniye",
+    ]
+
+    # Teknik detaylar
+    technical_details = [
+        f"İşleme tipi: GPT ile metin işleme",
+        f"Model: {GPT_MODEL}",
+        f"Ajan sayısı: {len(agent_chain)}",
+        f"Son ajan: {agent_name}",
+        f"Metin uzunluğu: {input_length} karakter",
+        f"Yanıt uzunluğu: {len(gpt_response)} karakter",
+    ]
+
+    # Çıktı metni
+    output_text = f"Ajan '{agent_name}' ile GPT işlemi tamamlandı\n\n"
+    output_text += "İşlem Detayları:\n"
+    output_text += _bulleted(processing_details)
+    output_text += "\n\nTeknik Bilgiler:\n"
+    output_text += _bulleted(technical_details)
+    output_text += "\n\nGPT Yanıtı:\n"
+    output_text += f'"{gpt_response}"'
+    return output_text
+
+
+def _format_gpt_output(
+    agent: Dict[str, Any],
+    input_text: str,
+    agent_chain: List[str],
+    gpt_response: str,
+    elapsed: float,
+) -> AgentOutput:
+    """GPT ajanının başarılı çıktısını oluşturur."""
+    log_node_event(
+        logger,
+        "GPT işlemi tamamlandı: Ajan=%s, Süre=%.2f saniye, yanıt uzunluğu: %d",
+        agent["name"],
+        elapsed,
+        len(gpt_response),
+    )
+    return AgentOutput(
+        gpt_response,
+        partial(
+            _render_gpt_output,
+            agent["name"],
+            list(agent_chain),
+            input_text[:100],
+            len(input_text),
+            elapsed,
+            datetime.now().strftime("%H:%M:%S"),
+        ),
+    )
+
+
+def _format_gpt_error(
+    agent: Dict[str, Any], input_text: str, agent_chain: List[str], error: Exception
+) -> str:
+    """GPT hatası durumunda yedek çıktıyı oluşturur."""
+    logger.error("GPT işleminde hata: %s", error)
+    FALLBACKS.labels("gpt_error").inc()
+
+    agent_chain_text = " -> ".join(agent_chain)
 
-        return output
+    processing_details = [
+        f"İşlem zamanı: {datetime.now().strftime('%H:%M:%S')}",
+        f"Ajan adı: {agent['name']}",
+        f"Ajan zinciri: {agent_chain_text}",
+        f"İşlenen metin: {input_text[:100]}...",  # Uzun metinler için kısaltma
+        f"Hata: {str(error)}",
+        f"Not: GPT işlemi başarısız olduğu için yedek işlem kullanıldı.",
+    ]
+
+    technical_details = [
+        f"İşleme tipi: Yedek işlem (GPT kullanılmadı)",
+        f"Ajan sayısı: {len(agent_chain)}",
+        f"Son ajan: {agent['name']}",
+        f"Metin uzunluğu: {len(input_text)} karakter",
+    ]
+
+    output = f"Ajan '{agent['name']}' ile işlem tamamlandı (GPT hatası)\n\n"
+    output += "İşlem Detayları:\n"
+    output += "\n".join([f"- {detail}" for detail in processing_details])
+    output += "\n\nTeknik Bilgiler:\n"
+    output += "\n".join([f"- {detail}" for detail in technical_details])
+    output += "\n\nİşlenmiş Metin:\n"
+    output += f'"{input_text[:500]}..."'  # Çok uzun metinleri kısalt
+
+    return output
 
 
 def process_gpt_agent(
@@ -197,133 +826,123 @@ def process_gpt_agent(
     previous_agents: List[Dict[str, Any]],
     openai_client,
     openai_api_key: str,
-) -> Union[str, Dict[str, Any]]:
+) -> Union[str, AgentOutput]:
     """GPT API kullanarak ajanı çalıştırır."""
-    start_time = time.time()
+    start_time = time.perf_counter()
     try:
-        # Temel kontroller
-        if not openai_client:
-            logger.error("OpenAI istemcisi bulunamadı, API anahtarını kontrol edin")
-            raise Exception(
-                "OpenAI API istemcisi oluşturulamadı. API anahtarını kontrol edin."
-            )
+        _check_gpt_credentials(openai_client, openai_api_key)
 
-        if not openai_api_key:
-            logger.error("OpenAI API anahtarı bulunamadı")
-            raise Exception("OpenAI API anahtarı bulunamadı.")
-
-        # Ajan zinciri metni
-        agent_chain_text = " -> ".join(agent_chain)
+        log_node_event(
+            logger,
+            "GPT işlemi başlatılıyor: Ajan=%s, Model=%s",
+            agent["name"],
+            GPT_MODEL,
+        )
 
-        logger.info(f"GPT işlemi başlatılıyor: Ajan={agent['name']}")
+        # API çağrısı
+        response = complete(
+            openai_client,
+            model=GPT_MODEL,
+            messages=_build_gpt_messages(agent, input_text, agent_chain),
+            max_tokens=GPT_MAX_TOKENS,
+            temperature=GPT_TEMPERATURE,
+        )
+        end_time = time.perf_counter()
 
-        # Mesajları hazırla
-        system_message = (
-            "Aşağıdaki bilgiler ile sana bir rol verecek buna uygun net bir dil kullanarak yanıt ver."
-            + "\n\n"
-            + agent["prompt"]
+        gpt_response = response.content
+        return _format_gpt_output(
+            agent, input_text, agent_chain, gpt_response, end_time - start_time
         )
 
-        # Önceki ajanın çıktısına göre ek bağlam
-        additional_context = ""
-        if len(agent_chain) > 1:
-            additional_context = f"\n\nBu konu daha önce '{agent_chain[-2]}' ajanı tarafından işlenmiştir. Sen bir '{agent['name']}' olarak, bu konuyu daha da geliştirmelisin."
+    except LLMUnavailableError:
+        # Sağlayıcıya ulaşılamıyor; yedek metinle zincire devam etmek anlamsız
+        raise
+    except Exception as e:
+        return _format_gpt_error(agent, input_text, agent_chain, e)
 
-        # Kullanıcı mesajı
-        user_message = (
-            f"İşlenecek metin: {input_text}\n\n"
-            f"Ajanlar zinciri: {agent_chain_text}{additional_context}"
-        )
 
-        # API anahtarı ve model kontrol
-        logger.info(
-            f"API isteği öncesi: Model=gpt-4.1-mini, Anahtar={openai_api_key[:5]}..."
-        )
+async def process_gpt_agent_async(
+    agent: Dict[str, Any],
+    input_text: str,
+    agent_chain: List[str],
+    previous_agents: List[Dict[str, Any]],
+    openai_client,
+    openai_api_key: str,
+) -> Union[str, AgentOutput]:
+    """GPT ajanı işleminin asenkron sürümü (AsyncOpenAI istemcisi bekler)."""
+    start_time = time.perf_counter()
+    try:
+        _check_gpt_credentials(openai_client, openai_api_key)
 
-        # API çağrısı
-        response = openai_client.chat.completions.create(
-            model="gpt-4.1-mini",
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": user_message},
-            ],
-            max_tokens=2000,
-            temperature=0.7,
+        log_node_event(
+            logger,
+            "GPT işlemi başlatılıyor: Ajan=%s, Model=%s",
+            agent["name"],
+            GPT_MODEL,
         )
-        end_time = time.time()
-
-        # API yanıtını al
-        gpt_response = response.choices[0].message.content
 
-        logger.info(
-            f"GPT işlemi tamamlandı: Ajan={agent['name']}, Süre={(end_time - start_time):.2f} saniye"
+        response = await acomplete(
+            openai_client,
+            model=GPT_MODEL,
+            messages=_build_gpt_messages(agent, input_text, agent_chain),
+            max_tokens=GPT_MAX_TOKENS,
+            temperature=GPT_TEMPERATURE,
         )
+        end_time = time.perf_counter()
 
-        # İşleme detayları
-        processing_details = [
-            f"İşlem zamanı: {datetime.now().strftime('%H:%M:%S')}",
-            f"Ajan adı: {agent['name']}",
-            f"Ajan zinciri: {agent_chain_text}",
-            f"İşlenen metin: {input_text[:100]}...",  # Uzun metinler için kısaltma
-            f"İşlem süresi: {(end_time - start_time):.2f} saniye",
-        ]
-
-        # Teknik detaylar
-        technical_details = [
-            f"İşleme tipi: GPT ile metin işleme",
-            f"Model: gpt-4.1-mini",
-            f"Ajan sayısı: {len(agent_chain)}",
-            f"Son ajan: {agent['name']}",
-            f"Metin uzunluğu: {len(input_text)} karakter",
-            f"Yanıt uzunluğu: {len(gpt_response)} karakter",
-        ]
-
-        # Çıktı metni
-        output_text = f"Ajan '{agent['name']}' ile GPT işlemi tamamlandı\n\n"
-        output_text += "İşlem Detayları:\n"
-        output_text += "\n".join([f"- {detail}" for detail in processing_details])
-        output_text += "\n\nTeknik Bilgiler:\n"
-        output_text += "\n".join([f"- {detail}" for detail in technical_details])
-        output_text += "\n\nGPT Yanıtı:\n"
-        output_text += f'"{gpt_response}"'
-
-        # Sonuç döndür
-        logger.info(
-            f"Ajan ({agent['name']}) çıktısı oluşturuldu, uzunluk: {len(gpt_response)}"
+        gpt_response = response.content
+        return _format_gpt_output(
+            agent, input_text, agent_chain, gpt_response, end_time - start_time
         )
-        return {"output_text": output_text, "gpt_response": gpt_response}
 
+    except LLMUnavailableError:
+        # Sağlayıcıya ulaşılamıyor; yedek metinle zincire devam etmek anlamsız
+        raise
     except Exception as e:
-        logger.error(f"GPT işleminde hata: {str(e)}")
-
-        # Hata durumunda yedek işlem
-        agent_chain_text = " -> ".join(agent_chain)
-
-        processing_details = [
-            f"İşlem zamanı: {datetime.now().strftime('%H:%M:%S')}",
-            f"Ajan adı: {agent['name']}",
-            f"Ajan zinciri: {agent_chain_text}",
-            f"İşlenen metin: {input_text[:100]}...",  # Uzun metinler için kısaltma
-            f"Hata: {str(e)}",
-            f"Not: GPT işlemi başarısız olduğu için yedek işlem kullanıldı.",
-        ]
-
-        technical_details = [
-            f"İşleme tipi: Yedek işlem (GPT kullanılmadı)",
-            f"Ajan sayısı: {len(agent_chain)}",
-            f"Son ajan: {agent['name']}",
-            f"Metin uzunluğu: {len(input_text)} karakter",
-        ]
-
-        output = f"Ajan '{agent['name']}' ile işlem tamamlandı (GPT hatası)\n\n"
-        output += "İşlem Detayları:\n"
-        output += "\n".join([f"- {detail}" for detail in processing_details])
-        output += "\n\nTeknik Bilgiler:\n"
-        output += "\n".join([f"- {detail}" for detail in technical_details])
-        output += "\n\nİşlenmiş Metin:\n"
-        output += f'"{input_text[:500]}..."'  # Çok uzun metinleri kısalt
-
-        return output
+        return _format_gpt_error(agent, input_text, agent_chain, e)
+
+
+def _register_agent_call(
+    agent: Dict[str, Any],
+    input_text: str,
+    agent_chain: List[str],
+    previous_agents: Optional[List[Dict[str, Any]]],
+) -> List[Dict[str, Any]]:
+    """Ajan çağrısını loglar ve ajanı önceki ajanlar listesine ekler."""
+    # Debug bilgisi ekle
+    log_node_event(
+        logger,
+        "Ajan işlemi başlatılıyor: %s (ID: %s), girdi uzunluğu: %d, zincir: %s",
+        agent["name"],
+        agent["id"],
+        len(input_text),
+        lazy(" -> ".join, agent_chain),
+    )
+
+    # previous_agents listesini hazırla
+    if previous_agents is None:
+        previous_agents = []
+
+    # Kullanılan ajanı listeye ekle
+    current_agent_data = {
+        "id": agent["id"],
+        "name": agent["name"],
+        "prompt": agent_instructions(agent),
+    }
+    previous_agents.append(current_agent_data)
+    return previous_agents
+
+
+def _log_agent_result(agent: Dict[str, Any], result: Union[str, AgentOutput]):
+    """Ajan sonucunun tipini loglar."""
+    if isinstance(result, AgentOutput):
+        log_node_event(
+            logger, "Ajan işlemi tamamlandı: %s, GPT yanıtı alındı", agent["name"]
+        )
+    else:
+        log_node_event(
+            logger, "Ajan işlemi tamamlandı: %s, basit çıktı oluşturuldu", agent["name"]
+        )
 
 
 def process_with_agent(
@@ -333,7 +952,8 @@ def process_with_agent(
     previous_agents: List[Dict[str, Any]] = None,
     openai_client=None,
     openai_api_key: str = "",
-) -> Union[str, Dict[str, Any]]:
+    options: Optional[Dict[str, Any]] = None,
+) -> Union[str, AgentOutput]:
     """
     Metni bir ajan ile işler.
 
@@ -344,42 +964,33 @@ def process_with_agent(
         previous_agents: Önceki ajanların bilgileri
         openai_client: OpenAI API istemcisi
         openai_api_key: OpenAI API anahtarı
+        options: Düğüme özgü ayarlar (düğüm verisi; LOOP için `loop` alanı)
 
     Returns:
-        İşlenmiş metin veya işlem sonucu (dict)
+        Ajan çıktısı (AgentOutput) ya da hata/yedek durumunda metin
     """
-    # Debug bilgisi ekle
-    logger.info(f"Ajan işlemi başlatılıyor: {agent['name']} (ID: {agent['id']})")
-    logger.info(f"Girdi metni uzunluğu: {len(input_text)}")
-    logger.info(f"Ajan zinciri: {' -> '.join(agent_chain)}")
-
-    # previous_agents listesini hazırla
-    if previous_agents is None:
-        previous_agents = []
-
-    # Kullanılan ajanı listeye ekle
-    current_agent_data = {
-        "id": agent["id"],
-        "name": agent["name"],
-        "prompt": agent["prompt"],
-    }
-    previous_agents.append(current_agent_data)
+    previous_agents = _register_agent_call(
+        agent, input_text, agent_chain, previous_agents
+    )
 
     # Özel ajan tipleri için işleme
     if agent["id"] == "START":
-        logger.info("START ajanı çalıştırılıyor")
+        log_node_event(logger, "START ajanı çalıştırılıyor")
         return process_start_agent(input_text)
     elif agent["id"] == "END":
-        logger.info("END ajanı çalıştırılıyor")
+        log_node_event(logger, "END ajanı çalıştırılıyor")
         return process_end_agent(input_text, agent_chain)
     elif agent["id"] == "LOOP":
-        logger.info("LOOP ajanı çalıştırılıyor")
+        log_node_event(logger, "LOOP ajanı çalıştırılıyor")
         return process_loop_agent(
-            input_text, agent_chain, previous_agents, openai_client
+            input_text, agent_chain, previous_agents, openai_client, options
         )
+    elif agent["id"] == ROUTER_AGENT_ID:
+        log_node_event(logger, "ROUTER ajanı çalıştırılıyor")
+        return process_router_agent(input_text, openai_client, options)
 
     # Normal ajanlar için GPT bazlı işleme
-    logger.info(f"Normal GPT ajanı çalıştırılıyor: {agent['name']}")
+    log_node_event(logger, "Normal GPT ajanı çalıştırılıyor: %s", agent["name"])
     if not openai_client:
         logger.warning("OpenAI istemcisi bulunamadı, GPT işleme yapılamayacak")
 
@@ -392,9 +1003,67 @@ def process_with_agent(
     )
 
     # Sonucu logla ve döndür
-    if isinstance(result, dict) and "gpt_response" in result:
-        logger.info(f"Ajan işlemi tamamlandı: {agent['name']}, GPT yanıtı alındı")
-    else:
-        logger.info(f"Ajan işlemi tamamlandı: {agent['name']}, basit çıktı oluşturuldu")
+    _log_agent_result(agent, result)
+    return result
+
+
+async def process_with_agent_async(
+    agent: Dict[str, Any],
+    input_text: str,
+    agent_chain: List[str],
+    previous_agents: List[Dict[str, Any]] = None,
+    openai_client=None,
+    openai_api_key: str = "",
+    options: Optional[Dict[str, Any]] = None,
+) -> Union[str, AgentOutput]:
+    """
+    Metni bir ajan ile asenkron olarak işler.
+
+    `process_with_agent` ile aynı sözleşmeye sahiptir; fark olarak
+    `openai_client` bir `AsyncOpenAI` istemcisi olmalıdır ve LLM çağrıları
+    olay döngüsünü bloklamadan beklenir.
+
+    Args:
+        agent: İşlem yapacak ajan
+        input_text: İşlenecek metin
+        agent_chain: İşlem zincirindeki ajanların adları
+        previous_agents: Önceki ajanların bilgileri
+        openai_client: AsyncOpenAI API istemcisi
+        openai_api_key: OpenAI API anahtarı
+        options: Düğüme özgü ayarlar (düğüm verisi; LOOP için `loop` alanı)
+
+    Returns:
+        Ajan çıktısı (AgentOutput) ya da hata/yedek durumunda metin
+    """
+    previous_agents = _register_agent_call(
+        agent, input_text, agent_chain, previous_agents
+    )
+
+    if agent["id"] == "START":
+        log_node_event(logger, "START ajanı çalıştırılıyor")
+        return process_start_agent(input_text)
+    elif agent["id"] == "END":
+        log_node_event(logger, "END ajanı çalıştırılıyor")
+        return process_end_agent(input_text, agent_chain)
+    elif agent["id"] == "LOOP":
+        log_node_event(logger, "LOOP ajanı çalıştırılıyor")
+        return await process_loop_agent_async(
+            input_text, agent_chain, previous_agents, openai_client, options
+        )
+    elif agent["id"] == ROUTER_AGENT_ID:
+        log_node_event(logger, "ROUTER ajanı çalıştırılıyor")
+        return await process_router_agent_async(input_text, openai_client, options)
+
+    log_node_event(logger, "Normal GPT ajanı çalıştırılıyor: %s", agent["name"])
+    if not openai_client:
+        logger.warning("OpenAI istemcisi bulunamadı, GPT işleme yapılamayacak")
+
+    if not openai_api_key:
+        logger.warning("OpenAI API anahtarı bulunamadı, GPT işleme yapılamayacak")
+
+    result = await process_gpt_agent_async(
+        agent, input_text, agent_chain, previous_agents, openai_client, openai_api_key
+    )
 
+    _log_agent_result(agent, result)
     return result
@@ -1,6 +1,11 @@
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import os
-from src.utils import logger
+import threading
+import time
+from src.utils import get_logger
 
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
@@ -8,6 +13,8 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from passlib.context import CryptContext
 
+logger = get_logger(__name__)
+
 # Şifre işleme
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -16,6 +23,111 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "gizli_anahtar_burada")
 ALGORITHM = "HS256"
 
+# bcrypt işlemlerini yürüten iş parçacığı sayısı (bcrypt GIL'i bırakır)
+AUTH_HASH_WORKERS = int(
+    os.getenv("AUTH_HASH_WORKERS", str(min(4, os.cpu_count() or 1)))
+)
+
+# Doğrulanmış token önbelleğinin boyutu ve kayıt ömrü (saniye)
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "1024"))
+AUTH_TOKEN_CACHE_TTL = float(os.getenv("AUTH_TOKEN_CACHE_TTL", "60"))
+
+_hash_executor: Optional[ThreadPoolExecutor] = None
+_hash_executor_lock = threading.Lock()
+
+
+def _get_hash_executor() -> ThreadPoolExecutor:
+    global _hash_executor
+    if _hash_executor is None:
+        with _hash_executor_lock:
+            if _hash_executor is None:
+                _hash_executor = ThreadPoolExecutor(
+                    max_workers=AUTH_HASH_WORKERS, thread_name_prefix="auth-hash"
+                )
+    return _hash_executor
+
+
+async def _run_hashing(fn, *args):
+    """bcrypt işlemini sınırlı havuzda çalıştırır; olay döngüsü bloklanmaz."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_hash_executor(), fn, *args)
+
+
+class TokenCache:
+    """
+    Doğrulanmış JWT'lerden kullanıcı kimliğine kısa ömürlü LRU önbellek.
+
+    Aynı token ile gelen isteklerde imza doğrulaması ve kullanıcı araması
+    tekrarlanmaz. Kayıt ömrü `ttl` ile ve token'ın kendi bitiş zamanıyla
+    sınırlıdır; kullanıcı silinirse veya şifresi değişirse
+    `invalidate_user` ile kayıtları düşürülmelidir.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[str]:
+        """Token önbellekte ve süresi dolmamışsa kullanıcı kimliğini döndürür."""
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[token]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, token: str, user_id: str, expires_at: Optional[float] = None) -> None:
+        """
+        Doğrulanmış token'ı kaydeder.
+
+        Args:
+            token: JWT
+            user_id: Token'ın ait olduğu kullanıcı
+            expires_at: Token'ın bitiş zamanı (Unix zamanı, `exp` alanı)
+        """
+        if self.max_entries <= 0:
+            return
+        lifetime = self.ttl
+        if expires_at is not None:
+            lifetime = min(lifetime, expires_at - time.time())
+        if lifetime <= 0:
+            return
+        with self._lock:
+            self._entries[token] = (time.monotonic() + lifetime, user_id)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: str) -> int:
+        """Kullanıcının önbellekteki tüm token'larını siler."""
+        with self._lock:
+            tokens = [t for t, (_, uid) in self._entries.items() if uid == user_id]
+            for token in tokens:
+                del self._entries[token]
+        return len(tokens)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+token_cache = TokenCache(AUTH_TOKEN_CACHE_SIZE, AUTH_TOKEN_CACHE_TTL)
+
 
 def get_password_hash(password: str) -> str:
     """Kullanıcı şifresini hashler."""
@@ -27,12 +139,19 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+async def get_password_hash_async(password: str) -> str:
+    """Şifreyi iş parçacığı havuzunda hashler."""
+    return await _run_hashing(pwd_context.hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Şifreyi iş parçacığı havuzunda doğrular."""
+    return await _run_hashing(pwd_context.verify, plain_password, hashed_password)
+
+
 def get_user_by_email(email: str, db: Dict) -> Optional[Dict]:
-    """Email adresine göre kullanıcı bulur."""
-    for user in db["users"]:
-        if user["email"] == email:
-            return user
-    return None
+    """Email adresine göre kullanıcı bulur (email dizini üzerinden)."""
+    return db["users"].find_one("email", email)
 
 
 def authenticate_user(email: str, password: str, db: Dict) -> Optional[Dict]:
@@ -45,6 +164,18 @@ def authenticate_user(email: str, password: str, db: Dict) -> Optional[Dict]:
     return user
 
 
+async def authenticate_user_async(
+    email: str, password: str, db: Dict
+) -> Optional[Dict]:
+    """Kullanıcı kimliğini doğrular; bcrypt olay döngüsünü bloklamaz."""
+    user = get_user_by_email(email, db)
+    if not user:
+        return None
+    if not await verify_password_async(password, user["password"]):
+        return None
+    return user
+
+
 def create_access_token(data: Dict, expires_delta: Optional[timedelta] = None) -> str:
     """JWT token oluşturur."""
     to_encode = data.copy()
@@ -58,12 +189,24 @@ def create_access_token(data: Dict, expires_delta: Optional[timedelta] = None) -
 
 
 async def get_current_user(token: str, db: Dict) -> Dict:
-    """Token'dan kullanıcı bilgilerini getirir."""
+    """
+    Token'dan kullanıcı bilgilerini getirir.
+
+    Daha önce doğrulanmış token'lar önbellekten kimliğe göre O(1) çözülür;
+    yalnızca ilk istekte imza doğrulanır ve kullanıcı email dizininden bulunur.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Geçersiz kimlik bilgileri",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    user_id = token_cache.get(token)
+    if user_id is not None:
+        user = db["users"].get(user_id)
+        if user is not None:
+            return user
+
+    # HMAC imza doğrulaması mikrosaniyeler sürer; havuza göndermeye değmez
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
@@ -76,5 +219,6 @@ async def get_current_user(token: str, db: Dict) -> Dict:
     if user is None:
         raise credentials_exception
 
-    logger.info(f"Kullanıcı kimliği doğrulandı: {email}")
+    token_cache.set(token, user["id"], payload.get("exp"))
+    logger.info("Kullanıcı kimliği doğrulandı: %s", email)
     return user
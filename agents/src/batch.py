@@ -0,0 +1,158 @@
+from typing import (
+    Dict,
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Iterator,
+    Optional,
+    Union,
+)
+import asyncio
+import json
+import os
+import time
+from src.utils import get_logger
+
+logger = get_logger(__name__)
+
+# Bir toplu yürütmede aynı anda işlenen en fazla girdi
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+
+
+def _batch_item(index: int, value: Any) -> Dict[str, Any]:
+    """Tek bir girdiyi (metin veya {"id", "input_text"} nesnesi) kayda dönüştürür."""
+    if isinstance(value, str):
+        return {"index": index, "id": None, "input_text": value}
+    if isinstance(value, dict) and isinstance(value.get("input_text"), str):
+        return {
+            "index": index,
+            "id": value.get("id"),
+            "input_text": value["input_text"],
+        }
+    return {
+        "index": index,
+        "id": value.get("id") if isinstance(value, dict) else None,
+        "error": "Girdi bir metin ya da 'input_text' alanı olan bir nesne olmalı",
+    }
+
+
+def batch_items(inputs: Iterable[Any]) -> Iterator[Dict[str, Any]]:
+    """İstek gövdesindeki girdileri sıra numaralı kayıtlara dönüştürür."""
+    for index, value in enumerate(inputs):
+        yield _batch_item(index, value)
+
+
+def batch_items_from_jsonl(
+    lines: Iterable[Union[str, bytes]],
+) -> Iterator[Dict[str, Any]]:
+    """
+    JSONL satırlarını tembel olarak girdi kayıtlarına dönüştürür.
+
+    Her satır bir JSON metni ya da {"id", "input_text"} nesnesi olmalıdır; boş
+    satırlar atlanır, bozuk satırlar hata kaydı olarak döner.
+    """
+    index = 0
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            value = json.loads(line)
+        except ValueError as e:
+            yield {
+                "index": index,
+                "id": None,
+                "error": f"Geçersiz JSON satırı: {str(e)}",
+            }
+        else:
+            yield _batch_item(index, value)
+        index += 1
+
+
+def _final_output(result: Dict[str, Any]) -> Any:
+    results = result.get("results") or []
+    return results[-1]["output"] if results else None
+
+
+async def run_batch(
+    items: Iterable[Dict[str, Any]],
+    run_item: Callable[[str], Awaitable[Dict[str, Any]]],
+    max_concurrency: Optional[int] = None,
+    include_results: bool = False,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Girdileri sınırlı eşzamanlılıkla yürütür ve sonuçları bitiş sırasıyla verir.
+
+    Girdiler kayan bir pencereyle tüketilir; aynı anda en fazla
+    `max_concurrency` görev bulunur, bu yüzden çok büyük girdi listeleri de
+    bellekte görev birikmesine yol açmaz.
+
+    Args:
+        items: `batch_items` veya `batch_items_from_jsonl` ile üretilen kayıtlar
+        run_item: Giriş metnini alıp iş akışı sonucunu döndüren fonksiyon
+        max_concurrency: Aynı anda işlenecek en fazla girdi
+        include_results: Her kayda düğüm bazlı sonuçları da ekle
+
+    Yields:
+        Her girdi için index, id, status, execution_time, output ve hata
+        durumunda error alanlarını içeren kayıt
+    """
+    limit = max(1, max_concurrency or BATCH_MAX_CONCURRENCY)
+
+    async def execute(item: Dict[str, Any]) -> Dict[str, Any]:
+        record = {"index": item["index"], "id": item["id"]}
+        if "error" in item:
+            return {**record, "status": "invalid", "error": item["error"]}
+
+        start_time = time.perf_counter()
+        try:
+            result = await run_item(item["input_text"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Toplu yürütme girdisi başarısız (%d): %s", item["index"], e)
+            return {
+                **record,
+                "status": "failed",
+                "execution_time": time.perf_counter() - start_time,
+                "error": str(e),
+            }
+
+        record.update(
+            status=result["status"],
+            execution_time=time.perf_counter() - start_time,
+            output=_final_output(result),
+        )
+        if include_results:
+            record["results"] = result["results"]
+        return record
+
+    iterator = iter(items)
+    running: set = set()
+    completed = 0
+    try:
+        while True:
+            for item in iterator:
+                running.add(asyncio.create_task(execute(item)))
+                if len(running) >= limit:
+                    break
+            if not running:
+                break
+
+            done, running = await asyncio.wait(
+                running, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                completed += 1
+                yield task.result()
+    finally:
+        # İstemci ayrıldıysa kalan girdiler için LLM çağrısı yapılmasın
+        for task in running:
+            task.cancel()
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+        logger.info("Toplu yürütme bitti, tamamlanan girdi sayısı: %d", completed)
@@ -0,0 +1,202 @@
+from typing import Dict, List, Any, Tuple
+from dataclasses import dataclass, replace
+import os
+from src.utils import get_logger
+from src.llm import acomplete
+from src.metrics import FALLBACKS
+
+logger = get_logger(__name__)
+
+try:
+    import tiktoken
+except ImportError:  # İsteğe bağlı; yoksa karakter tabanlı tahmin kullanılır
+    tiktoken = None
+
+# Desteklenen bağlam stratejileri
+STRATEGIES = ("none", "truncate", "keep_last_n", "summarize")
+
+# Tahmin için ortalama karakter/token oranı (tiktoken yoksa)
+CHARS_PER_TOKEN = 4
+
+# Kısaltılan metne eklenen işaret
+TRUNCATION_MARKER = "\n\n[... {count} token kısaltıldı ...]\n\n"
+
+# Birleştirilmiş ebeveyn çıktıları ve paragraflar arasındaki ayraç
+SECTION_SEPARATOR = "\n\n"
+
+_encoding = None
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None and tiktoken is not None:
+        _encoding = tiktoken.get_encoding("o200k_base")
+    return _encoding
+
+
+def estimate_tokens(text: str) -> int:
+    """Metnin token sayısını tahmin eder (tiktoken varsa tam sayım yapar)."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _head(text: str, max_tokens: int) -> str:
+    encoding = _get_encoding()
+    if encoding is not None:
+        return encoding.decode(
+            encoding.encode(text, disallowed_special=())[:max_tokens]
+        )
+    return text[: max_tokens * CHARS_PER_TOKEN]
+
+
+def _tail(text: str, max_tokens: int) -> str:
+    if max_tokens <= 0:
+        return ""
+    encoding = _get_encoding()
+    if encoding is not None:
+        return encoding.decode(
+            encoding.encode(text, disallowed_special=())[-max_tokens:]
+        )
+    return text[-max_tokens * CHARS_PER_TOKEN :]
+
+
+def truncate_text(text: str, max_tokens: int) -> str:
+    """
+    Metni token bütçesine sığacak şekilde ortasından kısaltır.
+
+    Başlangıç (görevin tanımı) ve son kısım (en güncel içerik) korunur;
+    bütçenin dörtte biri başa, kalanı sona ayrılır.
+    """
+    total = estimate_tokens(text)
+    if total <= max_tokens:
+        return text
+    marker = TRUNCATION_MARKER.format(count=total - max_tokens)
+    # İşaretin kendisi de bütçeden düşülür
+    budget = max(0, max_tokens - estimate_tokens(marker))
+    head_tokens = budget // 4
+    tail_tokens = budget - head_tokens
+    return _head(text, head_tokens) + marker + _tail(text, tail_tokens)
+
+
+def keep_last_sections(text: str, keep_last: int) -> str:
+    """Metni bölümlere (boş satırla ayrılmış) ayırıp son `keep_last` bölümü tutar."""
+    sections = [section for section in text.split(SECTION_SEPARATOR) if section]
+    if len(sections) <= keep_last:
+        return text
+    dropped = len(sections) - keep_last
+    kept = SECTION_SEPARATOR.join(sections[-keep_last:])
+    return f"[... önceki {dropped} bölüm çıkarıldı ...]{SECTION_SEPARATOR}{kept}"
+
+
+def _summary_messages(text: str, max_tokens: int) -> List[Dict[str, str]]:
+    return [
+        {
+            "role": "system",
+            "content": (
+                "Sana verilen metni, sonraki bir ajanın işine devam edebileceği "
+                "şekilde özetle. Önemli bulguları, kararları ve açık soruları "
+                f"koru. Özet en fazla yaklaşık {max_tokens} token olsun."
+            ),
+        },
+        {"role": "user", "content": text},
+    ]
+
+
+@dataclass(frozen=True)
+class ContextBudget:
+    """
+    Düğümler arasında aktarılan metnin token bütçesi.
+
+    Bir düğümün girdisi bütçeyi aşarsa seçilen strateji uygulanır:
+        none: Metin olduğu gibi aktarılır
+        truncate: Metnin ortası kısaltılır
+        keep_last_n: Son `keep_last` bölüm tutulur, gerekirse kısaltılır
+        summarize: Ucuz bir modelle özetlenir; hata olursa kısaltılır
+
+    Ortam değişkenleri (varsayılanlar):
+        CONTEXT_STRATEGY: Strateji (none)
+        CONTEXT_MAX_TOKENS: Düğüm girdisi için token bütçesi (8000)
+        CONTEXT_KEEP_LAST: keep_last_n için tutulacak bölüm sayısı (3)
+        CONTEXT_SUMMARY_MODEL: Özetleme modeli (gpt-4o-mini)
+    """
+
+    strategy: str = "none"
+    max_tokens: int = 8000
+    keep_last: int = 3
+    summary_model: str = "gpt-4o-mini"
+
+    @classmethod
+    def from_env(cls) -> "ContextBudget":
+        return cls(
+            strategy=os.getenv("CONTEXT_STRATEGY", "none"),
+            max_tokens=int(os.getenv("CONTEXT_MAX_TOKENS", "8000")),
+            keep_last=int(os.getenv("CONTEXT_KEEP_LAST", "3")),
+            summary_model=os.getenv("CONTEXT_SUMMARY_MODEL", "gpt-4o-mini"),
+        )
+
+    def override(self, **fields: Any) -> "ContextBudget":
+        """None olmayan alanları değiştirilmiş yeni bir bütçe döndürür."""
+        return replace(
+            self, **{name: value for name, value in fields.items() if value is not None}
+        )
+
+    async def apply(
+        self, text: str, openai_client: Any = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Stratejiyi metne uygular.
+
+        Args:
+            text: Düğüme aktarılacak metin
+            openai_client: Özetleme için AsyncOpenAI istemcisi
+
+        Returns:
+            (bütçeye uygun metin, uygulanan işlemin raporu)
+        """
+        original = estimate_tokens(text)
+        report: Dict[str, Any] = {
+            "strategy": "none",
+            "original_tokens": original,
+            "tokens": original,
+        }
+        if self.strategy == "none" or original <= self.max_tokens:
+            return text, report
+
+        applied = self.strategy
+        if self.strategy == "keep_last_n":
+            text = keep_last_sections(text, self.keep_last)
+        elif self.strategy == "summarize":
+            try:
+                text = await self._summarize(text, openai_client)
+            except Exception as e:
+                logger.warning("Bağlam özetlenemedi, kısaltılıyor: %s", e)
+                FALLBACKS.labels("context_truncate").inc()
+                applied = "truncate"
+
+        text = truncate_text(text, self.max_tokens)
+        report.update(strategy=applied, tokens=estimate_tokens(text))
+        logger.info(
+            "Bağlam bütçesi uygulandı (%s): %d -> %d token",
+            applied,
+            original,
+            report["tokens"],
+        )
+        return text, report
+
+    async def _summarize(self, text: str, openai_client: Any) -> str:
+        if openai_client is None:
+            raise ValueError("Özetleme için OpenAI istemcisi gerekli")
+        # Özetlenecek metin de bütçeli: modelin bağlamını aşmaması için kısaltılır
+        source = truncate_text(text, self.max_tokens * 4)
+        response = await acomplete(
+            openai_client,
+            model=self.summary_model,
+            messages=_summary_messages(source, self.max_tokens),
+            temperature=0,
+            max_tokens=self.max_tokens,
+        )
+        return response.content
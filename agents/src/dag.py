@@ -0,0 +1,253 @@
+from typing import Dict, List, Any, Awaitable, Callable, Iterable, Optional, Set, Tuple
+from collections import deque
+import asyncio
+import os
+import time
+from src.utils import get_logger
+from src.plan import WorkflowPlan
+from src.metrics import NODE_QUEUE_WAIT_SECONDS
+
+logger = get_logger(__name__)
+
+# Bir yürütme içinde aynı anda çalışabilecek varsayılan düğüm sayısı
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("WORKFLOW_MAX_CONCURRENCY", "4"))
+
+# Birden fazla ebeveyni olan düğümlerde çıktılar arasına konan ayraç
+JOIN_SEPARATOR = "\n\n"
+
+
+class NodeRunState:
+    """Bir düğümün yürütme sonrası durumu."""
+
+    __slots__ = (
+        "input_text",
+        "output_text",
+        "result",
+        "path",
+        "agent_entry",
+        "parents",
+        "started_at",
+        "finished_at",
+    )
+
+    def __init__(
+        self,
+        input_text: str,
+        output_text: str,
+        result: Any,
+        path: List[str],
+        agent_entry: Optional[Dict[str, Any]],
+        parents: Tuple[str, ...] = (),
+        started_at: float = 0.0,
+        finished_at: float = 0.0,
+    ):
+        self.input_text = input_text
+        self.output_text = output_text
+        self.result = result
+        self.path = path
+        self.agent_entry = agent_entry
+        self.parents = parents
+        self.started_at = started_at
+        self.finished_at = finished_at
+
+    @property
+    def execution_time(self) -> float:
+        return self.finished_at - self.started_at
+
+
+class WorkflowRun(Dict[str, NodeRunState]):
+    """
+    Bir plan yürütmesinin sonucu: düğüm kimliğinden düğüm durumuna eşleme.
+
+    Seçilmeyen dallardaki düğümler eşlemede yer almaz; `skipped` listesinde
+    atlanma sırasıyla tutulur.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.skipped: List[str] = []
+
+
+def reachable_from(plan: WorkflowPlan, node_id: str) -> Set[str]:
+    """Düğümden (kendisi dahil) kenarlar boyunca ulaşılabilen düğümleri döndürür."""
+    reached = {node_id}
+    queue = deque([node_id])
+    while queue:
+        for target in plan.successors[queue.popleft()]:
+            if target not in reached:
+                reached.add(target)
+                queue.append(target)
+    return reached
+
+
+def _merge_parent_inputs(
+    plan: WorkflowPlan, parents: List[str], states: Dict[str, NodeRunState]
+) -> str:
+    """Birden fazla ebeveynin çıktısını tek bir giriş metninde birleştirir."""
+    if len(parents) == 1:
+        return states[parents[0]].output_text
+
+    sections = [
+        f"[{plan.label(parent)}]\n{states[parent].output_text}" for parent in parents
+    ]
+    return JOIN_SEPARATOR.join(sections)
+
+
+def _merge_parent_paths(
+    parents: List[str], states: Dict[str, NodeRunState]
+) -> List[str]:
+    """Ebeveyn yollarını ortak ataları tekrarlamadan birleştirir."""
+    if len(parents) == 1:
+        return list(states[parents[0]].path)
+
+    merged: Dict[str, None] = {}
+    for parent in parents:
+        for node_id in states[parent].path:
+            merged[node_id] = None
+    return list(merged)
+
+
+async def run_workflow_plan(
+    plan: WorkflowPlan,
+    input_text: str,
+    run_node: Callable[
+        [Dict[str, Any], str, List[str], List[Dict[str, Any]]], Awaitable[Any]
+    ],
+    output_of: Callable[[Any], str],
+    max_concurrency: Optional[int] = None,
+    prepare_input: Optional[Callable[[Dict[str, Any], str], Awaitable[str]]] = None,
+    select_successors: Optional[Callable[[Any], Optional[Iterable[str]]]] = None,
+) -> WorkflowRun:
+    """
+    Derlenmiş iş akışı planını bağımlılıklarına göre eşzamanlı olarak yürütür.
+
+    Öncülleri tamamlanan her düğüm hemen başlatılır; birbirinden bağımsız
+    dallar paralel ilerler ve toplam süre kritik yolu takip eder.
+
+    Bir düğüm (ör. yönlendirici) ardıllarının yalnızca bir kısmını seçerse
+    seçilmeyen kenarlar pasif olur. Hiç aktif gelen kenarı kalmayan düğümler
+    çalıştırılmadan atlanır ve atlanma ardıllarına yayılır; birden fazla
+    ebeveyni olan düğümler yalnızca aktif ebeveynlerinin çıktısını alır.
+
+    Args:
+        plan: Yürütülecek derlenmiş iş akışı planı
+        input_text: Kök düğümlere verilecek giriş metni
+        run_node: (düğüm, giriş metni, ajan zinciri, önceki ajanlar) alan
+            ve düğüm sonucunu döndüren beklenebilir fonksiyon
+        output_of: Düğüm sonucundan ardıllara aktarılacak metni çıkaran fonksiyon
+        max_concurrency: Aynı anda çalışabilecek en fazla düğüm sayısı
+        prepare_input: Verilirse ebeveyni olan düğümlerin girdisi düğüm
+            çalışmadan önce bu fonksiyondan geçirilir (ör. bağlam bütçesi)
+        select_successors: Düğüm sonucundan çalışacak ardılları döndüren
+            fonksiyon; None dönerse tüm ardıllar çalışır
+
+    Returns:
+        Düğüm durumları ve atlanan düğümler
+    """
+    limit = max(1, max_concurrency or DEFAULT_MAX_CONCURRENCY)
+    in_degree = {node_id: len(preds) for node_id, preds in plan.predecessors.items()}
+    active_parents: Dict[str, Set[str]] = {node_id: set() for node_id in plan.order}
+    states = WorkflowRun()
+
+    ready = deque(node_id for node_id in plan.order if in_degree[node_id] == 0)
+    ready_at = dict.fromkeys(ready, time.perf_counter())
+    running: Dict[asyncio.Task, str] = {}
+
+    def release(node_id: str) -> None:
+        """Düğümün bir gelen kenarını tamamlar; düğüm hazırsa kuyruğa alır."""
+        pending = [node_id]
+        while pending:
+            target = pending.pop()
+            in_degree[target] -= 1
+            if in_degree[target]:
+                continue
+            if active_parents[target]:
+                ready.append(target)
+                ready_at[target] = time.perf_counter()
+            else:
+                # Tüm ebeveynleri atlandı veya bu dalı seçmedi
+                states.skipped.append(target)
+                pending.extend(plan.successors[target])
+
+    async def execute(node_id: str) -> Tuple[str, NodeRunState]:
+        started_at = time.perf_counter()
+        # Eşzamanlılık sınırı nedeniyle hazır kuyruğunda geçen süre
+        NODE_QUEUE_WAIT_SECONDS.observe(started_at - ready_at[node_id])
+        parents = tuple(
+            parent
+            for parent in plan.predecessors[node_id]
+            if parent in active_parents[node_id]
+        )
+        if parents:
+            node_input = _merge_parent_inputs(plan, parents, states)
+            path = _merge_parent_paths(parents, states)
+            if prepare_input is not None:
+                node_input = await prepare_input(plan.node_by_id[node_id], node_input)
+        else:
+            node_input = input_text
+            path = []
+
+        agent_chain = [plan.label(parent_id) for parent_id in path]
+        previous_agents = [
+            states[parent_id].agent_entry
+            for parent_id in path
+            if states[parent_id].agent_entry is not None
+        ]
+        known_agents = len(previous_agents)
+
+        result = await run_node(
+            plan.node_by_id[node_id], node_input, agent_chain, previous_agents
+        )
+
+        # Ajan işleme fonksiyonu çalıştırdığı ajanı listeye ekler
+        agent_entry = (
+            previous_agents[-1] if len(previous_agents) > known_agents else None
+        )
+        return node_id, NodeRunState(
+            input_text=node_input,
+            output_text=output_of(result),
+            result=result,
+            path=path + [node_id],
+            agent_entry=agent_entry,
+            parents=parents,
+            started_at=started_at,
+            finished_at=time.perf_counter(),
+        )
+
+    try:
+        while ready or running:
+            while ready and len(running) < limit:
+                node_id = ready.popleft()
+                running[asyncio.create_task(execute(node_id))] = node_id
+
+            done, _ = await asyncio.wait(
+                list(running), return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                running.pop(task)
+                node_id, state = task.result()
+                states[node_id] = state
+
+                selected = (
+                    select_successors(state.result)
+                    if select_successors is not None
+                    else None
+                )
+                for target in plan.successors[node_id]:
+                    if selected is None or target in selected:
+                        active_parents[target].add(node_id)
+                    release(target)
+    finally:
+        # Hata veya iptal durumunda yarım kalan düğümleri durdur
+        for task in running:
+            task.cancel()
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+
+    if states.skipped:
+        logger.info("Seçilmeyen dallarda atlanan düğüm sayısı: %d", len(states.skipped))
+    not_run = len(plan.node_by_id) - len(states) - len(states.skipped)
+    if not_run:
+        logger.warning("Döngü nedeniyle çalıştırılamayan düğüm sayısı: %d", not_run)
+
+    return states
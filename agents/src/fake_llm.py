@@ -0,0 +1,369 @@
+from typing import Dict, List, Any, AsyncIterator, Iterator, Optional, Tuple
+from dataclasses import dataclass
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import uuid
+import httpx
+
+# Sahte sağlayıcının istemcilere verilen adresi (ağa hiç çıkılmaz)
+FAKE_BASE_URL = "http://fake-llm.local/v1"
+
+# Sahte yanıtlarda kullanılan kelimeler
+VOCABULARY = (
+    "yapay zeka ajan iş akışı model veri analiz sonuç yöntem süreç sistem "
+    "araştırma bilgi kavram örnek uygulama yaklaşım gelişim çözüm öneri "
+    "değerlendirme performans ölçüm deney tasarım mimari katman bağlam "
+    "strateji hedef kaynak öncelik risk fırsat etki kalite maliyet zaman"
+).split()
+
+# İstem içindeki JSON şablonunun alanları: "anahtar": { | "metin" | true/false
+_TEMPLATE_FIELD = re.compile(r'"(\w+)"\s*:\s*(\{|"[^"\n]*"|[^,}\n]+)')
+
+
+@dataclass(frozen=True)
+class FakeLLMConfig:
+    """
+    Sahte LLM sağlayıcısının davranışı.
+
+    Ortam değişkenleri (varsayılanlar):
+        FAKE_LLM_LATENCY_DIST: İlk token gecikmesinin dağılımı; fixed,
+            uniform, lognormal veya exponential (lognormal)
+        FAKE_LLM_LATENCY_MS: Gecikmenin medyanı/ortalaması, ms (300)
+        FAKE_LLM_LATENCY_SPREAD: uniform için ± oran, lognormal için sigma (0.5)
+        FAKE_LLM_TOKENS_PER_SEC: Üretim hızı; 0 ise anında (50)
+        FAKE_LLM_COMPLETION_TOKENS: Yanıt uzunluğu, `max_tokens` ile sınırlı (150)
+        FAKE_LLM_ERROR_RATE: 500 hatası dönme olasılığı (0)
+        FAKE_LLM_429_RATE: 429 (kota) hatası dönme olasılığı (0)
+        FAKE_LLM_RETRY_AFTER: 429 yanıtlarındaki Retry-After, sn (1)
+        FAKE_LLM_SEED: Gecikme ve hata örneklemesinin tohumu (0)
+    """
+
+    latency_dist: str = "lognormal"
+    latency_ms: float = 300.0
+    latency_spread: float = 0.5
+    tokens_per_sec: float = 50.0
+    completion_tokens: int = 150
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: float = 1.0
+    seed: int = 0
+
+    @classmethod
+    def from_env(cls) -> "FakeLLMConfig":
+        return cls(
+            latency_dist=os.getenv("FAKE_LLM_LATENCY_DIST", "lognormal"),
+            latency_ms=float(os.getenv("FAKE_LLM_LATENCY_MS", "300")),
+            latency_spread=float(os.getenv("FAKE_LLM_LATENCY_SPREAD", "0.5")),
+            tokens_per_sec=float(os.getenv("FAKE_LLM_TOKENS_PER_SEC", "50")),
+            completion_tokens=int(os.getenv("FAKE_LLM_COMPLETION_TOKENS", "150")),
+            error_rate=float(os.getenv("FAKE_LLM_ERROR_RATE", "0")),
+            rate_limit_rate=float(os.getenv("FAKE_LLM_429_RATE", "0")),
+            retry_after=float(os.getenv("FAKE_LLM_RETRY_AFTER", "1")),
+            seed=int(os.getenv("FAKE_LLM_SEED", "0")),
+        )
+
+
+def _request_digest(body: Dict[str, Any]) -> bytes:
+    """Yanıt içeriğini belirleyen alanların özeti (aynı istek aynı yanıtı alır)."""
+    key = {
+        name: body.get(name)
+        for name in ("model", "messages", "temperature", "max_tokens")
+    }
+    return hashlib.sha256(
+        json.dumps(key, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    ).digest()
+
+
+def _words(rng: random.Random, count: int) -> str:
+    return " ".join(rng.choice(VOCABULARY) for _ in range(max(1, count)))
+
+
+def _matching_brace(text: str, start: int) -> int:
+    depth = 0
+    for index in range(start, len(text)):
+        if text[index] == "{":
+            depth += 1
+        elif text[index] == "}":
+            depth -= 1
+            if depth == 0:
+                return index
+    return len(text)
+
+
+def _fill_template(template: str, rng: random.Random) -> Dict[str, Any]:
+    """İstemdeki JSON şablonunun alanlarını belirlenimci değerlerle doldurur."""
+    result: Dict[str, Any] = {}
+    position = 0
+    while True:
+        match = _TEMPLATE_FIELD.search(template, position)
+        if match is None:
+            return result
+        key, value = match.groups()
+        if value == "{":
+            end = _matching_brace(template, match.end() - 1)
+            result[key] = _fill_template(template[match.end() : end], rng)
+            position = end + 1
+            continue
+        if "true" in value or "false" in value:
+            result[key] = rng.random() < 0.5
+        else:
+            result[key] = _words(rng, rng.randint(4, 24)).capitalize()
+        position = match.end()
+
+
+def fake_completion(body: Dict[str, Any], config: FakeLLMConfig) -> str:
+    """
+    İstek için belirlenimci bir yanıt metni üretir.
+
+    JSON istenirse (response_format veya istemde "JSON" geçmesi) istemdeki
+    şablonun alanlarını içeren geçerli bir JSON nesnesi döner.
+    """
+    rng = random.Random(_request_digest(body))
+    messages = body.get("messages") or []
+    prompt = "\n".join(str(message.get("content") or "") for message in messages)
+    wants_json = (body.get("response_format") or {}).get(
+        "type"
+    ) == "json_object" or "JSON" in prompt
+    if wants_json:
+        start = prompt.find("{")
+        template = (
+            prompt[start : _matching_brace(prompt, start) + 1] if start >= 0 else ""
+        )
+        payload = _fill_template(template, rng) or {"response": _words(rng, 12)}
+        return json.dumps(payload, ensure_ascii=False)
+
+    limit = body.get("max_tokens") or config.completion_tokens
+    return _words(rng, min(config.completion_tokens, limit))
+
+
+class _FakeProvider:
+    """Sahte sağlayıcının ortak durumu (örnekleme ve yanıt üretimi)."""
+
+    def __init__(self, config: FakeLLMConfig):
+        self.config = config
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+
+    def _sample(self) -> Tuple[float, float]:
+        """(ilk token gecikmesi sn, hata örneklemesi için [0, 1) değer)."""
+        config = self.config
+        with self._lock:
+            roll = self._rng.random()
+            if config.latency_ms <= 0:
+                latency = 0.0
+            elif config.latency_dist == "fixed":
+                latency = config.latency_ms
+            elif config.latency_dist == "uniform":
+                latency = config.latency_ms * self._rng.uniform(
+                    1 - config.latency_spread, 1 + config.latency_spread
+                )
+            elif config.latency_dist == "exponential":
+                latency = self._rng.expovariate(1 / config.latency_ms)
+            else:
+                latency = config.latency_ms * math.exp(
+                    self._rng.gauss(0, config.latency_spread)
+                )
+        return max(latency, 0.0) / 1000, roll
+
+    def _error_response(self, roll: float) -> Optional[httpx.Response]:
+        config = self.config
+        if roll < config.rate_limit_rate:
+            return httpx.Response(
+                429,
+                headers={"retry-after": str(config.retry_after)},
+                json={
+                    "error": {
+                        "message": "Sahte sağlayıcı: kota aşıldı",
+                        "type": "rate_limit_exceeded",
+                    }
+                },
+            )
+        if roll < config.rate_limit_rate + config.error_rate:
+            return httpx.Response(
+                500,
+                json={
+                    "error": {
+                        "message": "Sahte sağlayıcı: sunucu hatası",
+                        "type": "server_error",
+                    }
+                },
+            )
+        return None
+
+    def prepare(
+        self, request: httpx.Request
+    ) -> Tuple[float, Optional[httpx.Response], Dict[str, Any], str]:
+        """İsteği çözümler: (gecikme, hata yanıtı, istek gövdesi, yanıt metni)."""
+        if request.method != "POST" or not request.url.path.endswith(
+            "/chat/completions"
+        ):
+            response = httpx.Response(
+                404,
+                json={
+                    "error": {
+                        "message": f"Sahte sağlayıcı bu uç noktayı desteklemiyor: {request.url.path}",
+                        "type": "invalid_request_error",
+                    }
+                },
+            )
+            return 0.0, response, {}, ""
+
+        latency, roll = self._sample()
+        error = self._error_response(roll)
+        if error is not None:
+            return latency, error, {}, ""
+        body = json.loads(request.content or b"{}")
+        return latency, None, body, fake_completion(body, self.config)
+
+    def generation_delay(self, tokens: int) -> float:
+        if self.config.tokens_per_sec <= 0:
+            return 0.0
+        return tokens / self.config.tokens_per_sec
+
+    def completion(self, body: Dict[str, Any], content: str) -> httpx.Response:
+        return httpx.Response(
+            200,
+            json={
+                "id": f"chatcmpl-fake-{uuid.uuid4().hex[:12]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "fake"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": _usage(body, content),
+            },
+        )
+
+    def stream_events(self, body: Dict[str, Any], content: str) -> List[bytes]:
+        """Akış yanıtının SSE olaylarını (kelime başına bir parça) döndürür."""
+        completion_id = f"chatcmpl-fake-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        model = body.get("model", "fake")
+
+        def chunk(delta: Dict[str, Any], finish_reason=None, usage=None) -> bytes:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": (
+                    []
+                    if usage is not None
+                    else [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+                ),
+            }
+            if usage is not None:
+                payload["usage"] = usage
+            return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode()
+
+        words = content.split(" ")
+        events = [chunk({"role": "assistant", "content": ""})]
+        events.extend(
+            chunk({"content": word if index == 0 else f" {word}"})
+            for index, word in enumerate(words)
+        )
+        events.append(chunk({}, finish_reason="stop"))
+        if (body.get("stream_options") or {}).get("include_usage"):
+            events.append(chunk({}, usage=_usage(body, content)))
+        events.append(b"data: [DONE]\n\n")
+        return events
+
+
+def _usage(body: Dict[str, Any], content: str) -> Dict[str, int]:
+    prompt_chars = sum(
+        len(str(message.get("content") or "")) for message in body.get("messages", [])
+    )
+    prompt_tokens = max(1, prompt_chars // 4)
+    completion_tokens = len(content.split())
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+class _SyncStream(httpx.SyncByteStream):
+    def __init__(self, events: List[bytes], delay: float):
+        self.events = events
+        self.delay = delay
+
+    def __iter__(self) -> Iterator[bytes]:
+        for event in self.events:
+            if self.delay:
+                time.sleep(self.delay)
+            yield event
+
+
+class _AsyncStream(httpx.AsyncByteStream):
+    def __init__(self, events: List[bytes], delay: float):
+        self.events = events
+        self.delay = delay
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        for event in self.events:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            yield event
+
+
+class FakeLLMTransport(httpx.BaseTransport):
+    """
+    Sohbet tamamlama API'sini taklit eden senkron httpx taşıyıcısı.
+
+    OpenAI SDK'sı bu taşıyıcıyla olduğu gibi kullanılır; hata türleri,
+    Retry-After başlıkları ve akış yanıtları gerçek istemci kodundan geçer.
+    """
+
+    def __init__(self, config: Optional[FakeLLMConfig] = None):
+        self.provider = _FakeProvider(config or FakeLLMConfig.from_env())
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        latency, error, body, content = self.provider.prepare(request)
+        time.sleep(latency)
+        if error is not None:
+            return error
+        if body.get("stream"):
+            events = self.provider.stream_events(body, content)
+            delay = self.provider.generation_delay(1)
+            return httpx.Response(
+                200,
+                headers={"content-type": "text/event-stream"},
+                stream=_SyncStream(events, delay),
+            )
+        time.sleep(self.provider.generation_delay(len(content.split())))
+        return self.provider.completion(body, content)
+
+
+class AsyncFakeLLMTransport(httpx.AsyncBaseTransport):
+    """`FakeLLMTransport`'un olay döngüsünü bloklamayan asenkron sürümü."""
+
+    def __init__(self, config: Optional[FakeLLMConfig] = None):
+        self.provider = _FakeProvider(config or FakeLLMConfig.from_env())
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        latency, error, body, content = self.provider.prepare(request)
+        await asyncio.sleep(latency)
+        if error is not None:
+            return error
+        if body.get("stream"):
+            events = self.provider.stream_events(body, content)
+            delay = self.provider.generation_delay(1)
+            return httpx.Response(
+                200,
+                headers={"content-type": "text/event-stream"},
+                stream=_AsyncStream(events, delay),
+            )
+        await asyncio.sleep(self.provider.generation_delay(len(content.split())))
+        return self.provider.completion(body, content)
@@ -0,0 +1,577 @@
+from typing import Dict, List, Any, Awaitable, Callable, Optional, Set, Tuple
+from datetime import datetime, timedelta
+import asyncio
+import os
+import socket
+import time
+import uuid
+from src.utils import get_logger
+from src.metrics import JOB_QUEUE_WAIT_SECONDS
+
+logger = get_logger(__name__)
+
+# Aynı anda yürütülebilecek en fazla iş (işçi sayısı)
+JOB_MAX_WORKERS = int(os.getenv("JOB_MAX_WORKERS", "4"))
+
+# Bir kiracının aynı anda yürütebileceği en fazla iş; 0 sınırsız. Kiracı,
+# isteğin X-Tenant-ID başlığından ya da iş akışının sahibinden belirlenir.
+JOB_MAX_PER_TENANT = int(os.getenv("JOB_MAX_PER_TENANT", "2"))
+
+# Kiracısı belirlenemeyen işlerin ortak anahtarı; bu işlere sınır uygulanmaz
+DEFAULT_TENANT = "anonymous"
+
+# Çalışan işin tamamlanan düğüm sonuçlarının depoya yazılma aralığı (saniye);
+# her düğümde tüm kaydı yeniden yazmamak için yazmalar birleştirilir
+JOB_PROGRESS_INTERVAL = float(os.getenv("JOB_PROGRESS_INTERVAL", "1"))
+
+# İşçi sürecinin kalp atışı bu süre boyunca gelmezse işleri başka bir
+# süreç devralır (saniye)
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "30"))
+
+# Paylaşılan durumdaki kalp atışı anahtarlarının öneki
+WORKER_KEY_PREFIX = "jobs.worker:"
+
+# Eşzamanlı yazma çakışmasında bir iş kaydının yeniden yazılma denemesi
+JOB_WRITE_RETRIES = 5
+
+
+class JobStatus:
+    """İş durumları."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    TERMINAL = frozenset({SUCCEEDED, FAILED, CANCELLED})
+
+
+# İşi yürüten fonksiyon: (iş kaydı, olay yayıcı) alır ve iş akışı sonucunu döndürür
+JobRunner = Callable[
+    [Dict[str, Any], Callable[[str, Dict[str, Any]], None]],
+    Awaitable[Dict[str, Any]],
+]
+
+
+class JobManager:
+    """
+    Arka planda iş akışı yürüten sınırlı iş kuyruğu.
+
+    İşler depodaki `runs` koleksiyonunda tutulur; böylece süreç yeniden
+    başlatıldığında kuyruktaki ve yarıda kalan işler yeniden kuyruğa alınır.
+    Sabit sayıda işçi görevi kuyruğu tüketir; `max_per_tenant` verilirse bir
+    kiracının aynı anda çalışan iş sayısı sınırlanır, sırası gelen iş bu
+    sınıra takılırsa sonraki kiracıların işleri öne geçer. Kiracısı
+    belirlenemeyen işler (`DEFAULT_TENANT`) sınırlanmaz.
+
+    Depo okuma ve yazmaları iş parçacığı havuzunda yapılır; olay döngüsü
+    veritabanı kilitlerini beklemez. Bellekteki kuyruk durumu yalnızca olay
+    döngüsünde değiştirilir.
+
+    Birden çok uvicorn işçisi aynı depoyu paylaştığında her iş, onu kabul
+    eden sürece aittir (`worker` alanı) ve orada yürütülür. Süreçler
+    paylaşılan duruma kalp atışı yazar; kalp atışı `lease_seconds` boyunca
+    gelmeyen sürecin işlerini diğerleri devralır. Kayıt güncellemeleri
+    `updated_at` üzerinden iyimser eşzamanlılıkla yapılır; başka bir süreçte
+    çalışan işin iptali kayda `cancel_requested` yazılarak sahibine iletilir.
+    """
+
+    def __init__(
+        self,
+        store,
+        runner: JobRunner,
+        max_workers: int = JOB_MAX_WORKERS,
+        max_per_tenant: int = JOB_MAX_PER_TENANT,
+        lease_seconds: float = JOB_LEASE_SECONDS,
+        progress_interval: float = JOB_PROGRESS_INTERVAL,
+    ):
+        self.store = store
+        self.runner = runner
+        self.max_workers = max(1, max_workers)
+        self.max_per_tenant = max(0, max_per_tenant)
+        self.lease_seconds = lease_seconds
+        self.progress_interval = max(0.0, progress_interval)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # Bekleyen işler sırayla: iş kimliği -> kiracı (seçim depo okumadan yapılır)
+        self._pending: Dict[str, str] = {}
+        self._active: Dict[str, Dict[str, Any]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._tenant_running: Dict[str, int] = {}
+        self._cancel_requested: Set[str] = set()
+        # Çalışan işlerin bekleyen ilerleme yazmaları
+        self._progress: Dict[str, asyncio.Task] = {}
+        self._workers: List[asyncio.Task] = []
+        self._monitor_task: Optional[asyncio.Task] = None
+        self._condition: Optional[asyncio.Condition] = None
+
+    async def start(self) -> None:
+        """Sahipsiz kalmış işleri devralır, işçileri ve izleyiciyi başlatır."""
+        self._condition = asyncio.Condition()
+
+        await asyncio.to_thread(self._heartbeat)
+        adopted = self._enqueue(await asyncio.to_thread(self._adopt_orphans))
+        if adopted:
+            logger.info("Kuyruğa geri yüklenen iş sayısı: %d", adopted)
+
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.max_workers)
+        ]
+        self._monitor_task = asyncio.create_task(self._monitor())
+
+    async def stop(self) -> None:
+        """
+        İşçileri durdurur.
+
+        Çalışmakta olan işler kuyruğa geri alınır ve bir sonraki başlatmada
+        yeniden yürütülür.
+        """
+        tasks = self._workers + ([self._monitor_task] if self._monitor_task else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._monitor_task = None
+        # Kuyruğa geri alınan işler kira süresi beklenmeden devralınabilsin
+        await asyncio.to_thread(
+            self.store.state.delete, WORKER_KEY_PREFIX + self.worker_id
+        )
+
+    async def submit(
+        self,
+        workflow_id: str,
+        request: Dict[str, Any],
+        user_id: Optional[str] = None,
+        tenant: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Yeni bir iş akışı yürütmesini kuyruğa ekler.
+
+        Args:
+            workflow_id: Yürütülecek iş akışı
+            request: Yürütme isteği alanları (giriş metni, seçenekler)
+            user_id: İşin sahibi
+            tenant: Kiracı sınırının uygulandığı anahtar (verilmezse `user_id`)
+
+        Returns:
+            Kuyruğa alınan iş kaydı
+        """
+        now = datetime.utcnow()
+        job = {
+            "id": str(uuid.uuid4()),
+            "workflow_id": workflow_id,
+            "user_id": user_id,
+            "tenant": tenant or user_id,
+            "worker": self.worker_id,
+            "status": JobStatus.QUEUED,
+            "request": request,
+            "partial_results": [],
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+            "started_at": None,
+            "finished_at": None,
+        }
+        await asyncio.to_thread(self.store.runs.add, job)
+        self._enqueue([job])
+        logger.info("İş kuyruğa alındı: %s (iş akışı: %s)", job["id"], workflow_id)
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """İşi döndürür; çalışan işler için canlı kaydı verir."""
+        return self._active.get(job_id) or self.store.runs.get(job_id)
+
+    def list(
+        self, user_id: Optional[str] = None, status: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """İşleri kullanıcıya ve/veya duruma göre listeler."""
+        if user_id is not None:
+            jobs = self.store.runs.find_by("user_id", user_id)
+            if status is not None:
+                jobs = [job for job in jobs if job["status"] == status]
+        elif status is not None:
+            jobs = self.store.runs.find_by("status", status)
+        else:
+            jobs = self.store.runs.all()
+        return [self._active.get(job["id"], job) for job in jobs]
+
+    async def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        İşi iptal eder.
+
+        Kuyruktaki iş hemen iptal edilir; bu süreçte çalışan işin görevi
+        iptal edilir ve devam eden LLM çağrıları kesilir. Başka bir işçi
+        sürecinde çalışan işe `cancel_requested` yazılır; sahibi bir sonraki
+        kalp atışında işi iptal eder. Bitmiş işler değiştirilmez.
+        """
+        task = self._tasks.get(job_id)
+        if task is not None:
+            self._cancel_requested.add(job_id)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return await asyncio.to_thread(self.get, job_id)
+
+        job = await asyncio.to_thread(self._cancel_stored, job_id)
+        if job is not None and job["status"] == JobStatus.CANCELLED:
+            self._pending.pop(job_id, None)
+        return job
+
+    def _cancel_stored(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Bu süreçte çalışmayan işi depoda iptal eder ya da iptal isteği yazar."""
+        for _ in range(JOB_WRITE_RETRIES):
+            job = self.store.runs.get(job_id)
+            if job is None or job["status"] in JobStatus.TERMINAL:
+                return job
+            if job["status"] == JobStatus.QUEUED:
+                if self._transition(
+                    job, status=JobStatus.CANCELLED, finished_at=datetime.utcnow()
+                ):
+                    logger.info("Kuyruktaki iş iptal edildi: %s", job_id)
+                    return job
+            elif job.get("cancel_requested") or self._transition(
+                job, cancel_requested=True
+            ):
+                logger.info(
+                    "İptal isteği sahibine iletildi: %s (%s)", job_id, job.get("worker")
+                )
+                return job
+        return self.store.runs.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Kuyruk ve işçi durumunu döndürür."""
+        return {
+            "worker_id": self.worker_id,
+            "live_workers": len(self._live_workers()),
+            "workers": self.max_workers,
+            "max_per_tenant": self.max_per_tenant,
+            "queued": len(self._pending),
+            "running": len(self._tasks),
+            "running_by_tenant": dict(self._tenant_running),
+        }
+
+    def _notify(self) -> None:
+        if self._condition is None:
+            return
+
+        async def notify() -> None:
+            async with self._condition:
+                self._condition.notify_all()
+
+        asyncio.get_running_loop().create_task(notify())
+
+    def _enqueue(self, jobs: List[Dict[str, Any]]) -> int:
+        """Depoya yazılmış işleri bellekteki kuyruğa ekler ve işçileri uyandırır."""
+        for job in jobs:
+            self._pending[job["id"]] = self._tenant(job)
+        if jobs:
+            self._notify()
+        return len(jobs)
+
+    def _tenant(self, job: Dict[str, Any]) -> str:
+        return job.get("tenant") or job.get("user_id") or DEFAULT_TENANT
+
+    def _tenant_available(self, tenant: str) -> bool:
+        return (
+            not self.max_per_tenant
+            or tenant == DEFAULT_TENANT
+            or self._tenant_running.get(tenant, 0) < self.max_per_tenant
+        )
+
+    def _release_tenant(self, tenant: str) -> None:
+        self._tenant_running[tenant] -= 1
+        if not self._tenant_running[tenant]:
+            del self._tenant_running[tenant]
+
+    async def _take_next(self) -> Optional[Dict[str, Any]]:
+        """
+        Kiracı sınırına takılmayan ilk bekleyen işi kuyruktan alır.
+
+        Aday, bellekteki kiracı bilgisiyle seçilir; depodan yalnızca seçilen iş
+        okunur. Kiracının yeri depo yazması beklenirken ayrılır, böylece sınır
+        aşılmaz.
+        """
+        for job_id, tenant in list(self._pending.items()):
+            if job_id not in self._pending or not self._tenant_available(tenant):
+                continue
+            del self._pending[job_id]
+            self._tenant_running[tenant] = self._tenant_running.get(tenant, 0) + 1
+            job = await asyncio.to_thread(self._claim, job_id)
+            if job is not None:
+                return job
+            self._release_tenant(tenant)
+        return None
+
+    def _claim(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        İşi depoda `running` durumuna koşullu yazarak sahiplenir.
+
+        Returns:
+            Sahiplenilen iş; başka bir süreç araya girdiyse (iptal, devralma) None
+        """
+        job = self.store.runs.get(job_id)
+        if (
+            job is None
+            or job["status"] != JobStatus.QUEUED
+            or job.get("worker") != self.worker_id
+            or not self._transition(
+                job, status=JobStatus.RUNNING, started_at=datetime.utcnow()
+            )
+        ):
+            return None
+        return job
+
+    async def _worker(self) -> None:
+        while True:
+            async with self._condition:
+                job = await self._take_next()
+                while job is None:
+                    await self._condition.wait()
+                    job = await self._take_next()
+
+            task = asyncio.create_task(self._execute(job))
+            self._tasks[job["id"]] = task
+            try:
+                await task
+            finally:
+                self._tasks.pop(job["id"], None)
+                self._release_tenant(self._tenant(job))
+                self._notify()
+
+    async def _execute(self, job: Dict[str, Any]) -> None:
+        job_id = job["id"]
+        self._active[job_id] = job
+        if isinstance(job["created_at"], datetime):
+            JOB_QUEUE_WAIT_SECONDS.observe(
+                (job["started_at"] - job["created_at"]).total_seconds()
+            )
+        logger.info("İş başlatıldı: %s", job_id)
+
+        def on_event(event: str, data: Dict[str, Any]) -> None:
+            # Token olayları kalıcı kayda yazılmaz; yalnızca düğüm sonuçları.
+            # Canlı kayıt hemen güncellenir, depo yazmaları birleştirilir.
+            if event == "node_finished":
+                job["partial_results"].append(data)
+                self._schedule_progress(job)
+
+        try:
+            result = await self.runner(job, on_event)
+        except asyncio.CancelledError:
+            if job_id in self._cancel_requested:
+                self._cancel_requested.discard(job_id)
+                await self._finish(job, JobStatus.CANCELLED)
+                logger.info("Çalışan iş iptal edildi: %s", job_id)
+                return
+            # Süreç kapanıyor: iş bir sonraki başlatmada yeniden yürütülür
+            await self._write(job, status=JobStatus.QUEUED, partial_results=[])
+            raise
+        except Exception as e:
+            logger.error("İş yürütme hatası (%s): %s", job_id, e)
+            await self._finish(job, JobStatus.FAILED, error=str(e))
+            return
+        finally:
+            self._active.pop(job_id, None)
+
+        status = (
+            JobStatus.SUCCEEDED
+            if result.get("status") == "success"
+            else JobStatus.FAILED
+        )
+        await self._finish(job, status, result=result)
+        logger.info("İş tamamlandı: %s (%s)", job_id, status)
+
+    def _schedule_progress(self, job: Dict[str, Any]) -> None:
+        if job["id"] not in self._progress:
+            self._progress[job["id"]] = asyncio.create_task(self._save_progress(job))
+
+    async def _save_progress(self, job: Dict[str, Any]) -> None:
+        """Aralık dolunca o ana kadarki düğüm sonuçlarını tek yazmada kaydeder."""
+        await asyncio.sleep(self.progress_interval)
+        saved = list(job["partial_results"])
+        write = asyncio.ensure_future(
+            asyncio.to_thread(self._write_progress, job, saved)
+        )
+        try:
+            await asyncio.shield(write)
+        except asyncio.CancelledError:
+            # Başlamış yazma, ardından gelen son yazmayla çakışmasın diye beklenir
+            await write
+            raise
+        except Exception as e:
+            logger.warning("İş ilerlemesi yazılamadı (%s): %s", job["id"], e)
+        self._progress.pop(job["id"], None)
+        # Yazma sürerken gelen sonuçlar bir sonraki yazmaya kalır
+        if len(job["partial_results"]) > len(saved):
+            self._schedule_progress(job)
+
+    async def _flush_progress(self, job_id: str) -> None:
+        """Bekleyen ilerleme yazmasını iptal eder; başlamışsa bitmesini bekler."""
+        task = self._progress.pop(job_id, None)
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _write(self, job: Dict[str, Any], **fields: Any) -> None:
+        await self._flush_progress(job["id"])
+        await asyncio.to_thread(self._update, job, **fields)
+
+    async def _finish(self, job: Dict[str, Any], status: str, **fields: Any) -> None:
+        await self._write(job, status=status, finished_at=datetime.utcnow(), **fields)
+
+    def _updated(self, job: Dict[str, Any], fields: Dict[str, Any]) -> Dict[str, Any]:
+        """Kaydın yeni sürümünü oluşturur (depo eski kaydın dizinli alanlarını silebilsin diye kopya)."""
+        updated_at = datetime.utcnow()
+        previous = job.get("updated_at")
+        # Sürüm karşılaştırması milisaniye çözünürlüğündedir; sürüm her yazmada artmalı
+        if isinstance(previous, datetime) and updated_at < previous + timedelta(
+            milliseconds=1
+        ):
+            updated_at = previous + timedelta(milliseconds=1)
+        return {**job, **fields, "updated_at": updated_at}
+
+    def _transition(self, job: Dict[str, Any], **fields: Any) -> bool:
+        """
+        Kaydı yalnızca başka bir süreç araya girmediyse günceller.
+
+        Returns:
+            Yazma başarılıysa True (yerel kayıt da güncellenir)
+        """
+        updated = self._updated(job, fields)
+        if not self.store.runs.update_if_unchanged(updated, job["updated_at"]):
+            return False
+        job.update(updated)
+        return True
+
+    def _update(self, job: Dict[str, Any], **fields: Any) -> None:
+        """
+        İş kaydını günceller ve depoya yazar.
+
+        Başka bir süreç kaydı değiştirdiyse (iptal isteği) güncel sürüm
+        okunur, iptal isteği korunarak yazma yeniden denenir.
+        """
+        for _ in range(JOB_WRITE_RETRIES):
+            if self._transition(job, **fields):
+                return
+            if not self._refresh(job):
+                return
+        logger.warning("İş kaydı yazılamadı (eşzamanlı güncelleme): %s", job["id"])
+
+    def _write_progress(
+        self, job: Dict[str, Any], partial_results: List[Dict[str, Any]]
+    ) -> None:
+        """
+        Düğüm sonuçlarının anlık görüntüsünü depoya yazar.
+
+        Canlı kaydın sonuç listesi olay döngüsünde büyümeye devam ettiğinden
+        yerel kayıtta yalnızca sürüm güncellenir.
+        """
+        for _ in range(JOB_WRITE_RETRIES):
+            updated = self._updated(job, {"partial_results": partial_results})
+            if self.store.runs.update_if_unchanged(updated, job["updated_at"]):
+                job["updated_at"] = updated["updated_at"]
+                return
+            if not self._refresh(job):
+                return
+        logger.warning("İş kaydı yazılamadı (eşzamanlı güncelleme): %s", job["id"])
+
+    def _refresh(self, job: Dict[str, Any]) -> bool:
+        """Yazma çakışmasından sonra kaydın sürümünü ve iptal isteğini depodan alır."""
+        stored = self.store.runs.get(job["id"])
+        if stored is None:
+            return False
+        job["updated_at"] = stored["updated_at"]
+        if stored.get("cancel_requested"):
+            job["cancel_requested"] = True
+        return True
+
+    def _heartbeat(self) -> None:
+        self.store.state.set(WORKER_KEY_PREFIX + self.worker_id, time.time())
+
+    def _live_workers(self) -> Set[str]:
+        """Kalp atışı kira süresi içinde olan işçi süreçlerini döndürür."""
+        deadline = time.time() - self.lease_seconds
+        return {
+            key[len(WORKER_KEY_PREFIX) :]
+            for key, seen_at in self.store.state.items(WORKER_KEY_PREFIX).items()
+            if seen_at >= deadline
+        }
+
+    def _adopt_orphans(self) -> List[Dict[str, Any]]:
+        """
+        Sahibi yaşamayan kuyruktaki ve yarıda kalmış işleri devralır.
+
+        Returns:
+            Depoda bu sürece geçirilen işler (kuyruğa `_enqueue` ile eklenir)
+        """
+        live = self._live_workers()
+        jobs = self.store.runs.find_by("status", JobStatus.RUNNING)
+        jobs += self.store.runs.find_by("status", JobStatus.QUEUED)
+        orphans = sorted(
+            (job for job in jobs if job.get("worker") not in live),
+            key=lambda job: str(job["created_at"]),
+        )
+        adopted = []
+        for job in orphans:
+            fields: Dict[str, Any] = {
+                "worker": self.worker_id,
+                "status": JobStatus.QUEUED,
+            }
+            if job["status"] == JobStatus.RUNNING:
+                # Önceki süreç işi bitiremeden kapandı; baştan yürütülecek
+                fields["partial_results"] = []
+            if self._transition(job, **fields):
+                adopted.append(job)
+        return adopted
+
+    def _cancel_requests(self, job_ids: List[str]) -> List[str]:
+        """Başka süreçlerden iptal isteği gelmiş işleri döndürür."""
+        requested = []
+        for job_id in job_ids:
+            stored = self.store.runs.get(job_id)
+            if stored is not None and stored.get("cancel_requested"):
+                requested.append(job_id)
+        return requested
+
+    def _prune_workers(self) -> None:
+        """Uzun süredir kalp atışı gelmeyen işçi kayıtlarını siler."""
+        deadline = time.time() - self.lease_seconds * 10
+        for key, seen_at in self.store.state.items(WORKER_KEY_PREFIX).items():
+            if seen_at < deadline:
+                self.store.state.delete(key)
+
+    def _tick(self, running: List[str]) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """
+        İzleyicinin depo işlerini yapar (iş parçacığı havuzunda çalışır).
+
+        Args:
+            running: Bu süreçte çalışan ve iptal isteği henüz uygulanmamış işler
+
+        Returns:
+            İptal istenen işler ve devralınan işler
+        """
+        self._heartbeat()
+        cancelled = self._cancel_requests(running)
+        adopted = self._adopt_orphans()
+        self._prune_workers()
+        return cancelled, adopted
+
+    async def _monitor(self) -> None:
+        """Kalp atışı yazar, iptal isteklerini uygular ve sahipsiz işleri devralır."""
+        interval = max(0.1, self.lease_seconds / 3)
+        while True:
+            await asyncio.sleep(interval)
+            running = [
+                job_id for job_id in self._tasks if job_id not in self._cancel_requested
+            ]
+            try:
+                cancelled, adopted = await asyncio.to_thread(self._tick, running)
+            except Exception as e:
+                logger.warning("İş izleyicisi hatası: %s", e)
+                continue
+            for job_id in cancelled:
+                task = self._tasks.get(job_id)
+                if task is not None and job_id not in self._cancel_requested:
+                    self._cancel_requested.add(job_id)
+                    task.cancel()
+            if self._enqueue(adopted):
+                logger.info("Sahipsiz kalan iş devralındı: %d", len(adopted))
@@ -0,0 +1,315 @@
+from typing import Any, Callable, Dict, List, Optional
+import json
+
+# Model çıktısının başında hoş görülen Markdown kod bloğu açılışı
+_FENCE = "```"
+
+# Tek karakterlik kaçış dizilerinin karşılıkları
+_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+_WHITESPACE = " \t\r\n"
+_LITERAL_CHARS = frozenset("0123456789+-.eEtruefalsn")
+
+# Ayrıştırıcı durumları
+_START = "start"
+_FENCE_LINE = "fence"
+_KEY_OR_END = "key_or_end"
+_KEY = "key"
+_COLON = "colon"
+_VALUE = "value"
+_VALUE_OR_END = "value_or_end"
+_COMMA_OR_END = "comma_or_end"
+_STRING = "string"
+_LITERAL = "literal"
+_DONE = "done"
+
+
+class MalformedJSONError(ValueError):
+    """Model çıktısı geçerli bir JSON nesnesine dönüşemediğinde fırlatılır."""
+
+    def __init__(self, message: str, position: int):
+        super().__init__(f"{message} (karakter {position})")
+        self.position = position
+
+
+class JSONObjectStream:
+    """
+    Parça parça gelen bir JSON nesnesini artımlı olarak ayrıştırır.
+
+    Her parça geldiği anda dilbilgisine göre denetlenir; nesne dışında bir
+    içerikle başlayan ya da yapısı bozulan çıktı, üretim bitmeden
+    `MalformedJSONError` ile durdurulabilir. Üst düzey metin alanlarının
+    çözülmüş parçaları `on_delta`, tamamlanan her üst düzey alan da
+    `on_field` ile bildirilir.
+
+    Hoş görülen sapmalar: baştaki ```json satırı, sondaki fazla virgüller ve
+    nesne kapandıktan sonra gelen metin (kapanış bloğu ya da açıklama).
+    """
+
+    def __init__(
+        self,
+        on_delta: Optional[Callable[[str, str], None]] = None,
+        on_field: Optional[Callable[[str, Any], None]] = None,
+    ):
+        self.on_delta = on_delta
+        self.on_field = on_field
+        self._chunks: List[str] = []
+        self._position = 0
+        self._state = _START
+        self._stack: List[str] = []
+        self._after_string = _COMMA_OR_END
+        self._literal = ""
+        self._escape: Optional[str] = None
+        self._pending_surrogate = ""
+        self._start = -1
+        self._end = -1
+        # Temiz metinden çıkarılacak fazla virgüllerin konumları
+        self._dropped: List[int] = []
+        self._last_comma = -1
+        # Üst düzeyde işlenen alan: adı ve değerin başladığı konum
+        self._key_parts: List[str] = []
+        self._field: Optional[str] = None
+        self._field_start = -1
+
+    @property
+    def text(self) -> str:
+        """Şimdiye kadar alınan ham metin."""
+        return "".join(self._chunks)
+
+    @property
+    def done(self) -> bool:
+        """Üst düzey nesne kapandıysa True."""
+        return self._state == _DONE
+
+    def feed(self, chunk: str) -> None:
+        """
+        Yeni bir metin parçasını işler.
+
+        Raises:
+            MalformedJSONError: Parça, geçerli bir nesneyle sürdürülemiyorsa
+        """
+        self._chunks.append(chunk)
+        for char in chunk:
+            if self._state == _DONE:
+                # Kapanıştan sonrası yok sayılır; ham metin yine de saklanır
+                return
+            self._step(char)
+            self._position += 1
+
+    def result(self) -> Dict[str, Any]:
+        """
+        Tamamlanan nesneyi döndürür.
+
+        Raises:
+            MalformedJSONError: Nesne kapanmadan çıktı bittiyse (ör. token sınırı)
+        """
+        if self._state != _DONE:
+            raise MalformedJSONError(
+                "JSON nesnesi tamamlanmadan çıktı bitti", self._position
+            )
+        return json.loads(self._clean(self._start, self._end + 1))
+
+    def _clean(self, start: int, end: int) -> str:
+        text = self.text
+        parts: List[str] = []
+        for index in self._dropped:
+            if start <= index < end:
+                parts.append(text[start:index])
+                start = index + 1
+        parts.append(text[start:end])
+        return "".join(parts)
+
+    def _fail(self, message: str) -> None:
+        raise MalformedJSONError(message, self._position)
+
+    def _step(self, char: str) -> None:
+        state = self._state
+        if state == _STRING:
+            self._string_char(char)
+            return
+        if state == _LITERAL:
+            if char in _LITERAL_CHARS:
+                self._literal += char
+                return
+            self._end_literal()
+            state = self._state
+
+        if state == _START:
+            if char in _WHITESPACE:
+                return
+            if char == "{":
+                self._start = self._position
+                self._open("{")
+            elif char == "`":
+                self._state = _FENCE_LINE
+                self._literal = char
+            else:
+                self._fail("Yanıt bir JSON nesnesiyle başlamıyor")
+            return
+
+        if state == _FENCE_LINE:
+            if len(self._literal) < len(_FENCE):
+                self._literal += char
+                if not _FENCE.startswith(self._literal):
+                    self._fail("Yanıt bir JSON nesnesiyle başlamıyor")
+            elif char == "\n":
+                self._literal = ""
+                self._state = _START
+            elif not (char.isalnum() or char in _WHITESPACE):
+                # Kod bloğu dil etiketinden sonra satır sonu beklenir
+                self._fail("Kod bloğu açılışı geçersiz")
+            return
+
+        if char in _WHITESPACE:
+            return
+
+        if state in (_KEY_OR_END, _KEY):
+            if char == '"':
+                self._begin_string(key=True)
+            elif char == "}" and (state == _KEY_OR_END or self._last_comma >= 0):
+                self._drop_trailing_comma()
+                self._close("}")
+            else:
+                self._fail("Nesnede anahtar bekleniyordu")
+        elif state == _COLON:
+            if char != ":":
+                self._fail("Anahtardan sonra ':' bekleniyordu")
+            self._state = _VALUE
+        elif state in (_VALUE, _VALUE_OR_END):
+            if char == "]" and (state == _VALUE_OR_END or self._last_comma >= 0):
+                self._drop_trailing_comma()
+                self._close("]")
+            else:
+                self._begin_value(char)
+        elif state == _COMMA_OR_END:
+            if char == ",":
+                self._last_comma = self._position
+                self._state = _KEY if self._stack[-1] == "{" else _VALUE
+            elif char in "}]":
+                self._close(char)
+            else:
+                self._fail("',' ya da kapanış bekleniyordu")
+
+    def _begin_value(self, char: str) -> None:
+        self._last_comma = -1
+        if len(self._stack) == 1:
+            self._field_start = self._position
+        if char == '"':
+            self._begin_string(key=False)
+        elif char in "{[":
+            self._open(char)
+        elif char in _LITERAL_CHARS:
+            self._literal = char
+            self._state = _LITERAL
+        else:
+            self._fail("Değer bekleniyordu")
+
+    def _begin_string(self, key: bool) -> None:
+        self._last_comma = -1
+        self._state = _STRING
+        self._after_string = _COLON if key else _COMMA_OR_END
+        if key and len(self._stack) == 1:
+            self._key_parts = []
+            self._field = None
+
+    def _string_char(self, char: str) -> None:
+        if self._escape is not None:
+            self._escape += char
+            if self._escape[0] == "u":
+                if len(self._escape) > 1 and char not in "0123456789abcdefABCDEF":
+                    self._fail("Geçersiz \\u kaçışı")
+                if len(self._escape) == 5:
+                    decoded = chr(int(self._escape[1:], 16))
+                    self._escape = None
+                    self._emit_string_text(decoded)
+            elif char in _ESCAPES:
+                self._escape = None
+                self._emit_string_text(_ESCAPES[char])
+            else:
+                self._fail("Geçersiz kaçış dizisi")
+            return
+        if char == "\\":
+            self._escape = ""
+        elif char == '"':
+            self._end_string()
+        elif char < " ":
+            self._fail("Metin içinde kaçışsız kontrol karakteri")
+        else:
+            self._emit_string_text(char)
+
+    def _emit_string_text(self, text: str) -> None:
+        # Vekil çiftlerin ilk yarısı, ikinci yarısı gelene kadar bekletilir
+        if self._pending_surrogate:
+            text = (
+                (self._pending_surrogate + text)
+                .encode("utf-16", "surrogatepass")
+                .decode("utf-16", "replace")
+            )
+            self._pending_surrogate = ""
+        elif "\ud800" <= text <= "\udbff":
+            self._pending_surrogate = text
+            return
+        depth = len(self._stack)
+        if depth != 1:
+            return
+        if self._after_string == _COLON:
+            self._key_parts.append(text)
+        elif self._field is not None and self.on_delta is not None:
+            self.on_delta(self._field, text)
+
+    def _end_string(self) -> None:
+        self._state = self._after_string
+        if len(self._stack) != 1:
+            return
+        if self._after_string == _COLON:
+            self._field = "".join(self._key_parts)
+        else:
+            self._finish_field(self._position + 1)
+
+    def _end_literal(self) -> None:
+        try:
+            json.loads(self._literal)
+        except ValueError:
+            self._fail(f"Geçersiz değer: {self._literal}")
+        self._literal = ""
+        self._state = _COMMA_OR_END
+        if len(self._stack) == 1:
+            # Sabit, onu bitiren karakterden önce sona erer
+            self._finish_field(self._position)
+
+    def _open(self, bracket: str) -> None:
+        self._stack.append(bracket)
+        self._state = _KEY_OR_END if bracket == "{" else _VALUE_OR_END
+
+    def _close(self, bracket: str) -> None:
+        expected = "}" if self._stack[-1] == "{" else "]"
+        if bracket != expected:
+            self._fail(f"'{expected}' bekleniyordu")
+        self._stack.pop()
+        self._state = _COMMA_OR_END
+        if not self._stack:
+            self._end = self._position
+            self._state = _DONE
+        elif len(self._stack) == 1:
+            # İç içe değerin kapanışı, üst düzey alanı tamamlar
+            self._finish_field(self._position + 1)
+
+    def _drop_trailing_comma(self) -> None:
+        if self._last_comma >= 0:
+            self._dropped.append(self._last_comma)
+            self._last_comma = -1
+
+    def _finish_field(self, end: int) -> None:
+        field = self._field
+        self._field = None
+        if field is not None and self.on_field is not None:
+            self.on_field(field, json.loads(self._clean(self._field_start, end)))
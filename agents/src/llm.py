@@ -0,0 +1,741 @@
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    List,
+    Any,
+    Awaitable,
+    Callable,
+    Iterator,
+    Optional,
+    Tuple,
+)
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, asdict, replace
+import asyncio
+import os
+import threading
+import time
+from src.utils import get_logger
+from src.llm_cache import LLMCache, cache_key, create_llm_cache_from_env
+from src.ratelimit import get_llm_scheduler
+from src.metrics import (
+    LLM_CALLS,
+    LLM_ERRORS,
+    LLM_SECONDS,
+    LLM_TTFT_SECONDS,
+    observe_llm_usage,
+)
+
+if TYPE_CHECKING:
+    import httpx
+    from openai import AsyncOpenAI, OpenAI
+
+logger = get_logger(__name__)
+
+# Sahte sağlayıcı seçildiğinde anahtar tanımlı değilse kullanılan değer
+FAKE_API_KEY = "sk-fake"
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+class ConnectionStats:
+    """
+    LLM HTTP bağlantılarının yeniden kullanım sayaçları.
+
+    Her yanıtın ağ akışı (bağlantı) kimliği izlenir; daha önce görülmemiş bir
+    akış yeni açılmış bir bağlantı demektir.
+    """
+
+    # İzlenen akış kimliklerinin üst sınırı (bellek büyümesini önler)
+    MAX_TRACKED_STREAMS = 10000
+
+    def __init__(self):
+        self.requests = 0
+        self.responses = 0
+        self.connections_opened = 0
+        self._streams: Dict[int, None] = {}
+        self._lock = threading.Lock()
+
+    def on_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def on_response(self, response: "httpx.Response") -> None:
+        stream = response.extensions.get("network_stream")
+        with self._lock:
+            self.responses += 1
+            if stream is None:
+                return
+            key = id(stream)
+            if key not in self._streams:
+                if len(self._streams) >= self.MAX_TRACKED_STREAMS:
+                    self._streams.clear()
+                self._streams[key] = None
+                self.connections_opened += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            reused = max(self.responses - self.connections_opened, 0)
+            return {
+                "requests": self.requests,
+                "responses": self.responses,
+                "connections_opened": self.connections_opened,
+                "connections_reused": reused,
+                "reuse_ratio": reused / self.responses if self.responses else 0.0,
+            }
+
+
+class LLMClients:
+    """
+    Uygulama ömrü boyunca paylaşılan senkron ve asenkron OpenAI istemcileri.
+
+    İki istemci de ayarlanabilir bağlantı havuzuna sahip tek bir httpx
+    istemcisi kullanır; böylece her istek yeni bir TLS el sıkışması yapmak
+    yerine açık bağlantıları yeniden kullanır.
+
+    Ortam değişkenleri:
+        LLM_MAX_CONNECTIONS: Havuzdaki en fazla bağlantı (varsayılan 100)
+        LLM_MAX_KEEPALIVE: Açık tutulacak en fazla boşta bağlantı (varsayılan 20)
+        LLM_KEEPALIVE_EXPIRY: Boşta bağlantının kapanma süresi, sn (varsayılan 30)
+        LLM_TIMEOUT: İstek zaman aşımı, sn (varsayılan 120)
+        LLM_PROVIDER: "fake" ise istekler ağa çıkmadan `src.fake_llm`
+            taşıyıcısıyla yanıtlanır (varsayılan openai)
+    """
+
+    def __init__(self, api_key: str, provider: str = "openai"):
+        # SDK ve HTTP katmanının içe aktarılması yavaştır; ilk istemciyle yüklenir
+        import httpx
+        from openai import AsyncOpenAI, OpenAI
+        from src.fake_llm import FAKE_BASE_URL, AsyncFakeLLMTransport, FakeLLMTransport
+
+        self.api_key = api_key
+        self.provider = provider
+        self.limits = httpx.Limits(
+            max_connections=_env_int("LLM_MAX_CONNECTIONS", 100),
+            max_keepalive_connections=_env_int("LLM_MAX_KEEPALIVE", 20),
+            keepalive_expiry=_env_float("LLM_KEEPALIVE_EXPIRY", 30.0),
+        )
+        self.timeout = httpx.Timeout(_env_float("LLM_TIMEOUT", 120.0), connect=10.0)
+        self.sync_stats = ConnectionStats()
+        self.async_stats = ConnectionStats()
+
+        sync_stats = self.sync_stats
+        async_stats = self.async_stats
+
+        async def on_async_request(request: httpx.Request) -> None:
+            async_stats.on_request()
+
+        async def on_async_response(response: httpx.Response) -> None:
+            async_stats.on_response(response)
+
+        fake = provider == "fake"
+        base_url = FAKE_BASE_URL if fake else None
+
+        # Yeniden denemeler SDK yerine merkezi zamanlayıcıda (src.ratelimit) yapılır
+        self.sync = OpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            max_retries=0,
+            http_client=httpx.Client(
+                limits=self.limits,
+                timeout=self.timeout,
+                transport=FakeLLMTransport() if fake else None,
+                event_hooks={
+                    "request": [lambda request: sync_stats.on_request()],
+                    "response": [sync_stats.on_response],
+                },
+            ),
+        )
+        self.async_ = AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            max_retries=0,
+            http_client=httpx.AsyncClient(
+                limits=self.limits,
+                timeout=self.timeout,
+                transport=AsyncFakeLLMTransport() if fake else None,
+                event_hooks={
+                    "request": [on_async_request],
+                    "response": [on_async_response],
+                },
+            ),
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Havuz ayarlarını ve bağlantı sayaçlarını döndürür."""
+        return {
+            "provider": self.provider,
+            "limits": {
+                "max_connections": self.limits.max_connections,
+                "max_keepalive_connections": self.limits.max_keepalive_connections,
+                "keepalive_expiry": self.limits.keepalive_expiry,
+            },
+            "sync": self.sync_stats.snapshot(),
+            "async": self.async_stats.snapshot(),
+        }
+
+    def close(self) -> None:
+        """Senkron istemcinin bağlantılarını kapatır."""
+        self.sync.close()
+
+    async def aclose(self) -> None:
+        """Her iki istemcinin bağlantılarını kapatır."""
+        self.sync.close()
+        await self.async_.close()
+
+
+_clients: Optional[LLMClients] = None
+_clients_lock = threading.Lock()
+
+
+def llm_provider() -> str:
+    """LLM sağlayıcısı: "openai" ya da yük testleri için çevrimdışı "fake"."""
+    return os.getenv("LLM_PROVIDER", "openai")
+
+
+def llm_api_key() -> str:
+    """Yapılandırılmış API anahtarını döndürür; sahte sağlayıcıda anahtar gerekmez."""
+    api_key = os.getenv("OPENAI_API_KEY", "")
+    if not api_key and llm_provider() == "fake":
+        return FAKE_API_KEY
+    return api_key
+
+
+def get_llm_clients() -> Optional[LLMClients]:
+    """
+    Paylaşılan LLM istemcilerini döndürür; ilk çağrıda oluşturur.
+
+    API anahtarı tanımlı değilse (ve sahte sağlayıcı seçilmemişse) None döner.
+    """
+    global _clients
+    if _clients is not None:
+        return _clients
+
+    with _clients_lock:
+        if _clients is None:
+            api_key = llm_api_key()
+            if not api_key:
+                logger.warning("UYARI: OpenAI API anahtarı bulunamadı!")
+                return None
+            provider = llm_provider()
+            _clients = LLMClients(api_key, provider)
+            logger.info(
+                "Paylaşılan OpenAI istemcileri oluşturuldu (sağlayıcı: %s).", provider
+            )
+    return _clients
+
+
+def get_sync_client() -> Optional["OpenAI"]:
+    """Paylaşılan senkron OpenAI istemcisini döndürür."""
+    clients = get_llm_clients()
+    return clients.sync if clients else None
+
+
+def get_async_client() -> Optional["AsyncOpenAI"]:
+    """Paylaşılan asenkron OpenAI istemcisini döndürür."""
+    clients = get_llm_clients()
+    return clients.async_ if clients else None
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Paylaşılan istemcilerin bağlantı istatistiklerini döndürür."""
+    if _clients is None:
+        return {"initialized": False}
+    return {"initialized": True, **_clients.stats()}
+
+
+async def close_llm_clients() -> None:
+    """Paylaşılan istemcileri kapatır (uygulama kapanışında çağrılır)."""
+    global _clients
+    with _clients_lock:
+        clients, _clients = _clients, None
+    if clients is not None:
+        await clients.aclose()
+        logger.info("Paylaşılan OpenAI istemcileri kapatıldı.")
+
+
+@dataclass
+class LLMResponse:
+    """Sağlayıcıdan bağımsız sohbet tamamlama sonucu."""
+
+    content: str
+    model: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached: bool = False
+    # Devam eden özdeş bir çağrının sonucu paylaşıldıysa True (token harcanmadı)
+    coalesced: bool = False
+
+    @classmethod
+    def from_completion(cls, completion: Any) -> "LLMResponse":
+        usage = getattr(completion, "usage", None)
+        return cls(
+            content=completion.choices[0].message.content or "",
+            model=getattr(completion, "model", "") or "",
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+        )
+
+    def to_cache(self) -> Dict[str, Any]:
+        value = asdict(self)
+        value.pop("cached")
+        value.pop("coalesced")
+        return value
+
+
+class _Flight:
+    """Devam eden tek bir üst akış çağrısı ve onu bekleyen çağıran sayısı."""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Aynı anda yapılan özdeş istekleri tek bir üst akış çağrısında birleştirir.
+
+    İlk çağıran isteği ayrı bir görevde başlatır; aynı anahtarla gelen diğer
+    çağıranlar bu görevin sonucunu bekler. Bekleyenlerden biri iptal edilirse
+    çağrı diğerleri için sürer; tüm bekleyenler ayrılınca görev iptal edilir.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        `fn` çağrısını anahtar başına tek uçuşta çalıştırır.
+
+        Returns:
+            (sonuç, çağrıyı bu çağıranın başlatıp başlatmadığı)
+        """
+        flight = self._flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            self.leaders += 1
+        else:
+            self.shared += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), leader
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.task.done():
+                flight.task.cancel()
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.leaders + self.shared
+        return {
+            "in_flight": len(self._flights),
+            "upstream_calls": self.leaders,
+            "coalesced": self.shared,
+            "coalesced_ratio": self.shared / total if total else 0.0,
+        }
+
+
+# Özdeş eşzamanlı istekleri birleştirme kipi: deterministic (yalnızca
+# temperature=0), all veya off. Örneklemeli isteklerde birleştirme tüm
+# çağıranlara aynı örneği döndürür; bu yüzden `all` açıkça seçilmelidir.
+LLM_COALESCE = os.getenv("LLM_COALESCE", "deterministic").lower()
+
+_single_flight = SingleFlight()
+
+
+def get_coalescing_stats() -> Dict[str, Any]:
+    """İstek birleştirme sayaçlarını döndürür."""
+    return {"mode": LLM_COALESCE, **_single_flight.stats()}
+
+
+_llm_cache: Optional[LLMCache] = None
+_llm_cache_initialized = False
+
+# İstek kapsamında önbelleği atlama bayrağı (asyncio görevlerine aktarılır)
+_bypass_cache: ContextVar[bool] = ContextVar("llm_bypass_cache", default=False)
+
+# Tanımlıysa asenkron çağrılar akış modunda yapılır ve her parça buraya iletilir
+_token_sink: ContextVar[Optional[Callable[[str], None]]] = ContextVar(
+    "llm_token_sink", default=None
+)
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """Paylaşılan LLM yanıt önbelleğini döndürür; ilk çağrıda oluşturur."""
+    global _llm_cache, _llm_cache_initialized
+    if not _llm_cache_initialized:
+        with _clients_lock:
+            if not _llm_cache_initialized:
+                _llm_cache = create_llm_cache_from_env()
+                _llm_cache_initialized = True
+    return _llm_cache
+
+
+def set_llm_cache(cache: Optional[LLMCache]) -> None:
+    """Paylaşılan önbelleği değiştirir (özel katmanlar takmak için)."""
+    global _llm_cache, _llm_cache_initialized
+    _llm_cache = cache
+    _llm_cache_initialized = True
+
+
+@contextmanager
+def bypass_llm_cache(enabled: bool = True) -> Iterator[None]:
+    """Bu blok içinde (ve başlatılan görevlerde) yapılan çağrılarda önbelleği atlar."""
+    token = _bypass_cache.set(enabled)
+    try:
+        yield
+    finally:
+        _bypass_cache.reset(token)
+
+
+class UsageRecorder:
+    """Bir kapsam içinde yapılan LLM çağrılarının token kullanımı."""
+
+    __slots__ = (
+        "calls",
+        "cached_calls",
+        "coalesced_calls",
+        "prompt_tokens",
+        "completion_tokens",
+    )
+
+    def __init__(self):
+        self.calls = 0
+        self.cached_calls = 0
+        self.coalesced_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def add(self, result: LLMResponse) -> None:
+        self.calls += 1
+        if result.cached:
+            # Önbellekten gelen yanıt sağlayıcı kotasından düşmez
+            self.cached_calls += 1
+            return
+        if result.coalesced:
+            # Üst akış çağrısının kullanımı yalnızca onu başlatana yazılır
+            self.coalesced_calls += 1
+            return
+        self.prompt_tokens += result.prompt_tokens
+        self.completion_tokens += result.completion_tokens
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "cached_calls": self.cached_calls,
+            "coalesced_calls": self.coalesced_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens,
+        }
+
+
+_usage: ContextVar[Optional[UsageRecorder]] = ContextVar("llm_usage", default=None)
+
+
+@contextmanager
+def record_llm_usage() -> Iterator[UsageRecorder]:
+    """Bu blok içindeki (ve başlatılan görevlerdeki) LLM kullanımını toplar."""
+    recorder = UsageRecorder()
+    token = _usage.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _usage.reset(token)
+
+
+def _record_usage(result: LLMResponse) -> LLMResponse:
+    recorder = _usage.get()
+    if recorder is not None:
+        recorder.add(result)
+    return result
+
+
+@contextmanager
+def stream_llm_tokens(sink: Optional[Callable[[str], None]]) -> Iterator[None]:
+    """
+    Bu blok içindeki asenkron LLM çağrılarını akış moduna alır.
+
+    Üretilen her metin parçası `sink` fonksiyonuna gönderilir. `sink`
+    bloklamamalıdır (örneğin `asyncio.Queue.put_nowait`). None verilirse
+    dıştaki bir akış hedefi bu blok için devre dışı kalır. `sink` hata
+    fırlatırsa akış kesilir ve hata çağırana iletilir.
+    """
+    token = _token_sink.set(sink)
+    try:
+        yield
+    finally:
+        _token_sink.reset(token)
+
+
+def _build_request(
+    model: str,
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+    params: Dict[str, Any],
+) -> Dict[str, Any]:
+    return {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        **params,
+    }
+
+
+def _cache_for(request: Dict[str, Any], bypass_cache: bool) -> Optional[LLMCache]:
+    """İstek için kullanılacak önbelleği döndürür; önbellek atlanacaksa None."""
+    cache = get_llm_cache()
+    if cache is None or bypass_cache or _bypass_cache.get():
+        return None
+    if not cache.accepts(request):
+        cache.skip()
+        return None
+    return cache
+
+
+def complete(
+    client: "OpenAI",
+    model: str,
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+    bypass_cache: bool = False,
+    **params: Any,
+) -> LLMResponse:
+    """
+    Senkron sohbet tamamlama çağrısı yapar.
+
+    Uygun istekler içerik özetine göre önbellekten yanıtlanır; sağlayıcıya
+    giden çağrılar hız sınırlayıcıdan geçer ve geçici hatalarda yeniden
+    denenir (bkz. `src.ratelimit.LLMScheduler`).
+    """
+    return _record_usage(
+        _complete(
+            client, model, messages, temperature, max_tokens, bypass_cache, **params
+        )
+    )
+
+
+def _complete(
+    client: "OpenAI",
+    model: str,
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+    bypass_cache: bool = False,
+    **params: Any,
+) -> LLMResponse:
+    request = _build_request(model, messages, temperature, max_tokens, params)
+    cache = _cache_for(request, bypass_cache)
+    if cache is not None:
+        key = cache_key(request)
+        hit = cache.get(key)
+        if hit is not None:
+            LLM_CALLS.labels(model, "cache").inc()
+            return LLMResponse(**hit, cached=True)
+
+    scheduler = get_llm_scheduler()
+    started = time.perf_counter()
+    try:
+        completion = scheduler.call(
+            client.api_key, request, lambda: client.chat.completions.create(**request)
+        )
+    except Exception as e:
+        LLM_ERRORS.labels(model, type(e).__name__).inc()
+        raise
+    result = _observe_provider_call(model, started, completion)
+    scheduler.settle(
+        client.api_key, request, result.prompt_tokens + result.completion_tokens
+    )
+    if cache is not None:
+        cache.set(key, result.to_cache())
+    return result
+
+
+async def acomplete(
+    client: "AsyncOpenAI",
+    model: str,
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+    bypass_cache: bool = False,
+    **params: Any,
+) -> LLMResponse:
+    """
+    Asenkron sohbet tamamlama çağrısı yapar.
+
+    Uygun istekler içerik özetine göre önbellekten yanıtlanır, özdeş
+    eşzamanlı istekler (varsayılan olarak yalnızca temperature=0 olanlar) tek
+    çağrıda birleştirilir; token kullanımı yalnızca çağrıyı başlatana yazılır.
+    Sağlayıcıya giden çağrılar `llm_priority` ile belirlenen öncelikte hız
+    sınırlayıcıdan geçer.
+    """
+    return _record_usage(
+        await _acomplete(
+            client, model, messages, temperature, max_tokens, bypass_cache, **params
+        )
+    )
+
+
+async def _acomplete(
+    client: "AsyncOpenAI",
+    model: str,
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+    bypass_cache: bool = False,
+    **params: Any,
+) -> LLMResponse:
+    request = _build_request(model, messages, temperature, max_tokens, params)
+    bypass = bypass_cache or _bypass_cache.get()
+    sink = _token_sink.get()
+    cache = _cache_for(request, bypass)
+    key = cache_key(request)
+    if cache is not None:
+        hit = await cache.aget(key)
+        if hit is not None:
+            if sink is not None and hit["content"]:
+                sink(hit["content"])
+            LLM_CALLS.labels(model, "cache").inc()
+            return LLMResponse(**hit, cached=True)
+
+    async def fetch() -> LLMResponse:
+        scheduler = get_llm_scheduler()
+        started = time.perf_counter()
+        try:
+            if sink is None:
+                completion = await scheduler.acall(
+                    client.api_key,
+                    request,
+                    lambda: client.chat.completions.create(**request),
+                )
+            else:
+                completion = await _astream_completion(client, request, sink)
+        except Exception as e:
+            LLM_ERRORS.labels(model, type(e).__name__).inc()
+            raise
+        result = _observe_provider_call(model, started, completion)
+        scheduler.settle(
+            client.api_key, request, result.prompt_tokens + result.completion_tokens
+        )
+        if cache is not None:
+            await cache.aset(key, result.to_cache())
+        return result
+
+    if not _coalesces(request, bypass):
+        return await fetch()
+
+    result, leader = await _single_flight.do(key, fetch)
+    if leader:
+        return result
+    LLM_CALLS.labels(model, "coalesced").inc()
+    if sink is not None and result.content:
+        # Parçalar ilk çağıranın hedefine aktı; burada tek parça olarak iletilir
+        sink(result.content)
+    return replace(result, coalesced=True)
+
+
+async def evict_llm_response(
+    model: str,
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+    **params: Any,
+) -> None:
+    """
+    `acomplete` ile aynı argümanlara ait önbellek kaydını siler.
+
+    Yanıtı sonradan doğrulanamayan (ör. geçersiz JSON) çağıranlar, aynı
+    isteğin bozuk yanıtı tekrar tekrar önbellekten almasını böyle önler.
+    """
+    cache = get_llm_cache()
+    if cache is not None:
+        request = _build_request(model, messages, temperature, max_tokens, params)
+        await cache.adelete(cache_key(request))
+
+
+def _observe_provider_call(model: str, started: float, completion: Any) -> LLMResponse:
+    """Sağlayıcı çağrısının süresini, sayısını ve token kullanımını kaydeder."""
+    LLM_SECONDS.labels(model).observe(time.perf_counter() - started)
+    LLM_CALLS.labels(model, "provider").inc()
+    result = (
+        completion
+        if isinstance(completion, LLMResponse)
+        else LLMResponse.from_completion(completion)
+    )
+    observe_llm_usage(model, result.prompt_tokens, result.completion_tokens)
+    return result
+
+
+def _coalesces(request: Dict[str, Any], bypass: bool) -> bool:
+    """İsteğin devam eden özdeş bir çağrıyla birleştirilip birleştirilemeyeceği."""
+    if bypass or LLM_COALESCE == "off":
+        return False
+    if LLM_COALESCE == "deterministic":
+        return request.get("temperature", 1) == 0
+    return True
+
+
+async def _astream_completion(
+    client: "AsyncOpenAI", request: Dict[str, Any], sink: Callable[[str], None]
+) -> LLMResponse:
+    """Tamamlamayı akış modunda alır; parçaları iletir ve birleşik yanıtı döndürür."""
+    started = time.perf_counter()
+    # Yalnızca akışın açılması yeniden denenir; parça gönderildikten sonra
+    # yeniden denemek aynı metni ikinci kez iletirdi
+    stream = await get_llm_scheduler().acall(
+        client.api_key,
+        request,
+        lambda: client.chat.completions.create(
+            **request, stream=True, stream_options={"include_usage": True}
+        ),
+    )
+    parts: List[str] = []
+    model = request["model"]
+    prompt_tokens = completion_tokens = 0
+    try:
+        async for chunk in stream:
+            model = getattr(chunk, "model", None) or model
+            if chunk.usage is not None:
+                prompt_tokens = chunk.usage.prompt_tokens or 0
+                completion_tokens = chunk.usage.completion_tokens or 0
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if not parts:
+                    LLM_TTFT_SECONDS.labels(request["model"]).observe(
+                        time.perf_counter() - started
+                    )
+                parts.append(delta)
+                sink(delta)
+    finally:
+        # Hedef hata fırlatıp akışı keserse (ör. bozuk JSON) üretim beklenmeden
+        # bağlantı kapatılır; kalan tokenlar için ödeme yapılmaz
+        await stream.close()
+    return LLMResponse(
+        content="".join(parts),
+        model=model,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+    )
@@ -0,0 +1,178 @@
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Union
+import json
+from src.utils import get_logger
+from src.llm import LLMResponse, get_llm_cache
+from src.llm_cache import cache_key
+
+logger = get_logger(__name__)
+
+# Toplu (Batch) API isteklerinin hedeflediği uç nokta
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+# Sağlayıcının toplu işleri tamamlama süresi
+BATCH_COMPLETION_WINDOW = "24h"
+
+
+class BatchFileBuilder:
+    """
+    Sağlayıcının toplu API'si için JSONL istek dosyası oluşturur.
+
+    Her satırın `custom_id` alanı isteğin içerik özetidir (LLM önbellek
+    anahtarı); böylece özdeş istekler dosyaya tek satır olarak yazılır ve
+    sonuçlar doğrudan önbelleğe aktarılabilir. Hangi girdinin hangi satıra
+    karşılık geldiği `manifest` içinde tutulur.
+    """
+
+    def __init__(self):
+        self._requests: Dict[str, Dict[str, Any]] = {}
+        self.manifest: List[Dict[str, Any]] = []
+
+    def add(self, item_id: Any, request: Dict[str, Any]) -> str:
+        """
+        İsteği dosyaya ekler.
+
+        Args:
+            item_id: İsteğin ait olduğu girdinin kimliği
+            request: Sohbet tamamlama isteği (model, messages, ...)
+
+        Returns:
+            İsteğin `custom_id` değeri
+        """
+        custom_id = cache_key(request)
+        self._requests.setdefault(custom_id, request)
+        self.manifest.append({"item_id": item_id, "custom_id": custom_id})
+        return custom_id
+
+    def __len__(self) -> int:
+        return len(self._requests)
+
+    def lines(self) -> Iterator[str]:
+        """Dosyanın JSONL satırlarını üretir."""
+        for custom_id, request in self._requests.items():
+            yield json.dumps(
+                {
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": BATCH_ENDPOINT,
+                    "body": request,
+                },
+                ensure_ascii=False,
+            )
+
+    def to_bytes(self) -> bytes:
+        return ("\n".join(self.lines()) + "\n").encode("utf-8")
+
+
+def parse_batch_output(
+    lines: Iterable[Union[str, bytes]],
+) -> Dict[str, Union[LLMResponse, str]]:
+    """
+    Toplu işin çıktı dosyasını ayrıştırır.
+
+    Returns:
+        custom_id -> yanıt ya da hata mesajı eşlemesi
+    """
+    results: Dict[str, Union[LLMResponse, str]] = {}
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        response = entry.get("response") or {}
+        if entry.get("error") or response.get("status_code") != 200:
+            error = entry.get("error") or response.get("body", {}).get("error")
+            results[entry["custom_id"]] = str(error)
+            continue
+        body = response["body"]
+        usage = body.get("usage") or {}
+        results[entry["custom_id"]] = LLMResponse(
+            content=body["choices"][0]["message"]["content"] or "",
+            model=body.get("model", ""),
+            prompt_tokens=usage.get("prompt_tokens", 0),
+            completion_tokens=usage.get("completion_tokens", 0),
+        )
+    return results
+
+
+def prime_cache(results: Dict[str, Union[LLMResponse, str]]) -> int:
+    """
+    Başarılı toplu iş yanıtlarını LLM önbelleğine yazar.
+
+    Aynı istekler daha sonra etkileşimli olarak yapılırsa sağlayıcıya
+    gidilmeden önbellekten yanıtlanır (önbelleğin isteği kabul etmesi
+    gerekir, bkz. `LLMCache.accepts`).
+
+    Returns:
+        Önbelleğe yazılan yanıt sayısı
+    """
+    cache = get_llm_cache()
+    if cache is None:
+        return 0
+    stored = 0
+    for custom_id, result in results.items():
+        if isinstance(result, LLMResponse):
+            cache.set(custom_id, result.to_cache())
+            stored += 1
+    return stored
+
+
+async def submit_batch_file(
+    client, builder: BatchFileBuilder, metadata: Optional[Dict[str, str]] = None
+) -> Dict[str, Any]:
+    """
+    Dosyayı sağlayıcıya yükler ve toplu işi başlatır.
+
+    Args:
+        client: AsyncOpenAI istemcisi
+        builder: Gönderilecek istekler
+        metadata: Toplu işe eklenecek etiketler
+
+    Returns:
+        Toplu işin kimliği ve durumu
+    """
+    upload = await client.files.create(
+        file=("batch.jsonl", builder.to_bytes()), purpose="batch"
+    )
+    batch = await client.batches.create(
+        input_file_id=upload.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window=BATCH_COMPLETION_WINDOW,
+        metadata=metadata,
+    )
+    logger.info("Toplu iş gönderildi: %s (%d istek)", batch.id, len(builder))
+    return {"batch_id": batch.id, "status": batch.status}
+
+
+async def fetch_batch_results(client, batch_id: str) -> Dict[str, Any]:
+    """
+    Toplu işin durumunu sorgular; tamamlandıysa sonuçları indirir.
+
+    Tamamlanan sonuçlar LLM önbelleğine de aktarılır.
+
+    Returns:
+        Durum, istek sayaçları ve (tamamlandıysa) custom_id -> sonuç eşlemesi
+    """
+    batch = await client.batches.retrieve(batch_id)
+    info: Dict[str, Any] = {
+        "batch_id": batch.id,
+        "status": batch.status,
+        "request_counts": (
+            batch.request_counts.model_dump() if batch.request_counts else None
+        ),
+    }
+    if batch.status != "completed" or not batch.output_file_id:
+        return info
+
+    content = await client.files.content(batch.output_file_id)
+    results = parse_batch_output(content.text.splitlines())
+    info["cached"] = prime_cache(results)
+    info["results"] = {
+        custom_id: (
+            {"content": result.content, "model": result.model}
+            if isinstance(result, LLMResponse)
+            else {"error": result}
+        )
+        for custom_id, result in results.items()
+    }
+    return info
@@ -0,0 +1,310 @@
+from typing import Dict, List, Any, Optional
+from collections import OrderedDict
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from src.utils import get_logger
+
+logger = get_logger(__name__)
+
+
+def cache_key(request: Dict[str, Any]) -> str:
+    """İsteğin tamamından (model, mesajlar, parametreler) içerik özeti üretir."""
+    canonical = json.dumps(
+        request, sort_keys=True, ensure_ascii=False, separators=(",", ":")
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class MemoryCacheTier:
+    """TTL destekli, en az kullanılanı çıkaran (LRU) bellek içi önbellek katmanı."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.evictions = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskCacheTier:
+    """
+    Dosya tabanlı önbellek katmanı.
+
+    Her kayıt `<dizin>/<özetin ilk 2 karakteri>/<özet>.json` dosyasına atomik
+    olarak yazılır; böylece aynı makinedeki işçi süreçleri önbelleği paylaşır.
+    Toplam boyut `max_bytes` değerini aşınca en eski dosyalar silinir.
+    """
+
+    name = "disk"
+
+    def __init__(
+        self, directory: str, max_bytes: int = 256 * 1024 * 1024, ttl: float = 86400
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.evictions = 0
+        self._approx_bytes: Optional[int] = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as handle:
+                entry = json.load(handle)
+        except (OSError, ValueError):
+            return None
+        if entry.get("expires_at", 0) < time.time():
+            self._remove(path)
+            return None
+        return entry.get("value")
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        payload = json.dumps(
+            {"expires_at": time.time() + self.ttl, "value": value}, ensure_ascii=False
+        )
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            handle.write(payload)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._approx_bytes is None:
+                self._approx_bytes = self._scan_size()
+            else:
+                self._approx_bytes += len(payload.encode("utf-8"))
+            if self._approx_bytes > self.max_bytes:
+                self._evict()
+
+    def delete(self, key: str) -> None:
+        self._remove(self._path(key))
+
+    def clear(self) -> None:
+        for path, _, _ in self._files():
+            self._remove(path)
+        with self._lock:
+            self._approx_bytes = 0
+
+    def _files(self) -> List[tuple]:
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((path, stat.st_mtime, stat.st_size))
+        return files
+
+    def _scan_size(self) -> int:
+        return sum(size for _, _, size in self._files())
+
+    def _evict(self) -> None:
+        """En eski dosyaları hedef boyutun %90'ına inene kadar siler."""
+        files = sorted(self._files(), key=lambda item: item[1])
+        total = sum(size for _, _, size in files)
+        target = int(self.max_bytes * 0.9)
+        for path, _, size in files:
+            if total <= target:
+                break
+            self._remove(path)
+            total -= size
+            self.evictions += 1
+        self._approx_bytes = total
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class LLMCache:
+    """
+    Katmanlı LLM yanıt önbelleği.
+
+    Katmanlar sırayla sorgulanır; alt katmanda bulunan kayıt üst katmanlara da
+    yazılır. Varsayılan olarak yalnızca sıcaklığı 0 olan (belirlenimci)
+    istekler önbelleğe alınır.
+    """
+
+    def __init__(self, tiers: List[Any], cache_any_temperature: bool = False):
+        self.tiers = tiers
+        self.cache_any_temperature = cache_any_temperature
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.stores = 0
+        self.tier_hits: Dict[str, int] = {tier.name: 0 for tier in tiers}
+        # Yalnızca bellek katmanı varsa iş parçacığına geçmeye gerek yok
+        self._blocking = any(not isinstance(tier, MemoryCacheTier) for tier in tiers)
+        self._lock = threading.Lock()
+
+    def accepts(self, request: Dict[str, Any]) -> bool:
+        """İsteğin önbelleğe alınabilir olup olmadığını döndürür."""
+        if request.get("stream"):
+            return False
+        if self.cache_any_temperature:
+            return True
+        return request.get("temperature", 1) == 0
+
+    def skip(self) -> None:
+        """Önbelleğe uygun olmayan bir isteği sayar."""
+        with self._lock:
+            self.skipped += 1
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        for i, tier in enumerate(self.tiers):
+            value = tier.get(key)
+            if value is not None:
+                for upper in self.tiers[:i]:
+                    upper.set(key, value)
+                with self._lock:
+                    self.hits += 1
+                    self.tier_hits[tier.name] += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        for tier in self.tiers:
+            try:
+                tier.set(key, value)
+            except OSError as e:
+                logger.warning("Önbellek katmanına yazılamadı (%s): %s", tier.name, e)
+        with self._lock:
+            self.stores += 1
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        """Disk katmanı olay döngüsünü bloklamasın diye iş parçacığında okur."""
+        if not self._blocking:
+            return self.get(key)
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: Dict[str, Any]) -> None:
+        if not self._blocking:
+            self.set(key, value)
+            return
+        await asyncio.to_thread(self.set, key, value)
+
+    def delete(self, key: str) -> None:
+        """Kaydı tüm katmanlardan siler (ör. kullanılamaz çıktığı anlaşılan yanıt)."""
+        for tier in self.tiers:
+            tier.delete(key)
+
+    async def adelete(self, key: str) -> None:
+        if not self._blocking:
+            self.delete(key)
+            return
+        await asyncio.to_thread(self.delete, key)
+
+    def clear(self) -> None:
+        for tier in self.tiers:
+            tier.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "stores": self.stores,
+                "skipped": self.skipped,
+                "tier_hits": dict(self.tier_hits),
+                "evictions": {tier.name: tier.evictions for tier in self.tiers},
+                "memory_entries": sum(
+                    len(tier)
+                    for tier in self.tiers
+                    if isinstance(tier, MemoryCacheTier)
+                ),
+            }
+
+
+def create_llm_cache_from_env() -> Optional[LLMCache]:
+    """
+    Ortam değişkenlerine göre LLM önbelleği oluşturur.
+
+    Ortam değişkenleri:
+        LLM_CACHE_ENABLED: Önbelleği aç/kapat (varsayılan true)
+        LLM_CACHE_MAX_ENTRIES: Bellek katmanındaki en fazla kayıt (1024)
+        LLM_CACHE_TTL: Bellek katmanı yaşam süresi, sn (3600)
+        LLM_CACHE_DIR: Tanımlıysa disk katmanı bu klasörde açılır
+        LLM_CACHE_DISK_MAX_MB: Disk katmanının en büyük boyutu (256)
+        LLM_CACHE_DISK_TTL: Disk katmanı yaşam süresi, sn (86400)
+        LLM_CACHE_ANY_TEMPERATURE: Sıcaklığı 0 olmayan istekleri de önbelleğe al
+    """
+    if os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+
+    tiers: List[Any] = [
+        MemoryCacheTier(
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024")),
+            ttl=float(os.getenv("LLM_CACHE_TTL", "3600")),
+        )
+    ]
+    directory = os.getenv("LLM_CACHE_DIR")
+    if directory:
+        tiers.append(
+            DiskCacheTier(
+                directory,
+                max_bytes=int(os.getenv("LLM_CACHE_DISK_MAX_MB", "256")) * 1024 * 1024,
+                ttl=float(os.getenv("LLM_CACHE_DISK_TTL", "86400")),
+            )
+        )
+
+    any_temperature = os.getenv("LLM_CACHE_ANY_TEMPERATURE", "false").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    return LLMCache(tiers, cache_any_temperature=any_temperature)
@@ -0,0 +1,96 @@
+from typing import Dict, Any, Optional
+from dataclasses import dataclass
+import os
+
+# Tekrarlayan (LOOP) düğümün ajan kimliği
+LOOP_AGENT_ID = "LOOP"
+
+# Bir LOOP düğümünün düğüm verisinde istenebilecek en fazla yineleme
+LOOP_MAX_ITERATIONS = int(os.getenv("LOOP_MAX_ITERATIONS", "10"))
+
+# LOOP düğümünün erken durma koşulları
+LOOP_STOP_CONDITIONS = ("none", "similarity", "length", "judge")
+
+# Ayar alanlarının beklenen tipleri (JSON'dan gelen değerler bunlara çevrilir)
+_FIELD_TYPES = {
+    "max_iterations": int,
+    "max_tokens": int,
+    "stop": str,
+    "similarity_threshold": float,
+    "length_tolerance": float,
+}
+
+
+@dataclass(frozen=True)
+class LoopSettings:
+    """
+    LOOP düğümünün yineleme ayarları (düğüm verisindeki `loop` alanı).
+
+    Alanlar:
+        max_iterations: Düğüm içinde yapılacak en fazla yineleme
+        max_tokens: Düğümün harcayabileceği toplam token (None: sınırsız)
+        stop: Erken durma koşulu; none, similarity (ardışık çıktılar
+            birbirine benzerse), length (uzunluk artışı durursa) veya judge
+            (hakem model yeni sürümün anlamlı bir şey eklemediğine karar
+            verirse)
+        similarity_threshold: similarity için kelime bazlı benzerlik eşiği
+        length_tolerance: length için göreli uzunluk değişimi eşiği
+    """
+
+    max_iterations: int = 1
+    max_tokens: Optional[int] = None
+    stop: str = "similarity"
+    similarity_threshold: float = 0.9
+    length_tolerance: float = 0.05
+
+    @classmethod
+    def from_options(cls, options: Optional[Dict[str, Any]]) -> "LoopSettings":
+        """
+        Düğüm verisinden ayarları okur; ayar yoksa tek yineleme yapılır.
+
+        Raises:
+            ValueError: Ayarlar geçersizse
+        """
+        loop = (options or {}).get("loop") or {}
+        if not isinstance(loop, dict):
+            raise ValueError("LOOP ayarları bir nesne olmalı")
+        values = {}
+        for name, convert in _FIELD_TYPES.items():
+            if loop.get(name) is None:
+                continue
+            try:
+                values[name] = convert(loop[name])
+            except (TypeError, ValueError):
+                raise ValueError(f"Geçersiz LOOP ayarı: {name}={loop[name]!r}")
+        settings = cls(**values)
+        if settings.stop not in LOOP_STOP_CONDITIONS:
+            raise ValueError(f"Geçersiz LOOP durma koşulu: {settings.stop}")
+        if not 1 <= settings.max_iterations <= LOOP_MAX_ITERATIONS:
+            raise ValueError(
+                f"LOOP yineleme sayısı 1 ile {LOOP_MAX_ITERATIONS} arasında olmalı"
+            )
+        if settings.max_tokens is not None and settings.max_tokens <= 0:
+            raise ValueError("LOOP token bütçesi pozitif olmalı")
+        return settings
+
+
+def loop_options(node: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Düğüm bir LOOP düğümüyse düğüm verisini döndürür."""
+    data = node.get("data") or {}
+    if data.get("agentId", node.get("id")) != LOOP_AGENT_ID:
+        return None
+    return data
+
+
+def validate_loop(options: Dict[str, Any]) -> Optional[str]:
+    """
+    LOOP ayarlarını doğrular.
+
+    Returns:
+        Ayarlar geçerliyse None, değilse hata mesajı
+    """
+    try:
+        LoopSettings.from_options(options)
+    except ValueError as e:
+        return str(e)
+    return None
@@ -0,0 +1,326 @@
+from typing import Dict, List, Any, Iterator, Sequence, Tuple
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+import threading
+import time
+
+# Prometheus metin biçiminin içerik tipi
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Süre histogramlarının varsayılan kovaları (saniye)
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120,
+)  # fmt: skip
+
+# Token histogramlarının kovaları
+TOKEN_BUCKETS = (16, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+# Etiketi bilinmeyen ölçümler için kullanılan değer
+UNLABELED = "none"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """
+    Etiketli ölçümlerin ortak tabanı.
+
+    Etiket değerleri demet olarak saklanır; metin biçimlendirme yalnızca
+    `/metrics` okunurken yapılır, ölçüm anında string üretilmez.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str):
+        """Etiket değerlerine ait alt ölçümü döndürür (yoksa oluşturur)."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} için etiketler: {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self) -> Iterator[Tuple[str, str, float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for suffix, labels, value in self._samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return lines
+
+
+class _CounterValue:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    """Yalnızca artan sayaç."""
+
+    kind = "counter"
+
+    def _new_child(self) -> _CounterValue:
+        return _CounterValue()
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            yield "", _format_labels(self.labelnames, values), child.value
+
+
+class _HistogramValue:
+    __slots__ = ("upper_bounds", "counts", "sum", "_lock")
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        # Son kova +Inf
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.upper_bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """Bloğun süresini monoton saatle ölçüp gözlemler."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+
+class Histogram(_Metric):
+    """Kovalı dağılım ölçümü (Prometheus histogramı)."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.upper_bounds = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.upper_bounds)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _samples(self):
+        names = self.labelnames + ("le",)
+        for values, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.upper_bounds + (float("inf"),), child.counts):
+                cumulative += count
+                labels = _format_labels(names, values + (_format_value(bound),))
+                yield "_bucket", labels, cumulative
+            labels = _format_labels(self.labelnames, values)
+            yield "_count", labels, cumulative
+            yield "_sum", labels, child.sum
+
+
+class MetricsRegistry:
+    """Uygulamanın ölçümlerini tutar ve Prometheus metin biçiminde sunar."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Ölçüm zaten kayıtlı: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# İş akışı yürütmeleri
+WORKFLOW_RUNS = REGISTRY.counter(
+    "workflow_runs_total", "Tamamlanan iş akışı yürütmeleri", ("status",)
+)
+WORKFLOW_RUN_SECONDS = REGISTRY.histogram(
+    "workflow_run_seconds", "İş akışı yürütme süresi", ("status",)
+)
+NODE_QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "workflow_node_queue_wait_seconds",
+    "Düğümün hazır olmasından çalışmaya başlamasına kadar geçen süre",
+)
+NODE_SECONDS = REGISTRY.histogram(
+    "workflow_node_seconds", "Düğüm yürütme süresi", ("agent",)
+)
+NODE_ERRORS = REGISTRY.counter(
+    "workflow_node_errors_total", "Hatayla sonuçlanan düğümler", ("agent",)
+)
+FALLBACKS = REGISTRY.counter(
+    "workflow_fallbacks_total",
+    "Hata nedeniyle yedek davranışa geçilen işlemler",
+    ("kind",),
+)
+JOB_QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "job_queue_wait_seconds", "Arka plan işinin kuyrukta beklediği süre"
+)
+
+# LLM çağrıları
+LLM_CALLS = REGISTRY.counter(
+    "llm_calls_total",
+    "LLM çağrıları (provider, cache ya da coalesced kaynağına göre)",
+    ("model", "source"),
+)
+LLM_SECONDS = REGISTRY.histogram(
+    "llm_request_seconds", "Sağlayıcıya giden LLM çağrısının süresi", ("model",)
+)
+LLM_TTFT_SECONDS = REGISTRY.histogram(
+    "llm_time_to_first_token_seconds",
+    "Akışlı LLM çağrısında ilk metin parçasına kadar geçen süre",
+    ("model",),
+)
+LLM_PROMPT_TOKENS = REGISTRY.histogram(
+    "llm_prompt_tokens", "Çağrı başına girdi tokenı", ("agent", "model"), TOKEN_BUCKETS
+)
+LLM_COMPLETION_TOKENS = REGISTRY.histogram(
+    "llm_completion_tokens",
+    "Çağrı başına çıktı tokenı",
+    ("agent", "model"),
+    TOKEN_BUCKETS,
+)
+LLM_ERRORS = REGISTRY.counter(
+    "llm_errors_total", "Başarısız LLM çağrıları", ("model", "error")
+)
+
+# HTTP katmanı
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "HTTP istekleri", ("method", "route", "status")
+)
+HTTP_SECONDS = REGISTRY.histogram(
+    "http_request_seconds",
+    "HTTP isteğinin yanıt gövdesi tamamlanana kadar süresi",
+    ("method", "route"),
+)
+
+
+def render_metrics() -> str:
+    """Kayıtlı tüm ölçümleri Prometheus metin biçiminde döndürür."""
+    return REGISTRY.render()
+
+
+_agent: ContextVar[str] = ContextVar("metrics_agent", default=UNLABELED)
+
+
+@contextmanager
+def metrics_agent(name: str) -> Iterator[None]:
+    """Bu blok içindeki LLM ölçümlerini ajan adıyla etiketler."""
+    token = _agent.set(name)
+    try:
+        yield
+    finally:
+        _agent.reset(token)
+
+
+def current_agent() -> str:
+    return _agent.get()
+
+
+def observe_llm_usage(model: str, prompt_tokens: int, completion_tokens: int) -> None:
+    """Sağlayıcıdan dönen bir yanıtın token sayılarını kaydeder."""
+    agent = _agent.get()
+    LLM_PROMPT_TOKENS.labels(agent, model).observe(prompt_tokens)
+    LLM_COMPLETION_TOKENS.labels(agent, model).observe(completion_tokens)
+
+
+class MetricsMiddleware:
+    """
+    HTTP isteklerini route şablonuna göre sayan ve süresini ölçen ASGI ara katmanı.
+
+    Yol parametreleri etikete girmesin diye eşleşen route'un şablonu (ör.
+    `/workflows/{workflow_id}`) kullanılır; eşleşmeyen istekler `unmatched`
+    olarak sayılır. Süre, akışlı yanıtlarda gövdenin sonuna kadar ölçülür.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            HTTP_SECONDS.labels(method, path).observe(time.perf_counter() - started)
+            HTTP_REQUESTS.labels(method, path, str(status_code)).inc()
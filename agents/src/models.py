@@ -2,7 +2,7 @@ from pydantic import BaseModel
 
 # from pydantic import BaseModel, Field, EmailStr
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Literal, Optional, Union
 from datetime import datetime
 
 
@@ -84,9 +84,61 @@ class WorkflowExecutionResult(BaseModel):
     results: List[Dict[str, Any]]
     execution_time: float
     status: str
+    usage: Optional[Dict[str, int]] = None
+    skipped_nodes: Optional[List[str]] = None
+    branches: Optional[List[Dict[str, Any]]] = None
 
 
 class WorkflowExecuteRequest(BaseModel):
     """İş akışı yürütme isteği."""
 
     input_text: str = ""
+    max_concurrency: Optional[int] = None
+    bypass_cache: bool = False
+    # Düğümler arası bağlam bütçesi; verilmeyen alanlar ortamdan okunur
+    context_strategy: Optional[
+        Literal["none", "truncate", "keep_last_n", "summarize"]
+    ] = None
+    context_max_tokens: Optional[int] = None
+    context_keep_last: Optional[int] = None
+    # True ise düğüm sonuçları eski ayrıntılı rapor biçiminde döner
+    verbose: bool = False
+
+
+class WorkflowJob(BaseModel):
+    """Arka planda yürütülen iş akışı işi."""
+
+    id: str
+    workflow_id: str
+    user_id: Optional[str] = None
+    # Kiracı sınırının uygulandığı anahtar (X-Tenant-ID ya da sahip)
+    tenant: Optional[str] = None
+    status: str
+    # İşi yürüten işçi süreci ve başka bir süreçten gelen iptal isteği
+    worker: Optional[str] = None
+    cancel_requested: bool = False
+    partial_results: List[Dict[str, Any]] = []
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class WorkflowBatchRequest(BaseModel):
+    """Bir iş akışını birden fazla girdi üzerinde yürütme isteği."""
+
+    # Her girdi bir metin ya da {"id": ..., "input_text": ...} nesnesi olabilir
+    inputs: List[Union[str, Dict[str, Any]]]
+    max_concurrency: Optional[int] = None
+    node_concurrency: Optional[int] = None
+    include_results: bool = False
+    bypass_cache: bool = False
+
+
+class AgentBatchFileRequest(BaseModel):
+    """Bir ajanın girdileri için sağlayıcı toplu API dosyası oluşturma isteği."""
+
+    inputs: List[Union[str, Dict[str, Any]]]
+    submit: bool = False
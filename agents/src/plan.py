@@ -0,0 +1,450 @@
+from typing import Dict, List, Any, Callable, FrozenSet, Mapping, Optional, Tuple
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from types import MappingProxyType
+import logging
+import threading
+from src.utils import get_logger
+from src.looping import loop_options, validate_loop
+from src.routing import router_config, validate_router
+
+logger = get_logger(__name__)
+
+# Ajan değişikliklerinde artan, süreçler arası paylaşılan plan nesli
+PLAN_GENERATION_KEY = "plans.generation"
+
+
+@dataclass(frozen=True)
+class WorkflowPlan:
+    """
+    Derlenmiş, değiştirilemez iş akışı yürütme planı.
+
+    Düğümlerin topolojik sırası, kimlik -> konum dizini ve komşuluk
+    eşlemeleri bir kez hesaplanır; aynı plan birden çok yürütmede
+    yeniden kullanılabilir.
+    """
+
+    nodes: Tuple[Dict[str, Any], ...]
+    order: Tuple[str, ...]
+    node_by_id: Mapping[str, Dict[str, Any]]
+    index: Mapping[str, int]
+    successors: Mapping[str, Tuple[str, ...]]
+    predecessors: Mapping[str, Tuple[str, ...]]
+    start_id: Optional[str]
+    end_id: Optional[str]
+    cycle_nodes: Tuple[str, ...] = ()
+    unreachable_nodes: Tuple[str, ...] = ()
+
+    @property
+    def has_cycle(self) -> bool:
+        """Planda döngüye giren düğüm olup olmadığını döndürür."""
+        return bool(self.cycle_nodes)
+
+    def label(self, node_id: str) -> str:
+        """Düğümün etiketini döndürür."""
+        return self.node_by_id[node_id]["data"]["label"]
+
+
+def _freeze_adjacency(adjacency: Dict[str, List[str]]) -> Mapping[str, Tuple[str, ...]]:
+    """Komşuluk listelerini salt okunur bir eşlemeye dönüştürür."""
+    return MappingProxyType({key: tuple(value) for key, value in adjacency.items()})
+
+
+def compile_workflow_plan(
+    nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]]
+) -> WorkflowPlan:
+    """
+    Düğüm ve kenarlardan Kahn algoritmasıyla yürütme planı derler.
+
+    Çalışma süresi O(N + E)'dir. START düğümü kök düğümlerin önüne alınır,
+    END düğümü ise başka hazır düğüm kalmadığında sıraya eklenir. Döngüye
+    giren düğümler sıranın sonuna özgün sıralarıyla eklenir ve
+    `cycle_nodes` alanında, START'tan ulaşılamayan düğümler ise
+    `unreachable_nodes` alanında raporlanır.
+
+    Args:
+        nodes: İş akışı düğümleri
+        edges: Düğümleri bağlayan kenarlar
+
+    Returns:
+        Derlenmiş iş akışı planı
+    """
+    node_by_id: Dict[str, Dict[str, Any]] = {}
+    start_id = None
+    end_id = None
+    for node in nodes:
+        node_id = node["id"]
+        node_by_id[node_id] = node
+        label = node["data"]["label"]
+        if label == "START" and start_id is None:
+            start_id = node_id
+        elif label == "END" and end_id is None:
+            end_id = node_id
+
+    successors: Dict[str, List[str]] = {node_id: [] for node_id in node_by_id}
+    predecessors: Dict[str, List[str]] = {node_id: [] for node_id in node_by_id}
+    seen_edges = set()
+    for edge in edges:
+        source = edge["source"]
+        target = edge["target"]
+        # Var olmayan düğümlere giden ve tekrar eden kenarları yok say
+        if source not in node_by_id or target not in node_by_id:
+            continue
+        if (source, target) in seen_edges:
+            continue
+        seen_edges.add((source, target))
+        successors[source].append(target)
+        predecessors[target].append(source)
+
+    # Kahn algoritması
+    in_degree = {node_id: len(preds) for node_id, preds in predecessors.items()}
+    ready = deque()
+    if start_id is not None and in_degree[start_id] == 0:
+        ready.append(start_id)
+    ready.extend(
+        node_id
+        for node_id, degree in in_degree.items()
+        if degree == 0 and node_id != start_id
+    )
+    deferred = deque()
+    order: List[str] = []
+
+    while ready or deferred:
+        node_id = ready.popleft() if ready else deferred.popleft()
+        order.append(node_id)
+        for target in successors[node_id]:
+            in_degree[target] -= 1
+            if in_degree[target] == 0:
+                if target == end_id:
+                    deferred.append(target)
+                else:
+                    ready.append(target)
+
+    cycle_nodes: Tuple[str, ...] = ()
+    if len(order) != len(node_by_id):
+        cycle_nodes = tuple(node_id for node_id in node_by_id if in_degree[node_id] > 0)
+        order.extend(cycle_nodes)
+        logger.warning(
+            "İş akışında döngü bulundu, döngüdeki düğüm sayısı: %d", len(cycle_nodes)
+        )
+
+    # START'tan erişilebilirlik
+    unreachable_nodes: Tuple[str, ...] = ()
+    if start_id is not None:
+        reachable = {start_id}
+        queue = deque([start_id])
+        while queue:
+            for target in successors[queue.popleft()]:
+                if target not in reachable:
+                    reachable.add(target)
+                    queue.append(target)
+        if len(reachable) != len(node_by_id):
+            unreachable_nodes = tuple(
+                node_id for node_id in order if node_id not in reachable
+            )
+            logger.warning(
+                "START düğümünden ulaşılamayan düğüm sayısı: %d",
+                len(unreachable_nodes),
+            )
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Düğüm sıralaması: %s",
+            " -> ".join(node_by_id[node_id]["data"]["label"] for node_id in order),
+        )
+
+    return WorkflowPlan(
+        nodes=tuple(node_by_id[node_id] for node_id in order),
+        order=tuple(order),
+        node_by_id=MappingProxyType(node_by_id),
+        index=MappingProxyType({node_id: i for i, node_id in enumerate(order)}),
+        successors=_freeze_adjacency(successors),
+        predecessors=_freeze_adjacency(predecessors),
+        start_id=start_id,
+        end_id=end_id,
+        cycle_nodes=cycle_nodes,
+        unreachable_nodes=unreachable_nodes,
+    )
+
+
+def validate_workflow_structure(nodes: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    İş akışı yapısını doğrular (START ile başlayıp END ile bitmeli).
+
+    Args:
+        nodes: İş akışı düğümleri
+
+    Returns:
+        Doğrulama sonucu: {"valid": bool, "message": str}
+    """
+    # Eğer düğüm yoksa geçersiz
+    if not nodes:
+        return {"valid": False, "message": "İş akışında düğüm bulunamadı"}
+
+    # İlk düğümün START olduğunu kontrol et
+    if nodes[0]["data"]["label"] != "START":
+        return {"valid": False, "message": "İş akışı START düğümü ile başlamalıdır"}
+
+    # Son düğümün END olduğunu kontrol et
+    if nodes[-1]["data"]["label"] != "END":
+        return {"valid": False, "message": "İş akışı END düğümü ile bitmelidir"}
+
+    # Hem START hem de END düğümlerinin sayısını kontrol et
+    start_count = sum(1 for node in nodes if node["data"]["label"] == "START")
+    end_count = sum(1 for node in nodes if node["data"]["label"] == "END")
+
+    if start_count != 1:
+        return {
+            "valid": False,
+            "message": f"İş akışında tek bir START düğümü olmalıdır, mevcut: {start_count}",
+        }
+
+    if end_count != 1:
+        return {
+            "valid": False,
+            "message": f"İş akışında tek bir END düğümü olmalıdır, mevcut: {end_count}",
+        }
+
+    # Tüm kontroller geçildi
+    return {"valid": True, "message": "İş akışı yapısı geçerli"}
+
+
+def validate_router_nodes(graph: WorkflowPlan) -> Optional[Dict[str, Any]]:
+    """
+    Yönlendirici (ROUTER) düğümlerinin ayarlarını doğrular.
+
+    Returns:
+        Hatalı bir yönlendirici varsa doğrulama sonucu, yoksa None
+    """
+    for node in graph.nodes:
+        config = router_config(node)
+        if config is None:
+            continue
+        error = validate_router(config, graph.successors[node["id"]])
+        if error is not None:
+            return {
+                "valid": False,
+                "message": f"{node['data']['label']} düğümü: {error}",
+            }
+    return None
+
+
+def validate_loop_nodes(graph: WorkflowPlan) -> Optional[Dict[str, Any]]:
+    """
+    LOOP düğümlerinin yineleme ayarlarını doğrular.
+
+    Hatalı ayar yürütme sırasında değil derlemede yakalanır; böylece önceki
+    düğümler token harcadıktan sonra iş akışı yarıda kalmaz.
+
+    Returns:
+        Hatalı bir LOOP düğümü varsa doğrulama sonucu, yoksa None
+    """
+    for node in graph.nodes:
+        options = loop_options(node)
+        if options is None:
+            continue
+        error = validate_loop(options)
+        if error is not None:
+            return {
+                "valid": False,
+                "message": f"{node['data']['label']} düğümü: {error}",
+            }
+    return None
+
+
+@dataclass(frozen=True)
+class ExecutionPlan:
+    """
+    Bir iş akışı sürümü için derlenmiş yürütme planı.
+
+    Düğüm sırası, düğümlere bağlı ajanlar ve yapı doğrulama sonucu iş akışı
+    kaydedilirken bir kez hesaplanır; yürütme sırasında graf işlemi yapılmaz.
+    """
+
+    workflow_id: str
+    version: Any
+    graph: WorkflowPlan
+    agents: Mapping[str, Optional[Dict[str, Any]]]
+    agent_ids: FrozenSet[str]
+    validation: Mapping[str, Any]
+
+    @property
+    def valid(self) -> bool:
+        """Planın yürütülebilir olup olmadığını döndürür."""
+        return self.validation["valid"]
+
+
+def node_agent_id(node: Dict[str, Any]) -> str:
+    """Düğümün bağlı olduğu ajan kimliğini döndürür."""
+    return node["data"].get("agentId", node["id"])
+
+
+def workflow_version(workflow: Dict[str, Any]) -> Any:
+    """
+    İş akışının sürümünü (`updated_at`) döndürür.
+
+    Kalıcı depolar zamanı milisaniye hassasiyetinde sakladığı için sürüm
+    milisaniyeye yuvarlanır; böylece depodan okunan kayıt aynı sürümü verir.
+    """
+    version = workflow.get("updated_at")
+    if isinstance(version, datetime):
+        return version.replace(microsecond=version.microsecond // 1000 * 1000)
+    return version
+
+
+def compile_execution_plan(
+    workflow: Dict[str, Any],
+    resolve_agent: Callable[[str], Optional[Dict[str, Any]]],
+) -> ExecutionPlan:
+    """
+    İş akışını yürütülebilir bir plana derler.
+
+    Args:
+        workflow: İş akışı
+        resolve_agent: Ajan kimliğinden ajanı döndüren fonksiyon
+
+    Returns:
+        Derlenmiş yürütme planı
+    """
+    nodes = workflow.get("nodes", [])
+    edges = workflow.get("edges", [])
+    graph = compile_workflow_plan(nodes, edges)
+
+    agents = {}
+    agent_ids = set()
+    for node in graph.nodes:
+        agent_id = node_agent_id(node)
+        agent_ids.add(agent_id)
+        agents[node["id"]] = resolve_agent(agent_id)
+
+    if not graph.nodes:
+        validation = {
+            "valid": False,
+            "message": "İş akışında düğüm bulunamadı veya sıralama başarısız oldu",
+        }
+    elif graph.has_cycle:
+        validation = {
+            "valid": False,
+            "message": "İş akışında döngü bulundu, düğümler sıralanamadı",
+        }
+    else:
+        validation = validate_workflow_structure(list(graph.nodes))
+        if validation["valid"]:
+            validation = (
+                validate_router_nodes(graph) or validate_loop_nodes(graph) or validation
+            )
+
+    return ExecutionPlan(
+        workflow_id=workflow["id"],
+        version=workflow_version(workflow),
+        graph=graph,
+        agents=MappingProxyType(agents),
+        agent_ids=frozenset(agent_ids),
+        validation=MappingProxyType(validation),
+    )
+
+
+class PlanCache:
+    """
+    İş akışı kimliği ve `updated_at` sürümüne göre yürütme planı önbelleği.
+
+    İş akışı güncellendiğinde sürüm değiştiği için eski plan kullanılmaz;
+    bir ajan eklendiğinde veya silindiğinde o ajana başvuran planlar
+    geçersiz kılınır.
+
+    Depo birden çok işçi süreci arasında paylaşılıyorsa `state` verilir:
+    ajan değişiklikleri paylaşılan bir nesil sayacını artırır, sayacın
+    başka bir süreçte arttığını gören önbellek tüm planlarını düşürür.
+    """
+
+    def __init__(self, state=None):
+        self._plans: Dict[str, ExecutionPlan] = {}
+        self._workflows_by_agent: Dict[str, set] = {}
+        self._lock = threading.Lock()
+        self._state = state
+        self._generation = state.get(PLAN_GENERATION_KEY) if state else 0.0
+
+    def _sync_generation(self) -> None:
+        """Başka bir süreçte ajan değiştiyse tüm planları düşürür."""
+        generation = self._state.get(PLAN_GENERATION_KEY)
+        if generation != self._generation:
+            with self._lock:
+                self._plans.clear()
+                self._workflows_by_agent.clear()
+                self._generation = generation
+
+    def get(self, workflow: Dict[str, Any]) -> Optional[ExecutionPlan]:
+        """İş akışının güncel sürümüne ait planı döndürür."""
+        if self._state is not None:
+            self._sync_generation()
+        plan = self._plans.get(workflow["id"])
+        if plan is None or plan.version != workflow_version(workflow):
+            return None
+        return plan
+
+    def compile(
+        self,
+        workflow: Dict[str, Any],
+        resolve_agent: Callable[[str], Optional[Dict[str, Any]]],
+    ) -> ExecutionPlan:
+        """İş akışını derler ve planı önbelleğe kaydeder."""
+        plan = compile_execution_plan(workflow, resolve_agent)
+        with self._lock:
+            self._discard(workflow["id"])
+            self._plans[plan.workflow_id] = plan
+            for agent_id in plan.agent_ids:
+                self._workflows_by_agent.setdefault(agent_id, set()).add(
+                    plan.workflow_id
+                )
+        return plan
+
+    def get_or_compile(
+        self,
+        workflow: Dict[str, Any],
+        resolve_agent: Callable[[str], Optional[Dict[str, Any]]],
+    ) -> ExecutionPlan:
+        """Önbellekteki planı döndürür, yoksa derler."""
+        plan = self.get(workflow)
+        if plan is None:
+            plan = self.compile(workflow, resolve_agent)
+        return plan
+
+    def invalidate_workflow(self, workflow_id: str) -> None:
+        """İş akışına ait planı önbellekten çıkarır."""
+        with self._lock:
+            self._discard(workflow_id)
+
+    def invalidate_agent(self, agent_id: str) -> None:
+        """Ajana başvuran tüm planları önbellekten (ve diğer süreçlerde) çıkarır."""
+        with self._lock:
+            for workflow_id in self._workflows_by_agent.pop(agent_id, ()):
+                self._discard(workflow_id)
+        if self._state is not None:
+            generation = self._state.increment(PLAN_GENERATION_KEY)
+            with self._lock:
+                # Araya başka bir sürecin değişikliği girdiyse her şey düşürülür
+                if generation != self._generation + 1:
+                    self._plans.clear()
+                    self._workflows_by_agent.clear()
+                self._generation = generation
+
+    def clear(self) -> None:
+        """Tüm planları önbellekten çıkarır."""
+        with self._lock:
+            self._plans.clear()
+            self._workflows_by_agent.clear()
+
+    def __len__(self) -> int:
+        return len(self._plans)
+
+    def _discard(self, workflow_id: str) -> None:
+        plan = self._plans.pop(workflow_id, None)
+        if plan is None:
+            return
+        for agent_id in plan.agent_ids:
+            workflow_ids = self._workflows_by_agent.get(agent_id)
+            if workflow_ids is not None:
+                workflow_ids.discard(workflow_id)
+                if not workflow_ids:
+                    del self._workflows_by_agent[agent_id]
@@ -0,0 +1,525 @@
+from typing import (
+    Dict,
+    List,
+    Any,
+    Awaitable,
+    Callable,
+    Iterator,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import asyncio
+import hashlib
+import heapq
+import json
+import os
+import random
+import sys
+import threading
+import time
+from src.utils import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class Priority:
+    """LLM isteklerinin kuyruk öncelikleri (küçük değer önce işlenir)."""
+
+    INTERACTIVE = 0
+    BATCH = 10
+
+
+class LLMUnavailableError(Exception):
+    """LLM sağlayıcısına yeniden denemelere rağmen ulaşılamadığında fırlatılır."""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """Devre kesici açıkken yapılan çağrılarda fırlatılır."""
+
+
+# İstek kapsamındaki öncelik (asyncio görevlerine aktarılır)
+_priority: ContextVar[int] = ContextVar("llm_priority", default=Priority.INTERACTIVE)
+
+
+@contextmanager
+def llm_priority(priority: int) -> Iterator[None]:
+    """Bu blok içindeki LLM çağrılarının kuyruk önceliğini belirler."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def estimate_request_tokens(request: Dict[str, Any]) -> int:
+    """
+    İsteğin dakikalık token kotasından düşeceği miktarı tahmin eder.
+
+    Sağlayıcılar kotaya istem tokenlarıyla birlikte `max_tokens` değerini de
+    sayar; istem için karakter başına ~4 token yaklaşımı kullanılır.
+    """
+    chars = sum(len(message.get("content") or "") for message in request["messages"])
+    return chars // 4 + int(request.get("max_tokens") or 0)
+
+
+class TokenBucket:
+    """
+    Dakikalık kota için token kovası.
+
+    Kova dakikada `per_minute` birim dolar; `per_minute` 0 ise sınırsızdır.
+    Düzeltmeler (`adjust`) kovayı eksiye düşürebilir, bu durumda sonraki
+    istekler borç kapanana kadar bekler.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self.fill_rate = self.capacity / 60.0
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def _refill(self, now: float) -> None:
+        self.level = min(
+            self.capacity, self.level + (now - self.updated) * self.fill_rate
+        )
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """`amount` birimin kullanılabilir olmasına kalan süre (sn)."""
+        if self.unlimited:
+            return 0.0
+        self._refill(now)
+        # Kapasiteden büyük istekler kova tamamen dolunca geçer
+        needed = min(amount, self.capacity) - self.level
+        return max(0.0, needed / self.fill_rate)
+
+    def take(self, amount: float) -> None:
+        if not self.unlimited:
+            self.level -= amount
+
+    def adjust(self, amount: float) -> None:
+        """Tahmin ile gerçekleşen kullanım arasındaki farkı kovaya yansıtır."""
+        if not self.unlimited:
+            self.level = min(self.capacity, self.level - amount)
+
+
+class RateLimiter:
+    """
+    Bir model ve API anahtarı için istek/dakika ve token/dakika sınırlayıcı.
+
+    Kapasite yetmediğinde istekler öncelik sırasına göre bekletilir; aynı
+    öncelikteki istekler geliş sırasıyla geçer. 429 yanıtlarında `pause` ile
+    tüm istekler sağlayıcının istediği süre boyunca durdurulur.
+    """
+
+    def __init__(self, rpm: float, tpm: float):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+        self._waiters: List[Tuple[int, int, int, asyncio.Future]] = []
+        self._seq = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def _try_take(self, tokens: int) -> float:
+        """Kapasite varsa ayırır ve 0 döner; yoksa beklenecek süreyi döner."""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(
+                self.paused_until - now,
+                self.requests.wait_time(1, now),
+                self.tokens.wait_time(tokens, now),
+            )
+            if wait <= 0:
+                self.requests.take(1)
+                self.tokens.take(tokens)
+            return wait
+
+    async def acquire(self, tokens: int, priority: int = Priority.INTERACTIVE) -> None:
+        """Kapasite ayrılana kadar bekler."""
+        if not self._waiters and self._try_take(tokens) <= 0:
+            return
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._seq += 1
+        heapq.heappush(self._waiters, (priority, self._seq, tokens, future))
+        self._schedule(0)
+        await future
+
+    def acquire_blocking(self, tokens: int) -> None:
+        """Senkron çağrılar için kapasite ayrılana kadar uyur."""
+        while True:
+            wait = self._try_take(tokens)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def _schedule(self, delay: float) -> None:
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(delay, self._pump)
+
+    def _pump(self) -> None:
+        self._timer = None
+        while self._waiters:
+            _, _, tokens, future = self._waiters[0]
+            if future.done():
+                # Bekleyen görev iptal edildi
+                heapq.heappop(self._waiters)
+                continue
+            wait = self._try_take(tokens)
+            if wait > 0:
+                self._schedule(wait)
+                return
+            heapq.heappop(self._waiters)
+            future.set_result(None)
+
+    def settle(self, estimated: int, actual: int) -> None:
+        """Gerçek token kullanımını tahminle karşılaştırıp kovayı düzeltir."""
+        with self._lock:
+            self.tokens.adjust(actual - estimated)
+
+    def pause(self, seconds: float) -> None:
+        """Tüm istekleri verilen süre boyunca durdurur."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            self.requests.wait_time(0, now)
+            self.tokens.wait_time(0, now)
+            return {
+                "rpm": self.requests.capacity,
+                "tpm": self.tokens.capacity,
+                "requests_available": round(self.requests.level, 1),
+                "tokens_available": round(self.tokens.level),
+                "queued": sum(1 for *_, future in self._waiters if not future.done()),
+                "paused_for": round(max(0.0, self.paused_until - now), 2),
+            }
+
+
+class CircuitBreaker:
+    """
+    Art arda hatalarda çağrıları geçici olarak kesen devre kesici.
+
+    `failure_threshold` ardışık hatadan sonra devre açılır ve `reset_timeout`
+    boyunca çağrılar hemen reddedilir. Süre dolunca tek bir deneme çağrısına
+    izin verilir (yarı açık); başarılı olursa devre kapanır.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def release_probe(self) -> None:
+        """Sonuçlanmadan biten (ör. iptal edilen) deneme çağrısının yerini boşaltır."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(
+                        "LLM devre kesici açıldı (%d ardışık hata)", self.failures
+                    )
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Yanıttaki Retry-After başlığından beklenecek süreyi okur."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def _is_retryable(error: Exception) -> bool:
+    # openai SDK'sı ilk istemciyle yüklenir; yüklenmediyse hata ondan gelmemiştir
+    openai = sys.modules.get("openai")
+    if openai is None:
+        return False
+    if isinstance(error, openai.APIConnectionError):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+
+class _Lane:
+    """Bir model ve API anahtarının sınırlayıcısı, devre kesicisi ve sayaçları."""
+
+    __slots__ = ("model", "key_id", "limiter", "breaker", "retries", "rate_limited")
+
+    def __init__(
+        self, model: str, key_id: str, limiter: RateLimiter, breaker: CircuitBreaker
+    ):
+        self.model = model
+        self.key_id = key_id
+        self.limiter = limiter
+        self.breaker = breaker
+        self.retries = 0
+        self.rate_limited = 0
+
+
+class LLMScheduler:
+    """
+    LLM çağrıları için merkezi hız sınırlama ve yeniden deneme katmanı.
+
+    Her (API anahtarı, model) çifti kendi kovalarına ve devre kesicisine
+    sahiptir. Geçici hatalar (429, 5xx, bağlantı hataları) Retry-After
+    başlığına uyularak ya da rastgele sapmalı üstel gecikmeyle yeniden
+    denenir. Denemeler tükenirse ya da devre açıksa `LLMUnavailableError`
+    fırlatılır.
+
+    Ortam değişkenleri:
+        LLM_RPM: Model başına dakikalık istek sınırı (varsayılan 500, 0 sınırsız)
+        LLM_TPM: Model başına dakikalık token sınırı (varsayılan 200000, 0 sınırsız)
+        LLM_RATE_LIMITS: Model bazlı sınırlar, ör. {"gpt-4o-mini": {"rpm": 1000}}
+        LLM_MAX_RETRIES: En fazla yeniden deneme (varsayılan 4)
+        LLM_RETRY_BASE_DELAY: İlk gecikme, sn (varsayılan 0.5)
+        LLM_RETRY_MAX_DELAY: En büyük gecikme, sn (varsayılan 30)
+        LLM_BREAKER_THRESHOLD: Devreyi açan ardışık hata sayısı (varsayılan 5)
+        LLM_BREAKER_RESET: Açık devrenin bekleme süresi, sn (varsayılan 30)
+        LLM_RATE_LIMIT_WORKERS: Sınırları paylaşan işçi süreci sayısı; her
+            süreç sınırların bu sayıya bölünmüş payını kullanır (varsayılan 1)
+    """
+
+    def __init__(self):
+        self.default_rpm = float(os.getenv("LLM_RPM", "500"))
+        self.default_tpm = float(os.getenv("LLM_TPM", "200000"))
+        self.model_limits: Dict[str, Dict[str, float]] = json.loads(
+            os.getenv("LLM_RATE_LIMITS", "{}")
+        )
+        self.max_retries = int(os.getenv("LLM_MAX_RETRIES", "4"))
+        self.base_delay = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+        self.max_delay = float(os.getenv("LLM_RETRY_MAX_DELAY", "30"))
+        self.breaker_threshold = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+        self.breaker_reset = float(os.getenv("LLM_BREAKER_RESET", "30"))
+        self.worker_share = 1 / max(1, int(os.getenv("LLM_RATE_LIMIT_WORKERS", "1")))
+        self._lanes: Dict[Tuple[str, str], _Lane] = {}
+        self._lock = threading.Lock()
+
+    def _lane(self, api_key: str, model: str) -> _Lane:
+        lane = self._lanes.get((api_key, model))
+        if lane is not None:
+            return lane
+        with self._lock:
+            lane = self._lanes.get((api_key, model))
+            if lane is None:
+                limits = self.model_limits.get(model, {})
+                lane = _Lane(
+                    model,
+                    hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:8],
+                    RateLimiter(
+                        limits.get("rpm", self.default_rpm) * self.worker_share,
+                        limits.get("tpm", self.default_tpm) * self.worker_share,
+                    ),
+                    CircuitBreaker(self.breaker_threshold, self.breaker_reset),
+                )
+                self._lanes[(api_key, model)] = lane
+        return lane
+
+    def _retry_delay(
+        self, lane: _Lane, error: Exception, attempt: int
+    ) -> Optional[float]:
+        """Hata yeniden denenebilirse beklenecek süreyi, değilse None döndürür."""
+        if not _is_retryable(error) or attempt >= self.max_retries:
+            return None
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            delay = min(retry_after, self.max_delay) * random.uniform(1.0, 1.2)
+        else:
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        if getattr(error, "status_code", None) == 429:
+            lane.rate_limited += 1
+            # Sağlayıcı kotası doldu; bu şeritteki tüm istekler beklesin
+            lane.limiter.pause(delay)
+        return delay
+
+    def _on_error(self, lane: _Lane, error: Exception, attempt: int) -> Optional[float]:
+        if not _is_retryable(error):
+            # İstek hatası (ör. 400); sağlayıcı sağlıklı yanıt verdi
+            lane.breaker.record_success()
+            return None
+        lane.breaker.record_failure()
+        delay = self._retry_delay(lane, error, attempt)
+        if delay is None:
+            raise LLMUnavailableError(
+                f"LLM çağrısı {attempt + 1} denemeden sonra başarısız: {str(error)}"
+            ) from error
+        lane.retries += 1
+        logger.warning(
+            "LLM çağrısı yeniden denenecek (%s, deneme %d, %.2f sn sonra): %s",
+            lane.model,
+            attempt + 1,
+            delay,
+            error,
+        )
+        return delay
+
+    def _admit(self, lane: _Lane) -> bool:
+        """Çağrıya izin verir; yarı açık devrenin deneme çağrısıysa True döndürür."""
+        if not lane.breaker.allow():
+            raise CircuitOpenError(
+                f"LLM sağlayıcısı geçici olarak devre dışı ({lane.model}): "
+                "art arda hatalar nedeniyle devre kesici açık"
+            )
+        return lane.breaker.state == CircuitBreaker.HALF_OPEN
+
+    async def acall(
+        self, api_key: str, request: Dict[str, Any], call: Callable[[], Awaitable[T]]
+    ) -> T:
+        """
+        Asenkron çağrıyı sınırlayıcıdan geçirerek ve gerekirse yeniden deneyerek yapar.
+
+        Args:
+            api_key: Çağrının yapıldığı API anahtarı
+            request: Sohbet tamamlama isteği (model ve token tahmini için)
+            call: Sağlayıcıyı çağıran beklenebilir fonksiyon
+
+        Returns:
+            Çağrının sonucu
+        """
+        lane = self._lane(api_key, request["model"])
+        estimated = estimate_request_tokens(request)
+        attempt = 0
+        while True:
+            probe = self._admit(lane)
+            try:
+                await lane.limiter.acquire(estimated, _priority.get())
+                result = await call()
+            except Exception as e:
+                delay = self._on_error(lane, e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # İptal edilen deneme çağrısı devreyi yarı açık bırakmasın
+                if probe:
+                    lane.breaker.release_probe()
+                raise
+            lane.breaker.record_success()
+            return result
+
+    def call(self, api_key: str, request: Dict[str, Any], call: Callable[[], T]) -> T:
+        """`acall` ile aynı davranışın senkron sürümü (öncelik sırası uygulanmaz)."""
+        lane = self._lane(api_key, request["model"])
+        estimated = estimate_request_tokens(request)
+        attempt = 0
+        while True:
+            probe = self._admit(lane)
+            try:
+                lane.limiter.acquire_blocking(estimated)
+                result = call()
+            except Exception as e:
+                delay = self._on_error(lane, e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                time.sleep(delay)
+                continue
+            except BaseException:
+                if probe:
+                    lane.breaker.release_probe()
+                raise
+            lane.breaker.record_success()
+            return result
+
+    def settle(self, api_key: str, request: Dict[str, Any], actual_tokens: int) -> None:
+        """Yanıttaki gerçek token kullanımını kotaya yansıtır."""
+        if actual_tokens:
+            self._lane(api_key, request["model"]).limiter.settle(
+                estimate_request_tokens(request), actual_tokens
+            )
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "model": lane.model,
+                "key": lane.key_id,
+                "breaker": lane.breaker.state,
+                "retries": lane.retries,
+                "rate_limited": lane.rate_limited,
+                **lane.limiter.stats(),
+            }
+            for lane in list(self._lanes.values())
+        ]
+
+
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """Paylaşılan LLM zamanlayıcısını döndürür; ilk çağrıda oluşturur."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = LLMScheduler()
+    return _scheduler
@@ -0,0 +1,155 @@
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+import os
+import re
+
+# Yönlendirici (ROUTER) düğümünün ajan kimliği
+ROUTER_AGENT_ID = "ROUTER"
+
+# Desteklenen yönlendirme kuralları
+ROUTER_RULES = ("regex", "keyword", "length", "classifier")
+
+# Sınıflandırıcı kuralında kullanılan ucuz model
+ROUTER_MODEL = os.getenv("ROUTER_MODEL", "gpt-4o-mini")
+
+# Sınıflandırıcıya gönderilen metnin en fazla karakter sayısı
+ROUTER_MAX_INPUT_CHARS = 4000
+
+
+def router_config(node: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Düğüm bir yönlendiriciyse `router` ayarlarını döndürür."""
+    data = node.get("data") or {}
+    if data.get("agentId", node.get("id")) != ROUTER_AGENT_ID:
+        return None
+    return data.get("router") or {}
+
+
+def validate_router(config: Dict[str, Any], successors: Iterable[str]) -> Optional[str]:
+    """
+    Yönlendirici ayarlarını doğrular.
+
+    Ayar biçimi:
+        {"rule": "regex" | "keyword" | "length" | "classifier",
+         "routes": [{"target": <düğüm kimliği>, ...kurala özgü alanlar}],
+         "default": <eşleşme olmazsa seçilecek düğüm kimliği>}
+
+    Kurala özgü alanlar: regex için `pattern`, keyword için `keywords`
+    listesi, length için `max_chars`, classifier için `label` (ve isteğe
+    bağlı `description`).
+
+    Returns:
+        Ayarlar geçerliyse None, değilse hata mesajı
+    """
+    if not isinstance(config, dict):
+        return "Yönlendirici ayarları bir nesne olmalı"
+    successors = set(successors)
+    rule = config.get("rule")
+    if rule not in ROUTER_RULES:
+        return f"Geçersiz yönlendirme kuralı: {rule}"
+
+    routes = config.get("routes") or []
+    if not isinstance(routes, list) or not all(
+        isinstance(route, dict) for route in routes
+    ):
+        return "Yönlendirici rotaları nesnelerden oluşan bir liste olmalı"
+    if not routes:
+        return "Yönlendirici en az bir rota içermelidir"
+
+    targets = [route.get("target") for route in routes] + [config.get("default")]
+    for target in targets:
+        if not isinstance(target, str) or target not in successors:
+            return f"Yönlendirici hedefi düğümün çıkış kenarlarında yok: {target}"
+
+    for route in routes:
+        if rule == "regex":
+            try:
+                re.compile(route.get("pattern") or "")
+            except (re.error, TypeError) as e:
+                return f"Geçersiz düzenli ifade ({route['target']}): {str(e)}"
+        elif rule == "keyword" and not route.get("keywords"):
+            return f"Anahtar kelime listesi boş: {route['target']}"
+        elif rule == "keyword" and (
+            not isinstance(route["keywords"], list)
+            or not all(isinstance(keyword, str) for keyword in route["keywords"])
+        ):
+            return f"Anahtar kelimeler metin listesi olmalı: {route['target']}"
+        elif rule == "length" and not isinstance(route.get("max_chars"), int):
+            return f"Uzunluk kuralı için max_chars gerekli: {route['target']}"
+        elif rule == "classifier" and not (
+            isinstance(route.get("label"), str) and route["label"]
+        ):
+            return f"Sınıflandırıcı rotası için label gerekli: {route['target']}"
+    return None
+
+
+def _fold(text: str) -> str:
+    # Türkçe I/ı ve İ/i harfleri de büyük/küçük harf duyarsız eşleşsin
+    return text.casefold().replace("ı", "i").replace("\u0307", "")
+
+
+def _matches(rule: str, route: Dict[str, Any], text: str) -> bool:
+    if rule == "regex":
+        return re.search(route["pattern"], text) is not None
+    if rule == "keyword":
+        folded = _fold(text)
+        return any(_fold(keyword) in folded for keyword in route["keywords"])
+    if rule == "length":
+        return len(text) <= route["max_chars"]
+    return False
+
+
+def select_route(config: Dict[str, Any], text: str) -> Tuple[str, str]:
+    """
+    Kural tabanlı (regex, keyword, length) yönlendirmede hedefi seçer.
+
+    Rotalar sırayla denenir, ilk eşleşen seçilir.
+
+    Returns:
+        (seçilen düğüm kimliği, seçim nedeni)
+    """
+    rule = config["rule"]
+    for index, route in enumerate(config["routes"]):
+        if _matches(rule, route, text):
+            return route["target"], f"{rule} kuralı eşleşti (rota {index + 1})"
+    return config["default"], "Eşleşen rota yok, varsayılan seçildi"
+
+
+def build_classifier_request(config: Dict[str, Any], text: str) -> Dict[str, Any]:
+    """Sınıflandırıcı kuralı için LLM isteğini oluşturur."""
+    labels = "\n".join(
+        f"- {route['label']}"
+        + (f": {route['description']}" if route.get("description") else "")
+        for route in config["routes"]
+    )
+    system_message = (
+        "Sana verilen metni aşağıdaki kategorilerden birine ata. Yalnızca "
+        "kategori adını yaz.\n\n" + labels
+    )
+    return {
+        "model": config.get("model") or ROUTER_MODEL,
+        "messages": [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": text[:ROUTER_MAX_INPUT_CHARS]},
+        ],
+        "temperature": 0,
+        "max_tokens": 20,
+    }
+
+
+def select_classified_route(config: Dict[str, Any], answer: str) -> Tuple[str, str]:
+    """Sınıflandırıcının yanıtındaki kategoriye karşılık gelen hedefi seçer."""
+    answer = _fold(answer.strip().strip("\"'."))
+    for route in config["routes"]:
+        if _fold(route["label"]) == answer:
+            return route["target"], f"Sınıflandırıcı kategorisi: {route['label']}"
+    # Model ek açıklama yazdıysa kategori adını yanıtın içinde ara
+    for route in config["routes"]:
+        if _fold(route["label"]) in answer:
+            return route["target"], f"Sınıflandırıcı kategorisi: {route['label']}"
+    return config["default"], f"Bilinmeyen kategori ({answer}), varsayılan seçildi"
+
+
+def selected_targets(info: Optional[Dict[str, Any]]) -> Optional[List[str]]:
+    """Ajan çıktısının bilgisinden seçilen ardılları döndürür (yönlendirici değilse None)."""
+    if not info or "route" not in info:
+        return None
+    return info["route"]["selected"]
@@ -0,0 +1,539 @@
+from typing import Dict, List, Any, Callable, Iterable, Iterator, Optional
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import json
+import os
+import queue
+import sqlite3
+from src.agents import SYSTEM_AGENT_IDS
+from src.utils import get_logger
+
+logger = get_logger(__name__)
+
+# Prisma şemasıyla (prisma/schema.prisma) birebir aynı tablolar. Next.js
+# tarafı tabloları oluşturmadıysa arka uç da oluşturabilsin diye eklenmiştir.
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS "users" (
+    "id" TEXT NOT NULL PRIMARY KEY,
+    "email" TEXT NOT NULL,
+    "fullName" TEXT NOT NULL,
+    "password" TEXT NOT NULL,
+    "createdAt" DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "updatedAt" DATETIME NOT NULL
+)""",
+    """CREATE UNIQUE INDEX IF NOT EXISTS "users_email_key" ON "users"("email")""",
+    """CREATE TABLE IF NOT EXISTS "agents" (
+    "id" TEXT NOT NULL PRIMARY KEY,
+    "name" TEXT NOT NULL,
+    "description" TEXT NOT NULL,
+    "systemPrompt" TEXT NOT NULL,
+    "queryPrompt" TEXT NOT NULL,
+    "isActive" BOOLEAN NOT NULL DEFAULT false,
+    "createdAt" DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "updatedAt" DATETIME NOT NULL,
+    "tool_selection_checkboxes_tool1" BOOLEAN NOT NULL DEFAULT false,
+    "tool_selection_checkboxes_webSearch" BOOLEAN NOT NULL DEFAULT false,
+    "tool_selection_checkboxes_codeExecution" BOOLEAN NOT NULL DEFAULT false,
+    "tool_selection_checkboxes_fileAnalysis" BOOLEAN NOT NULL DEFAULT false,
+    "userId" TEXT,
+    CONSTRAINT "agents_userId_fkey" FOREIGN KEY ("userId") REFERENCES "users" ("id") ON DELETE CASCADE ON UPDATE CASCADE
+)""",
+    """CREATE TABLE IF NOT EXISTS "workflows" (
+    "id" TEXT NOT NULL PRIMARY KEY,
+    "name" TEXT NOT NULL,
+    "description" TEXT,
+    "nodeCount" INTEGER NOT NULL DEFAULT 0,
+    "agentCount" INTEGER NOT NULL DEFAULT 0,
+    "nodes" TEXT NOT NULL,
+    "edges" TEXT NOT NULL,
+    "createdAt" DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "updatedAt" DATETIME NOT NULL,
+    "userId" TEXT,
+    CONSTRAINT "workflows_userId_fkey" FOREIGN KEY ("userId") REFERENCES "users" ("id") ON DELETE CASCADE ON UPDATE CASCADE
+)""",
+    # Yürütme kayıtları yalnızca Python arka ucuna aittir
+    """CREATE TABLE IF NOT EXISTS "workflow_runs" (
+    "id" TEXT NOT NULL PRIMARY KEY,
+    "workflowId" TEXT,
+    "userId" TEXT,
+    "status" TEXT NOT NULL,
+    "data" TEXT NOT NULL,
+    "createdAt" DATETIME NOT NULL,
+    "updatedAt" DATETIME NOT NULL
+)""",
+    # İşçi süreçlerinin paylaştığı sayaçlar ve kalp atışları
+    """CREATE TABLE IF NOT EXISTS "backend_state" (
+    "key" TEXT NOT NULL PRIMARY KEY,
+    "value" REAL NOT NULL
+)""",
+    """CREATE INDEX IF NOT EXISTS "workflow_runs_status_idx" ON "workflow_runs"("status")""",
+    """CREATE INDEX IF NOT EXISTS "workflow_runs_workflowId_idx" ON "workflow_runs"("workflowId")""",
+    """CREATE INDEX IF NOT EXISTS "workflow_runs_userId_idx" ON "workflow_runs"("userId")""",
+    """CREATE INDEX IF NOT EXISTS "agents_userId_idx" ON "agents"("userId")""",
+    """CREATE INDEX IF NOT EXISTS "agents_name_idx" ON "agents"("name")""",
+    """CREATE INDEX IF NOT EXISTS "workflows_userId_idx" ON "workflows"("userId")""",
+]
+
+
+def _to_millis(value: Any) -> int:
+    """datetime değerini Prisma'nın kullandığı epoch milisaniyesine çevirir."""
+    if value is None:
+        value = datetime.utcnow()
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        value = _from_millis(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+
+def _from_millis(value: Any) -> Optional[datetime]:
+    """Prisma tarih değerini (milisaniye ya da ISO metni) datetime'a çevirir."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value / 1000, tz=timezone.utc).replace(
+            tzinfo=None
+        )
+    text = str(value).replace("Z", "+00:00")
+    parsed = datetime.fromisoformat(text)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _agent_to_row(agent: Dict[str, Any]) -> Dict[str, Any]:
+    tools = agent.get("selected_tools") or {}
+    now = datetime.utcnow()
+    return {
+        "id": agent["id"],
+        "name": agent["name"],
+        "description": agent.get("description") or "",
+        "systemPrompt": agent.get("prompt", ""),
+        "queryPrompt": agent.get("query_prompt", ""),
+        "isActive": bool(agent.get("is_active", False)),
+        "createdAt": _to_millis(agent.get("created_at") or now),
+        "updatedAt": _to_millis(agent.get("updated_at") or now),
+        "tool_selection_checkboxes_tool1": bool(tools.get("tool1", False)),
+        "tool_selection_checkboxes_webSearch": bool(tools.get("webSearch", False)),
+        "tool_selection_checkboxes_codeExecution": bool(
+            tools.get("codeExecution", False)
+        ),
+        "tool_selection_checkboxes_fileAnalysis": bool(
+            tools.get("fileAnalysis", False)
+        ),
+        "userId": agent.get("user_id"),
+    }
+
+
+def _agent_from_row(row: sqlite3.Row) -> Dict[str, Any]:
+    # Sorgu promptu ayrı tutulur (istemde `agent_instructions` birleştirir);
+    # kayıt geri yazıldığında alanlar birbirine karışmaz
+    agent = {
+        "id": row["id"],
+        "name": row["name"],
+        "description": row["description"],
+        "prompt": row["systemPrompt"],
+        "query_prompt": row["queryPrompt"],
+        "is_active": bool(row["isActive"]),
+        "selected_tools": {
+            "tool1": bool(row["tool_selection_checkboxes_tool1"]),
+            "webSearch": bool(row["tool_selection_checkboxes_webSearch"]),
+            "codeExecution": bool(row["tool_selection_checkboxes_codeExecution"]),
+            "fileAnalysis": bool(row["tool_selection_checkboxes_fileAnalysis"]),
+        },
+        "user_id": row["userId"],
+        "created_at": _from_millis(row["createdAt"]),
+        "updated_at": _from_millis(row["updatedAt"]),
+    }
+    # Prisma şemasında tip sütunu yok; sistem ajanları sabit kimliklerinden tanınır
+    if row["id"] in SYSTEM_AGENT_IDS:
+        agent["type"] = "system"
+    return agent
+
+
+def _workflow_to_row(workflow: Dict[str, Any]) -> Dict[str, Any]:
+    nodes = workflow.get("nodes", [])
+    now = datetime.utcnow()
+    return {
+        "id": workflow["id"],
+        "name": workflow["name"],
+        "description": workflow.get("description"),
+        "nodeCount": len(nodes),
+        "agentCount": sum(
+            1
+            for node in nodes
+            if node.get("data", {}).get("label") not in ("START", "END")
+        ),
+        "nodes": json.dumps(nodes, ensure_ascii=False),
+        "edges": json.dumps(workflow.get("edges", []), ensure_ascii=False),
+        "createdAt": _to_millis(workflow.get("created_at") or now),
+        "updatedAt": _to_millis(workflow.get("updated_at") or now),
+        "userId": workflow.get("user_id"),
+    }
+
+
+def _workflow_from_row(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "id": row["id"],
+        "name": row["name"],
+        "description": row["description"],
+        "nodes": json.loads(row["nodes"]),
+        "edges": json.loads(row["edges"]),
+        "user_id": row["userId"],
+        "created_at": _from_millis(row["createdAt"]),
+        "updated_at": _from_millis(row["updatedAt"]),
+    }
+
+
+def _user_to_row(user: Dict[str, Any]) -> Dict[str, Any]:
+    now = datetime.utcnow()
+    return {
+        "id": user["id"],
+        "email": user["email"],
+        "fullName": user.get("full_name", ""),
+        "password": user["password"],
+        "createdAt": _to_millis(user.get("created_at") or now),
+        "updatedAt": _to_millis(user.get("updated_at") or now),
+    }
+
+
+def _user_from_row(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "id": row["id"],
+        "email": row["email"],
+        "full_name": row["fullName"],
+        "password": row["password"],
+        "created_at": _from_millis(row["createdAt"]),
+        "updated_at": _from_millis(row["updatedAt"]),
+    }
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"JSON'a çevrilemeyen değer: {type(value).__name__}")
+
+
+def _run_to_row(run: Dict[str, Any]) -> Dict[str, Any]:
+    now = datetime.utcnow()
+    return {
+        "id": run["id"],
+        "workflowId": run.get("workflow_id"),
+        "userId": run.get("user_id"),
+        "status": run.get("status", "queued"),
+        "data": json.dumps(run, ensure_ascii=False, default=_json_default),
+        "createdAt": _to_millis(run.get("created_at") or now),
+        "updatedAt": _to_millis(run.get("updated_at") or now),
+    }
+
+
+def _run_from_row(row: sqlite3.Row) -> Dict[str, Any]:
+    run = json.loads(row["data"])
+    run["created_at"] = _from_millis(row["createdAt"])
+    run["updated_at"] = _from_millis(row["updatedAt"])
+    return run
+
+
+class SQLiteConnectionPool:
+    """
+    Sabit boyutlu SQLite bağlantı havuzu.
+
+    Her bağlantı WAL kipinde açılır; böylece birden fazla uvicorn işçisi aynı
+    veritabanını okurken yazma işlemleri okuyucuları bloklamaz.
+    """
+
+    def __init__(self, path: str, size: int = 4, busy_timeout_ms: int = 5000):
+        self.path = path
+        self.size = size
+        self._busy_timeout_ms = busy_timeout_ms
+        self._connections: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        for _ in range(size):
+            self._connections.put(self._connect())
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            self.path,
+            timeout=self._busy_timeout_ms / 1000,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=256,
+        )
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(f"PRAGMA busy_timeout={self._busy_timeout_ms}")
+        return connection
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Havuzdan bir bağlantı ödünç alır."""
+        connection = self._connections.get()
+        try:
+            yield connection
+        finally:
+            self._connections.put(connection)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Havuzdan alınan bağlantı üzerinde bir yazma işlemi başlatır."""
+        with self.connection() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    def close(self) -> None:
+        """Havuzdaki tüm bağlantıları kapatır."""
+        while not self._connections.empty():
+            self._connections.get_nowait().close()
+
+
+class SQLiteCollection:
+    """
+    `storage.Collection` ile aynı arayüzü sunan SQLite tablosu.
+
+    SQL ifadeleri bir kez oluşturulur ve parametreli çalıştırılır; sqlite3
+    derlenmiş ifadeleri bağlantı başına önbelleğe alır.
+    """
+
+    def __init__(
+        self,
+        pool: SQLiteConnectionPool,
+        table: str,
+        to_row: Callable[[Dict[str, Any]], Dict[str, Any]],
+        from_row: Callable[[sqlite3.Row], Dict[str, Any]],
+        index_columns: Dict[str, str],
+        columns: List[str],
+    ):
+        self.name = table
+        self._pool = pool
+        self._to_row = to_row
+        self._from_row = from_row
+        self._index_columns = index_columns
+
+        quoted = ", ".join(f'"{column}"' for column in columns)
+        placeholders = ", ".join(f":{column}" for column in columns)
+        self._select_sql = f'SELECT * FROM "{table}"'
+        self._get_sql = f'{self._select_sql} WHERE "id" = ?'
+        self._upsert_sql = (
+            f'INSERT OR REPLACE INTO "{table}" ({quoted}) VALUES ({placeholders})'
+        )
+        self._delete_sql = f'DELETE FROM "{table}" WHERE "id" = ?'
+        assignments = ", ".join(
+            f'"{column}" = :{column}' for column in columns if column != "id"
+        )
+        self._update_if_sql = (
+            f'UPDATE "{table}" SET {assignments} '
+            f'WHERE "id" = :id AND "updatedAt" = :expected_updated_at'
+        )
+        self._count_sql = f'SELECT COUNT(*) FROM "{table}"'
+        self._all_sql = f'{self._select_sql} ORDER BY "createdAt"'
+        self._find_sql = {
+            field: f'{self._select_sql} WHERE "{column}" = ? ORDER BY "createdAt"'
+            for field, column in index_columns.items()
+        }
+
+    def get(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """Kaydı kimliğine göre döndürür."""
+        with self._pool.connection() as connection:
+            row = connection.execute(self._get_sql, (item_id,)).fetchone()
+        return self._from_row(row) if row else None
+
+    def add(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Kaydı ekler; aynı kimlikte kayıt varsa yerine yazar."""
+        with self._pool.transaction() as connection:
+            connection.execute(self._upsert_sql, self._to_row(item))
+        return item
+
+    def add_many(self, items: Iterable[Dict[str, Any]]) -> None:
+        """Kayıtları tek bir işlem içinde toplu olarak yazar."""
+        rows = [self._to_row(item) for item in items]
+        if not rows:
+            return
+        with self._pool.transaction() as connection:
+            connection.executemany(self._upsert_sql, rows)
+
+    def update_if_unchanged(self, item: Dict[str, Any], updated_at: Any) -> bool:
+        """
+        Kaydı yalnızca tablodaki sürüm hâlâ `updated_at` ise yerine yazar.
+
+        Returns:
+            Kayıt yazıldıysa True, başka bir süreç araya girdiyse False
+        """
+        row = {**self._to_row(item), "expected_updated_at": _to_millis(updated_at)}
+        with self._pool.transaction() as connection:
+            return connection.execute(self._update_if_sql, row).rowcount == 1
+
+    def delete(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """Kaydı siler ve silinen kaydı döndürür."""
+        with self._pool.transaction() as connection:
+            row = connection.execute(self._get_sql, (item_id,)).fetchone()
+            if row is None:
+                return None
+            connection.execute(self._delete_sql, (item_id,))
+        return self._from_row(row)
+
+    def find_by(self, field: str, value: Any) -> List[Dict[str, Any]]:
+        """Dizinli bir alana göre eşleşen kayıtları döndürür."""
+        with self._pool.connection() as connection:
+            rows = connection.execute(self._find_sql[field], (value,)).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def find_one(self, field: str, value: Any) -> Optional[Dict[str, Any]]:
+        """Dizinli bir alana göre eşleşen ilk kaydı döndürür."""
+        with self._pool.connection() as connection:
+            row = connection.execute(self._find_sql[field], (value,)).fetchone()
+        return self._from_row(row) if row else None
+
+    def all(self) -> List[Dict[str, Any]]:
+        """Tüm kayıtları oluşturulma sırasıyla döndürür."""
+        with self._pool.connection() as connection:
+            rows = connection.execute(self._all_sql).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.all())
+
+    def __len__(self) -> int:
+        with self._pool.connection() as connection:
+            return connection.execute(self._count_sql).fetchone()[0]
+
+    def __contains__(self, item_id: str) -> bool:
+        return self.get(item_id) is not None
+
+
+class SQLiteState:
+    """`storage.SharedState` ile aynı arayüzü sunan, süreçler arası paylaşılan tablo."""
+
+    _GET_SQL = 'SELECT "value" FROM "backend_state" WHERE "key" = ?'
+    _SET_SQL = 'INSERT OR REPLACE INTO "backend_state" ("key", "value") VALUES (?, ?)'
+    _INCREMENT_SQL = (
+        'INSERT INTO "backend_state" ("key", "value") VALUES (?, ?) '
+        'ON CONFLICT("key") DO UPDATE SET "value" = "value" + excluded."value" '
+        'RETURNING "value"'
+    )
+    _DELETE_SQL = 'DELETE FROM "backend_state" WHERE "key" = ?'
+    _ITEMS_SQL = (
+        'SELECT "key", "value" FROM "backend_state" WHERE substr("key", 1, ?) = ?'
+    )
+
+    def __init__(self, pool: SQLiteConnectionPool):
+        self._pool = pool
+
+    def get(self, key: str, default: float = 0.0) -> float:
+        """Anahtarın değerini döndürür."""
+        with self._pool.connection() as connection:
+            row = connection.execute(self._GET_SQL, (key,)).fetchone()
+        return row[0] if row else default
+
+    def set(self, key: str, value: float) -> None:
+        """Anahtarın değerini yazar."""
+        with self._pool.transaction() as connection:
+            connection.execute(self._SET_SQL, (key, value))
+
+    def increment(self, key: str, amount: float = 1) -> float:
+        """Değeri atomik olarak artırır ve yeni değeri döndürür."""
+        with self._pool.transaction() as connection:
+            return float(
+                connection.execute(self._INCREMENT_SQL, (key, amount)).fetchone()[0]
+            )
+
+    def delete(self, key: str) -> None:
+        """Anahtarı siler."""
+        with self._pool.transaction() as connection:
+            connection.execute(self._DELETE_SQL, (key,))
+
+    def items(self, prefix: str = "") -> Dict[str, float]:
+        """Öneki eşleşen anahtarları ve değerlerini döndürür."""
+        with self._pool.connection() as connection:
+            rows = connection.execute(self._ITEMS_SQL, (len(prefix), prefix)).fetchall()
+        return {row[0]: row[1] for row in rows}
+
+
+class SQLiteStore:
+    """
+    Prisma şemasındaki `agents`, `workflows` ve `users` tablolarını kullanan
+    kalıcı depo. `InMemoryStore` ile aynı arayüzü sunar.
+
+    WAL kipindeki veritabanı dosyası aynı makinedeki tüm uvicorn işçileri
+    tarafından paylaşılır.
+    """
+
+    # Depo birden çok işçi süreci arasında paylaşılabilir mi
+    shared = True
+
+    def __init__(self, path: str, pool_size: int = 4):
+        self.path = path
+        self.pool = SQLiteConnectionPool(path, size=pool_size)
+        with self.pool.transaction() as connection:
+            for statement in SCHEMA:
+                connection.execute(statement)
+
+        self.agents = SQLiteCollection(
+            self.pool,
+            "agents",
+            _agent_to_row,
+            _agent_from_row,
+            {"name": "name", "user_id": "userId"},
+            list(_agent_to_row({"id": "", "name": ""}).keys()),
+        )
+        self.workflows = SQLiteCollection(
+            self.pool,
+            "workflows",
+            _workflow_to_row,
+            _workflow_from_row,
+            {"user_id": "userId"},
+            list(_workflow_to_row({"id": "", "name": ""}).keys()),
+        )
+        self.users = SQLiteCollection(
+            self.pool,
+            "users",
+            _user_to_row,
+            _user_from_row,
+            {"email": "email"},
+            list(_user_to_row({"id": "", "email": "", "password": ""}).keys()),
+        )
+        self.runs = SQLiteCollection(
+            self.pool,
+            "workflow_runs",
+            _run_to_row,
+            _run_from_row,
+            {"status": "status", "workflow_id": "workflowId", "user_id": "userId"},
+            list(_run_to_row({"id": ""}).keys()),
+        )
+        self.state = SQLiteState(self.pool)
+        logger.info("SQLite deposu açıldı: %s (havuz: %d)", path, pool_size)
+
+    def __getitem__(self, name: str) -> SQLiteCollection:
+        if name not in ("agents", "workflows", "users", "runs"):
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def close(self) -> None:
+        """Bağlantı havuzunu kapatır."""
+        self.pool.close()
+
+
+def sqlite_path_from_env() -> str:
+    """
+    Veritabanı yolunu ortam değişkenlerinden belirler.
+
+    Önce `SQLITE_PATH`, sonra Prisma'nın `DATABASE_URL` (file:...) değeri
+    kullanılır. Göreli Prisma yolları prisma/ klasörüne göredir.
+    """
+    path = os.getenv("SQLITE_PATH")
+    if path:
+        return path
+
+    url = os.getenv("DATABASE_URL", "file:./dev.db")
+    if url.startswith("file:"):
+        url = url[len("file:") :]
+    if not os.path.isabs(url):
+        prisma_dir = os.path.join(os.path.dirname(__file__), "..", "..", "prisma")
+        url = os.path.normpath(os.path.join(prisma_dir, url))
+    return url
@@ -0,0 +1,190 @@
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple
+import os
+import threading
+
+
+class Collection:
+    """
+    Kimliğe göre O(1) erişim sağlayan, ikincil dizinli kayıt koleksiyonu.
+
+    Kayıtlar ekleme sırasını koruyan bir sözlükte tutulur. `indexes` ile
+    verilen alanlar için değer -> kayıt kimlikleri dizinleri tutulur.
+    Dizinli bir alan değiştirilecekse kayıt `add` ile yeniden yazılmalıdır.
+    """
+
+    def __init__(self, name: str, indexes: Tuple[str, ...] = ()):
+        self.name = name
+        self._items: Dict[str, Dict[str, Any]] = {}
+        self._indexes: Dict[str, Dict[Any, Dict[str, None]]] = {
+            field: {} for field in indexes
+        }
+        self._lock = threading.RLock()
+
+    def get(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """Kaydı kimliğine göre döndürür."""
+        return self._items.get(item_id)
+
+    def add(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Kaydı ekler; aynı kimlikte kayıt varsa yerine yazar."""
+        with self._lock:
+            previous = self._items.get(item["id"])
+            if previous is not None:
+                self._unindex(previous)
+            self._items[item["id"]] = item
+            self._index(item)
+        return item
+
+    def add_many(self, items: Iterable[Dict[str, Any]]) -> None:
+        """Birden fazla kaydı ekler."""
+        for item in items:
+            self.add(item)
+
+    def update_if_unchanged(self, item: Dict[str, Any], updated_at: Any) -> bool:
+        """
+        Kaydı yalnızca depodaki sürüm hâlâ `updated_at` ise yerine yazar.
+
+        Aynı kaydı birden çok sürecin güncellediği durumlar (iş sahipliği,
+        iptal istekleri) için iyimser eşzamanlılık denetimi sağlar.
+
+        Returns:
+            Kayıt yazıldıysa True, başka bir yazma araya girdiyse False
+        """
+        with self._lock:
+            previous = self._items.get(item["id"])
+            if previous is None or previous.get("updated_at") != updated_at:
+                return False
+            self.add(item)
+        return True
+
+    def delete(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """Kaydı siler ve silinen kaydı döndürür."""
+        with self._lock:
+            item = self._items.pop(item_id, None)
+            if item is not None:
+                self._unindex(item)
+        return item
+
+    def find_by(self, field: str, value: Any) -> List[Dict[str, Any]]:
+        """Dizinli bir alana göre eşleşen kayıtları döndürür."""
+        item_ids = self._indexes[field].get(value, {})
+        return [self._items[item_id] for item_id in item_ids]
+
+    def find_one(self, field: str, value: Any) -> Optional[Dict[str, Any]]:
+        """Dizinli bir alana göre eşleşen ilk kaydı döndürür."""
+        for item_id in self._indexes[field].get(value, {}):
+            return self._items[item_id]
+        return None
+
+    def all(self) -> List[Dict[str, Any]]:
+        """Tüm kayıtları ekleme sırasıyla döndürür."""
+        return list(self._items.values())
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(list(self._items.values()))
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._items
+
+    def _index(self, item: Dict[str, Any]) -> None:
+        for field, index in self._indexes.items():
+            value = item.get(field)
+            if value is not None:
+                index.setdefault(value, {})[item["id"]] = None
+
+    def _unindex(self, item: Dict[str, Any]) -> None:
+        for field, index in self._indexes.items():
+            value = item.get(field)
+            item_ids = index.get(value)
+            if item_ids is not None:
+                item_ids.pop(item["id"], None)
+                if not item_ids:
+                    del index[value]
+
+
+class SharedState:
+    """
+    Küçük sayısal değerler için anahtar-değer tablosu (sayaçlar, kalp atışları).
+
+    Bellek içi depoda süreç içindedir; SQLite deposunda aynı makinedeki
+    tüm işçi süreçleri tarafından paylaşılır.
+    """
+
+    def __init__(self):
+        self._values: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: float = 0.0) -> float:
+        """Anahtarın değerini döndürür."""
+        return self._values.get(key, default)
+
+    def set(self, key: str, value: float) -> None:
+        """Anahtarın değerini yazar."""
+        with self._lock:
+            self._values[key] = value
+
+    def increment(self, key: str, amount: float = 1) -> float:
+        """Değeri atomik olarak artırır ve yeni değeri döndürür."""
+        with self._lock:
+            value = self._values.get(key, 0.0) + amount
+            self._values[key] = value
+        return value
+
+    def delete(self, key: str) -> None:
+        """Anahtarı siler."""
+        with self._lock:
+            self._values.pop(key, None)
+
+    def items(self, prefix: str = "") -> Dict[str, float]:
+        """Öneki eşleşen anahtarları ve değerlerini döndürür."""
+        with self._lock:
+            return {k: v for k, v in self._values.items() if k.startswith(prefix)}
+
+
+class InMemoryStore:
+    """
+    Bellek içi depo.
+
+    Ajan, iş akışı, kullanıcı ve yürütme koleksiyonlarını barındırır. Eski
+    `db["agents"]` erişim biçimi de desteklenir ve ilgili koleksiyonu döndürür.
+    Süreçler arasında paylaşılmadığı için tek işçiyle kullanılmalıdır.
+    """
+
+    # Depo birden çok işçi süreci arasında paylaşılabilir mi
+    shared = False
+
+    def __init__(self):
+        self.agents = Collection("agents", indexes=("name", "user_id"))
+        self.workflows = Collection("workflows", indexes=("user_id",))
+        self.users = Collection("users", indexes=("email",))
+        self.runs = Collection("runs", indexes=("status", "workflow_id", "user_id"))
+        self.state = SharedState()
+
+    def __getitem__(self, name: str) -> Collection:
+        if name not in ("agents", "workflows", "users", "runs"):
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def close(self) -> None:
+        """Bellek içi depoda kapatılacak kaynak yoktur."""
+
+
+def create_store():
+    """
+    `STORAGE_BACKEND` ortam değişkenine göre depo oluşturur.
+
+    - memory (varsayılan): süreç içinde yaşayan `InMemoryStore`
+    - sqlite: Prisma şemasını kullanan kalıcı `SQLiteStore`
+    """
+    backend = os.getenv("STORAGE_BACKEND", "memory").lower()
+    if backend == "sqlite":
+        from src.sqlite_store import SQLiteStore, sqlite_path_from_env
+
+        return SQLiteStore(
+            sqlite_path_from_env(), pool_size=int(os.getenv("SQLITE_POOL_SIZE", "4"))
+        )
+    if backend != "memory":
+        raise ValueError(f"Bilinmeyen depolama arka ucu: {backend}")
+    return InMemoryStore()
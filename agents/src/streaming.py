@@ -0,0 +1,82 @@
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+import asyncio
+import json
+import os
+from src.utils import get_logger
+
+logger = get_logger(__name__)
+
+# Bağlantının ara sunucularda kapanmaması için boşta gönderilen yorum aralığı (sn)
+SSE_HEARTBEAT_INTERVAL = float(os.getenv("SSE_HEARTBEAT_INTERVAL", "15"))
+
+# SSE yanıtlarında tamponlamayı kapatan başlıklar
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+}
+
+# Olay yayıcı: (olay adı, veri) alır, bloklamaz
+EventEmitter = Callable[[str, Dict[str, Any]], None]
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Bir olayı Server-Sent Events biçiminde metne dönüştürür."""
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+async def sse_event_stream(
+    produce: Callable[[EventEmitter], Awaitable[Optional[Dict[str, Any]]]],
+    final_event: str,
+    heartbeat_interval: float = SSE_HEARTBEAT_INTERVAL,
+) -> AsyncIterator[str]:
+    """
+    Bir üreticiyi arka planda çalıştırıp yaydığı olayları SSE olarak aktarır.
+
+    Üretici kendisine verilen yayıcıyla olay gönderir; döndürdüğü değer
+    `final_event` olayı olarak en sona eklenir. Hata olursa `error` olayı
+    gönderilir. İstemci bağlantıyı kapatırsa üretici iptal edilir.
+
+    Args:
+        produce: Yayıcı alan ve son olay verisini döndüren beklenebilir fonksiyon
+        final_event: Üretici bittiğinde gönderilecek olayın adı
+        heartbeat_interval: Olay gelmediğinde canlılık yorumu gönderme aralığı
+
+    Yields:
+        SSE biçiminde metin parçaları
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def emit(event: str, data: Dict[str, Any]) -> None:
+        queue.put_nowait((event, data))
+
+    async def run() -> None:
+        try:
+            result = await produce(emit)
+            emit(final_event, result if result is not None else {})
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Akış üretici hatası: %s", e)
+            emit("error", {"message": str(e)})
+        finally:
+            queue.put_nowait(None)
+
+    task = asyncio.create_task(run())
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=heartbeat_interval)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if item is None:
+                break
+            yield format_sse(*item)
+    finally:
+        # İstemci ayrıldıysa üretici boşuna LLM çağrısı yapmaya devam etmesin
+        if not task.done():
+            logger.info("Akış istemcisi ayrıldı, üretici iptal ediliyor")
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
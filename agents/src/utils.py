@@ -1,47 +1,264 @@
+from typing import Dict, Iterator, Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+import atexit
+import json
 import os
 import logging
+import queue
+import random
 from dotenv import load_dotenv
-from openai import OpenAI
 
-# Loglama yapılandırması
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-)
-logger = logging.getLogger("agent-workflow")
+# Uygulamanın kök logger'ı; modül logger'ları bunun altında açılır
+LOGGER_NAME = "agent-workflow"
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Tek bir log mesajının en fazla karakter sayısı (fazlası kısaltılır)
+LOG_MAX_MESSAGE_CHARS = int(os.getenv("LOG_MAX_MESSAGE_CHARS", "4000"))
+
+# `clip` ile loglanan metin içeriklerinin (girdi, yanıt) en fazla karakter sayısı
+LOG_PAYLOAD_CHARS = int(os.getenv("LOG_PAYLOAD_CHARS", "200"))
+
+# Düğüm ayrıntı (DEBUG) loglarının yazılacağı yürütmelerin oranı
+LOG_NODE_SAMPLE_RATE = float(os.getenv("LOG_NODE_SAMPLE_RATE", "0.1"))
+
+# LogRecord'un standart alanları; geri kalanlar `extra` ile verilmiştir
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class TruncatingFormatter(logging.Formatter):
+    """Çok uzun mesajları `max_chars` karakterde kısaltan biçimlendirici."""
+
+    def __init__(self, fmt: Optional[str] = None, max_chars: int = 4000):
+        super().__init__(fmt)
+        self.max_chars = max_chars
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        if len(message) > self.max_chars:
+            dropped = len(message) - self.max_chars
+            record.msg = (
+                f"{message[:self.max_chars]}... [{dropped} karakter kısaltıldı]"
+            )
+            record.args = None
+        return super().format(record)
+
+
+class JsonFormatter(TruncatingFormatter):
+    """Her kaydı tek satırlık JSON nesnesi olarak yazar (`extra` alanları dahil)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        super().format(record)
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.message,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Kaydı biçimlendirmeden kuyruğa koyan işleyici.
+
+    Standart `QueueHandler` mesajı çağıran iş parçacığında biçimlendirir;
+    burada biçimlendirme ve yazma dinleyici iş parçacığına bırakılır. Bu
+    nedenle log argümanları sonradan değiştirilmeyen değerler olmalıdır.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+_listener: Optional[QueueListener] = None
+
+
+def _parse_levels(spec: str) -> Dict[str, str]:
+    levels = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging() -> None:
+    """
+    Loglamayı ortam değişkenlerine göre yapılandırır.
+
+    Log kayıtları bir kuyruğa yazılır; biçimlendirme ve akışa yazma ayrı bir
+    dinleyici iş parçacığında yapılır, böylece istek yolu G/Ç beklemez.
+
+    Ortam değişkenleri (varsayılanlar):
+        LOG_LEVEL: Kök log düzeyi (INFO)
+        LOG_LEVELS: Logger bazında düzeyler, ör.
+            "agent-workflow.workflow=DEBUG,httpx=WARNING"
+        LOG_FORMAT: text ya da json (text)
+        LOG_QUEUE: false ise kayıtlar doğrudan yazılır (true)
+    """
+    global _listener
+    root = logging.getLogger()
+    if root.handlers:
+        # Uygulama dışında (ör. uvicorn --log-config) yapılandırılmış
+        return
+
+    if os.getenv("LOG_FORMAT", "text").lower() == "json":
+        formatter = JsonFormatter(max_chars=LOG_MAX_MESSAGE_CHARS)
+    else:
+        formatter = TruncatingFormatter(LOG_FORMAT, max_chars=LOG_MAX_MESSAGE_CHARS)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+
+    if os.getenv("LOG_QUEUE", "true").lower() in ("0", "false", "no"):
+        root.addHandler(stream_handler)
+    else:
+        log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        root.addHandler(DeferredQueueHandler(log_queue))
+        _listener = QueueListener(log_queue, stream_handler)
+        _listener.start()
+        atexit.register(stop_logging)
+
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    for name, level in _parse_levels(os.getenv("LOG_LEVELS", "")).items():
+        logging.getLogger(name).setLevel(level)
+
+
+def stop_logging() -> None:
+    """Kuyrukta bekleyen kayıtları yazar ve dinleyiciyi durdurur."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(module_name: str) -> logging.Logger:
+    """
+    Modül logger'ını döndürür (ör. `src.workflow` -> `agent-workflow.workflow`).
+
+    Modül logger'ları kök uygulama logger'ının altındadır; düzeyleri
+    `LOG_LEVELS` ile ayrı ayrı ayarlanabilir.
+    """
+    return logging.getLogger(f"{LOGGER_NAME}.{module_name.rsplit('.', 1)[-1]}")
+
+
+class clip:
+    """
+    Uzun metni log için kısaltan tembel sarmalayıcı.
+
+    Kısaltma yalnızca mesaj gerçekten biçimlendirilirse (log düzeyi açıksa)
+    dinleyici iş parçacığında yapılır: `logger.debug("Girdi: %s", clip(text))`
+    """
+
+    __slots__ = ("text", "limit")
+
+    def __init__(self, text: str, limit: int = LOG_PAYLOAD_CHARS):
+        self.text = text
+        self.limit = limit
+
+    def __str__(self) -> str:
+        if len(self.text) <= self.limit:
+            return self.text
+        return f"{self.text[:self.limit]}... ({len(self.text)} karakter)"
+
+
+class lazy:
+    """
+    Değeri yalnızca log gerçekten yazılacaksa hesaplayan sarmalayıcı.
+
+    `log_node_event(logger, "Zincir: %s", lazy(" -> ".join, agent_chain))`
+    """
+
+    __slots__ = ("fn", "args")
+
+    def __init__(self, fn, *args):
+        self.fn = fn
+        self.args = args
+
+    def __str__(self) -> str:
+        return str(self.fn(*self.args))
+
+
+_node_sampled: ContextVar[bool] = ContextVar("log_node_sampled", default=False)
+
+
+@contextmanager
+def sample_node_logs(rate: Optional[float] = None) -> Iterator[bool]:
+    """
+    Bu blok içindeki düğüm ayrıntı loglarının yazılıp yazılmayacağını seçer.
+
+    Seçim yürütme başına bir kez yapılır; örneklenen yürütmelerin tüm düğüm
+    olayları birlikte görünür, diğerlerininki hiç üretilmez.
+    """
+    rate = LOG_NODE_SAMPLE_RATE if rate is None else rate
+    sampled = rate >= 1 or random.random() < rate
+    token = _node_sampled.set(sampled)
+    try:
+        yield sampled
+    finally:
+        _node_sampled.reset(token)
+
+
+def log_node_event(log: logging.Logger, msg: str, *args) -> None:
+    """Düğüm ayrıntı olayını DEBUG düzeyinde loglar (yalnızca örneklenen yürütmelerde)."""
+    if _node_sampled.get() and log.isEnabledFor(logging.DEBUG):
+        # Değiştirilebilir nesnelere bağlı değerler kuyruğa girmeden hesaplanır
+        log.debug(msg, *(str(a) if isinstance(a, lazy) else a for a in args))
+
+
+configure_logging()
+logger = logging.getLogger(LOGGER_NAME)
 
 
 def load_environment():
     """Çevresel değişkenleri .env dosyasından yükler."""
-    logger.info(f"Çalışma klasörü: {os.getcwd()}")
+    logger.info("Çalışma klasörü: %s", os.getcwd())
     env_paths = ["agent-workflow-backend/.env", ".env"]
 
     for path in env_paths:
         if os.path.exists(path):
-            logger.info(f"{path} dosyası bulundu, yükleniyor...")
+            logger.info("%s dosyası bulundu, yükleniyor...", path)
             load_dotenv(path)
             return True
 
     logger.warning(
-        f"UYARI: .env dosyası bulunamadı! Aranılan konumlar: {', '.join(env_paths)}"
+        "UYARI: .env dosyası bulunamadı! Aranılan konumlar: %s", ", ".join(env_paths)
     )
     return False
 
 
 def initialize_openai_client():
-    """OpenAI API istemcisini yapılandırır ve başlatır."""
-    api_key = os.getenv("OPENAI_API_KEY", "")
+    """
+    OpenAI API istemcisini yapılandırır ve başlatır.
 
-    if not api_key:
-        logger.warning("UYARI: OpenAI API anahtarı bulunamadı!")
+    Uygulama genelinde paylaşılan, bağlantı havuzlu istemciyi döndürür.
+    """
+    from src.llm import get_sync_client
+
+    try:
+        return get_sync_client()
+    except Exception as e:
+        logger.error("OpenAI istemcisi oluşturulamadı: %s", e)
         return None
 
-    logger.info("OpenAI API anahtarı bulundu.")
+
+def initialize_async_openai_client():
+    """
+    Asenkron OpenAI API istemcisini yapılandırır ve başlatır.
+
+    Uygulama genelinde paylaşılan, bağlantı havuzlu istemciyi döndürür.
+    """
+    from src.llm import get_async_client
 
     try:
-        client = OpenAI(api_key=api_key)
-        logger.info("OpenAI istemcisi başarıyla oluşturuldu.")
-        return client
+        return get_async_client()
     except Exception as e:
-        logger.error(f"OpenAI istemcisi oluşturulamadı: {str(e)}")
+        logger.error("Asenkron OpenAI istemcisi oluşturulamadı: %s", e)
         return None
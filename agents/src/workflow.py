@@ -1,7 +1,111 @@
-from typing import Dict, List, Any, Callable, Union
+from typing import Dict, List, Any, Awaitable, Callable, Iterable, Optional, Union
+import asyncio
+import logging
 import time
 from datetime import datetime
-from src.utils import logger
+from src.utils import get_logger, log_node_event, sample_node_logs
+from src.agents import AgentOutput
+from src.dag import WorkflowRun, reachable_from, run_workflow_plan
+from src.llm import UsageRecorder, record_llm_usage, stream_llm_tokens
+from src.context import ContextBudget, estimate_tokens
+from src.ratelimit import LLMUnavailableError
+from src.routing import selected_targets
+from src.metrics import (
+    NODE_ERRORS,
+    NODE_SECONDS,
+    WORKFLOW_RUNS,
+    WORKFLOW_RUN_SECONDS,
+    metrics_agent,
+)
+from src.storage import InMemoryStore
+from src.plan import (
+    ExecutionPlan,
+    WorkflowPlan,
+    compile_execution_plan,
+    compile_workflow_plan,
+    node_agent_id,
+    validate_workflow_structure,
+)
+
+logger = get_logger(__name__)
+
+
+class NodeResult:
+    """
+    Bir düğümün yürütme sonucu.
+
+    Metinler kopyalanmaz: düğümün girdisi ebeveyninin çıktısıyla aynı
+    nesnedir ve yanıtta yalnızca ebeveyn kimlikleriyle (`input_from`)
+    belirtilir. Ayrıntılı biçimdeki rapor metni yalnızca istendiğinde
+    oluşturulur.
+    """
+
+    __slots__ = (
+        "node_id",
+        "agent_name",
+        "input_from",
+        "input_text",
+        "result",
+        "usage",
+        "execution_time",
+    )
+
+    def __init__(
+        self,
+        node_id: str,
+        agent_name: str,
+        input_from: Iterable[str],
+        input_text: str,
+        result: Union[str, AgentOutput],
+        usage: Optional[Dict[str, Any]] = None,
+        execution_time: Optional[float] = None,
+    ):
+        self.node_id = node_id
+        self.agent_name = agent_name
+        self.input_from = list(input_from)
+        self.input_text = input_text
+        self.result = result
+        self.usage = usage
+        self.execution_time = execution_time
+
+    @property
+    def text(self) -> str:
+        """Sonraki düğümlere aktarılan çıktı metni."""
+        return _node_output_text(self.result)
+
+    def to_dict(self, verbose: bool = False) -> Dict[str, Any]:
+        """
+        Sonucu API yanıtı için sözlüğe dönüştürür.
+
+        Args:
+            verbose: True ise eski biçim kullanılır; `processed_text` girdinin
+                tamamını, `output` ise işlem detaylarını içeren rapor metnini
+                taşır
+
+        Returns:
+            node_id, agent_name, input_from, output (ve varsa usage) alanları
+        """
+        entry: Dict[str, Any] = {
+            "node_id": self.node_id,
+            "agent_name": self.agent_name,
+            "input_from": self.input_from,
+        }
+        if verbose:
+            entry["processed_text"] = self.input_text
+            entry["output"] = (
+                self.result.render()
+                if isinstance(self.result, AgentOutput)
+                else self.result
+            )
+        else:
+            entry["output"] = self.text
+        if isinstance(self.result, AgentOutput) and self.result.info:
+            entry.update(self.result.info)
+        if self.execution_time is not None:
+            entry["execution_time"] = self.execution_time
+        if self.usage is not None:
+            entry["usage"] = self.usage
+        return entry
 
 
 def sort_workflow_nodes(
@@ -10,6 +114,9 @@ def sort_workflow_nodes(
     """
     İş akışı düğümlerini sıralar.
 
+    Sıralama `compile_workflow_plan` ile doğrusal zamanda yapılır; planın
+    kendisine ihtiyaç duyan çağıranlar doğrudan o fonksiyonu kullanmalıdır.
+
     Args:
         nodes: Sıralanacak düğümler listesi
         edges: Düğümleri bağlayan kenarlar listesi
@@ -17,118 +124,70 @@ def sort_workflow_nodes(
     Returns:
         Sıralanmış düğümler listesi
     """
-    logger.info(
-        f"İş akışı düğümleri sıralanıyor. Düğüm sayısı: {len(nodes)}, Kenar sayısı: {len(edges)}"
-    )
-
-    # Düğümlerin bir kopyasını oluştur
-    sorted_nodes = nodes.copy()
-
-    # Eğer düğüm yoksa boş liste döndür
-    if not sorted_nodes:
+    if not nodes:
         logger.warning("Sıralanacak düğüm bulunamadı")
         return []
 
-    # START düğümünü bul ve en başa yerleştir
-    start_node_index = None
-    for i, node in enumerate(sorted_nodes):
-        if node["data"]["label"] == "START":
-            start_node_index = i
-            break
-
-    if start_node_index is not None:
-        # START düğümünü en başa taşı
-        start_node = sorted_nodes.pop(start_node_index)
-        sorted_nodes.insert(0, start_node)
-    else:
+    plan = compile_workflow_plan(nodes, edges)
+    if plan.start_id is None:
         logger.warning("START düğümü bulunamadı, sıralama sorunlu olabilir")
 
-    # Kenarları düğüm ID'lerine göre eşleştirelim
-    # source -> [target1, target2, ...]
-    edge_map = {}
-    for edge in edges:
-        source = edge["source"]
-        target = edge["target"]
-        if source not in edge_map:
-            edge_map[source] = []
-        edge_map[source].append(target)
-
-    # Düğümlerin sırasını kenar bağlantılarına göre düzenle
-    if start_node_index is not None:
-        visited = set([sorted_nodes[0]["id"]])  # START düğümü ziyaret edildi
-        i = 0
-
-        while i < len(sorted_nodes):
-            current_node_id = sorted_nodes[i]["id"]
-
-            # Bu düğümden çıkan kenarları kontrol et
-            if current_node_id in edge_map:
-                for target_id in edge_map[current_node_id]:
-                    # Hedef düğümü bul
-                    target_index = None
-                    for j, node in enumerate(sorted_nodes):
-                        if node["id"] == target_id and target_id not in visited:
-                            target_index = j
-                            break
-
-                    # Eğer hedef düğüm bulunduysa ve ziyaret edilmediyse
-                    if target_index is not None:
-                        # Düğümü mevcut düğümün hemen arkasına taşı
-                        target_node = sorted_nodes.pop(target_index)
-                        sorted_nodes.insert(i + 1, target_node)
-                        visited.add(target_id)
-
-            i += 1
-
-    logger.info(f"Düğüm sıralama tamamlandı. Sıralı düğüm sayısı: {len(sorted_nodes)}")
-
-    # Sıralı düğüm ID'lerini log'a ekle
-    node_sequence = " -> ".join([node["data"]["label"] for node in sorted_nodes])
-    logger.info(f"Düğüm sıralaması: {node_sequence}")
+    logger.info("Düğüm sıralama tamamlandı. Sıralı düğüm sayısı: %d", len(plan.nodes))
+    return list(plan.nodes)
 
-    return sorted_nodes
+
+def _find_agent(db: InMemoryStore, agent_id: str) -> Optional[Dict[str, Any]]:
+    """Ajanı kimliğine göre veritabanında bulur."""
+    return db["agents"].get(agent_id)
 
 
-def validate_workflow_structure(nodes: List[Dict[str, Any]]) -> Dict[str, Any]:
+def _start_workflow_node(
+    node: Dict[str, Any],
+    agent_chain: List[str],
+    db: InMemoryStore,
+    plan: Optional[ExecutionPlan] = None,
+) -> Union[str, Dict[str, Any]]:
     """
-    İş akışı yapısını doğrular (START ile başlayıp END ile bitmeli).
+    Düğümü zincire ekler ve ilgili ajanı çözer.
 
-    Args:
-        nodes: İş akışı düğümleri
+    Plan verilmişse ajan plandan alınır, aksi halde veritabanında aranır.
 
     Returns:
-        Doğrulama sonucu: {"valid": bool, "message": str}
+        Bulunan ajan (dict) ya da ajan bulunamadıysa hata mesajı (str)
     """
-    # Eğer düğüm yoksa geçersiz
-    if not nodes:
-        return {"valid": False, "message": "İş akışında düğüm bulunamadı"}
-
-    # İlk düğümün START olduğunu kontrol et
-    if nodes[0]["data"]["label"] != "START":
-        return {"valid": False, "message": "İş akışı START düğümü ile başlamalıdır"}
+    node_id = node_agent_id(node)
+    node_label = node["data"]["label"]
+    agent_chain.append(node_label)
 
-    # Son düğümün END olduğunu kontrol et
-    if nodes[-1]["data"]["label"] != "END":
-        return {"valid": False, "message": "İş akışı END düğümü ile bitmelidir"}
+    log_node_event(logger, "Düğüm işleniyor: %s (ID: %s)", node_label, node_id)
 
-    # Hem START hem de END düğümlerinin sayısını kontrol et
-    start_count = sum(1 for node in nodes if node["data"]["label"] == "START")
-    end_count = sum(1 for node in nodes if node["data"]["label"] == "END")
+    # İlgili ajanı bul
+    if plan is not None:
+        agent = plan.agents.get(node["id"])
+    else:
+        agent = _find_agent(db, node_id)
+    if not agent:
+        error_msg = f"Ajan bulunamadı: {node_id}"
+        logger.error(error_msg)
+        return error_msg
 
-    if start_count != 1:
-        return {
-            "valid": False,
-            "message": f"İş akışında tek bir START düğümü olmalıdır, mevcut: {start_count}",
-        }
+    log_node_event(logger, "Ajan bulundu: %s (ID: %s)", agent["name"], agent["id"])
+    return agent
 
-    if end_count != 1:
-        return {
-            "valid": False,
-            "message": f"İş akışında tek bir END düğümü olmalıdır, mevcut: {end_count}",
-        }
 
-    # Tüm kontroller geçildi
-    return {"valid": True, "message": "İş akışı yapısı geçerli"}
+def _log_node_result(
+    agent: Dict[str, Any], result: Union[str, AgentOutput]
+) -> Union[str, AgentOutput]:
+    """Ajan sonucunu loglar ve olduğu gibi döndürür."""
+    if isinstance(result, AgentOutput):
+        log_node_event(
+            logger, "Ajan işlemi başarılı: %s, GPT yanıtı alındı", agent["name"]
+        )
+    else:
+        log_node_event(
+            logger, "Ajan işlemi başarılı: %s, metin yanıtı alındı", agent["name"]
+        )
+    return result
 
 
 def process_workflow_node(
@@ -136,11 +195,11 @@ def process_workflow_node(
     input_text: str,
     agent_chain: List[str],
     previous_agents: List[Dict[str, Any]],
-    db: Dict[str, List[Dict[str, Any]]],
+    db: InMemoryStore,
     openai_client: Any,
     openai_api_key: str,
     process_with_agent_fn: Callable,
-) -> Union[str, Dict[str, Any]]:
+) -> Union[str, AgentOutput]:
     """
     Bir iş akışı düğümünü işler.
 
@@ -149,7 +208,7 @@ def process_workflow_node(
         input_text: Giriş metni
         agent_chain: Ajanların zinciri
         previous_agents: Önceki ajanlar
-        db: Veritabanı
+        db: Veritabanı deposu (ajan koleksiyonu kimliğe göre erişim sağlar)
         openai_client: OpenAI istemcisi
         openai_api_key: OpenAI API anahtarı
         process_with_agent_fn: Ajan işleme fonksiyonu
@@ -157,58 +216,193 @@ def process_workflow_node(
     Returns:
         İşlenmiş çıktı
     """
-    node_id = node["data"].get("agentId", node["id"])
-    node_label = node["data"]["label"]
-    agent_chain.append(node_label)
+    agent = _start_workflow_node(node, agent_chain, db)
+    if isinstance(agent, str):
+        return agent
 
-    logger.info(f"Düğüm işleniyor: {node_label} (ID: {node_id})")
-
-    # İlgili ajanı bul
-    agent = None
-    for a in db["agents"]:
-        if a["id"] == node_id:
-            agent = a
-            break
-
-    if not agent:
-        error_msg = f"Ajan bulunamadı: {node_id}"
+    # Ajanı çalıştır
+    try:
+        log_node_event(logger, "Ajan işlemi başlatılıyor: %s", agent["name"])
+        with metrics_agent(agent["name"]), NODE_SECONDS.labels(agent["name"]).time():
+            result = process_with_agent_fn(
+                agent=agent,
+                input_text=input_text,
+                agent_chain=agent_chain,
+                previous_agents=previous_agents,
+                openai_client=openai_client,
+                openai_api_key=openai_api_key,
+                options=node["data"],
+            )
+        return _log_node_result(agent, result)
+    except LLMUnavailableError:
+        # Sağlayıcıya ulaşılamıyorsa yürütme başarısız sayılır
+        NODE_ERRORS.labels(agent["name"]).inc()
+        raise
+    except Exception as e:
+        NODE_ERRORS.labels(agent["name"]).inc()
+        error_msg = f"Ajan işleminde hata: {str(e)}"
         logger.error(error_msg)
         return error_msg
 
-    logger.info(f"Ajan bulundu: {agent['name']} (ID: {agent['id']})")
 
-    # Ajanı çalıştır
-    try:
-        logger.info(f"Ajan işlemi başlatılıyor: {agent['name']}")
-        result = process_with_agent_fn(
-            agent=agent,
-            input_text=input_text,
-            agent_chain=agent_chain,
-            previous_agents=previous_agents,
-            openai_client=openai_client,
-            openai_api_key=openai_api_key,
-        )
+async def process_workflow_node_async(
+    node: Dict[str, Any],
+    input_text: str,
+    agent_chain: List[str],
+    previous_agents: List[Dict[str, Any]],
+    db: InMemoryStore,
+    openai_client: Any,
+    openai_api_key: str,
+    process_with_agent_fn: Callable[..., Awaitable[Union[str, AgentOutput]]],
+    plan: Optional[ExecutionPlan] = None,
+) -> Union[str, AgentOutput]:
+    """
+    Bir iş akışı düğümünü asenkron olarak işler.
 
-        # Sonuç kontrolü
-        if isinstance(result, dict) and "gpt_response" in result:
-            logger.info(f"Ajan işlemi başarılı: {agent['name']}, GPT yanıtı alındı")
-            return result
-        else:
-            logger.info(f"Ajan işlemi başarılı: {agent['name']}, metin yanıtı alındı")
-            return result
+    Args:
+        node: İşlenecek düğüm
+        input_text: Giriş metni
+        agent_chain: Ajanların zinciri
+        previous_agents: Önceki ajanlar
+        db: Veritabanı deposu (ajan koleksiyonu kimliğe göre erişim sağlar)
+        openai_client: AsyncOpenAI istemcisi
+        openai_api_key: OpenAI API anahtarı
+        process_with_agent_fn: Beklenebilir ajan işleme fonksiyonu
+        plan: Ajanları önceden çözülmüş yürütme planı (isteğe bağlı)
+
+    Returns:
+        İşlenmiş çıktı
+    """
+    agent = _start_workflow_node(node, agent_chain, db, plan)
+    if isinstance(agent, str):
+        return agent
+
+    try:
+        log_node_event(logger, "Ajan işlemi başlatılıyor: %s", agent["name"])
+        with metrics_agent(agent["name"]), NODE_SECONDS.labels(agent["name"]).time():
+            result = await process_with_agent_fn(
+                agent=agent,
+                input_text=input_text,
+                agent_chain=agent_chain,
+                previous_agents=previous_agents,
+                openai_client=openai_client,
+                openai_api_key=openai_api_key,
+                options=node["data"],
+            )
+        return _log_node_result(agent, result)
+    except asyncio.CancelledError:
+        raise
+    except LLMUnavailableError:
+        NODE_ERRORS.labels(agent["name"]).inc()
+        raise
     except Exception as e:
+        NODE_ERRORS.labels(agent["name"]).inc()
         error_msg = f"Ajan işleminde hata: {str(e)}"
         logger.error(error_msg)
         return error_msg
 
 
+def _failed_result(
+    workflow_id: str, agent_name: str, error_msg: str, execution_time: float = 0
+) -> Dict[str, Any]:
+    """Başarısız bir yürütme için sonuç sözlüğü oluşturur."""
+    return {
+        "workflow_id": workflow_id,
+        "results": [
+            {
+                "node_id": "error",
+                "agent_name": agent_name,
+                "output": error_msg,
+                "processed_text": "",
+            }
+        ],
+        "execution_time": execution_time,
+        "status": "failed",
+    }
+
+
+def _prepare_workflow_nodes(
+    workflow: Dict[str, Any],
+) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Düğümleri sıralar ve iş akışı yapısını doğrular.
+
+    Returns:
+        Sıralı düğümler listesi ya da hata durumunda başarısız sonuç sözlüğü
+    """
+    nodes = workflow.get("nodes", [])
+    edges = workflow.get("edges", [])
+
+    logger.info(
+        "İş akışı yürütülüyor: %s (ID: %s), düğüm: %d, kenar: %d",
+        workflow["name"],
+        workflow["id"],
+        len(nodes),
+        len(edges),
+    )
+
+    # Düğümleri kenar bağlantılarına göre sırala
+    sorted_nodes = sort_workflow_nodes(nodes, edges)
+    if not sorted_nodes:
+        error_msg = "İş akışında düğüm bulunamadı veya sıralama başarısız oldu"
+        logger.error(error_msg)
+        return _failed_result(workflow["id"], "Error", error_msg)
+
+    # İş akışı yapısını doğrula (START ile başlayıp END ile bitmeli)
+    validation_result = validate_workflow_structure(sorted_nodes)
+    if not validation_result["valid"]:
+        error_msg = validation_result["message"]
+        logger.error("İş akışı yapı doğrulama hatası: %s", error_msg)
+        return _failed_result(workflow["id"], "Yapı Hatası", error_msg)
+
+    # Düğümlerin sırasını loglayalım
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "İşlem sırası: %s",
+            " -> ".join(node["data"]["label"] for node in sorted_nodes),
+        )
+    return sorted_nodes
+
+
+def _record_node_result(
+    node: Dict[str, Any],
+    current_text: str,
+    result: Union[str, AgentOutput],
+    results: List[NodeResult],
+    input_from: Iterable[str] = (),
+) -> NodeResult:
+    """
+    Düğüm sonucunu sonuç listesine ekler.
+
+    Returns:
+        Eklenen sonuç; `text` alanı sonraki düğüme aktarılacak metindir
+    """
+    record = NodeResult(
+        node_id=node["id"],
+        agent_name=node["data"]["label"],
+        input_from=input_from,
+        input_text=current_text,
+        result=result,
+    )
+    results.append(record)
+
+    log_node_event(
+        logger,
+        "Düğüm işlendi, sonraki metne geçiliyor (%s): %s",
+        "GPT yanıtı" if isinstance(result, AgentOutput) else "metin yanıtı",
+        node["data"]["label"],
+    )
+    return record
+
+
 def execute_workflow_pipeline(
     workflow: Dict[str, Any],
     input_text: str,
-    db: Dict[str, List[Dict[str, Any]]],
+    db: InMemoryStore,
     openai_client: Any,
     openai_api_key: str,
     process_with_agent_fn: Callable,
+    verbose: bool = False,
 ) -> Dict[str, Any]:
     """
     İş akışını yürütür.
@@ -216,144 +410,381 @@ def execute_workflow_pipeline(
     Args:
         workflow: İş akışı
         input_text: Giriş metni
-        db: Veritabanı
+        db: Veritabanı deposu (ajan koleksiyonu kimliğe göre erişim sağlar)
         openai_client: OpenAI istemcisi
         openai_api_key: OpenAI API anahtarı
         process_with_agent_fn: Ajan işleme fonksiyonu
+        verbose: Sonuçları ayrıntılı rapor biçiminde döndür (bkz. `NodeResult`)
 
     Returns:
         İş akışı sonuçları
     """
-    start_time = time.time()
+    start_time = time.perf_counter()
     results = []
-    nodes = workflow.get("nodes", [])
-    edges = workflow.get("edges", [])
-
-    logger.info(f"İş akışı yürütülüyor: {workflow['name']} (ID: {workflow['id']})")
-    logger.info(f"Düğüm sayısı: {len(nodes)}, Kenar sayısı: {len(edges)}")
 
     try:
-        # Düğümleri kenar bağlantılarına göre sırala
-        sorted_nodes = sort_workflow_nodes(nodes, edges)
-        if not sorted_nodes:
-            error_msg = "İş akışında düğüm bulunamadı veya sıralama başarısız oldu"
-            logger.error(error_msg)
-            return {
-                "workflow_id": workflow["id"],
-                "results": [
-                    {
-                        "node_id": "error",
-                        "agent_name": "Error",
-                        "output": error_msg,
-                        "processed_text": "",
-                    }
-                ],
-                "execution_time": 0,
-                "status": "failed",
-            }
-
-        # İş akışı yapısını doğrula (START ile başlayıp END ile bitmeli)
-        validation_result = validate_workflow_structure(sorted_nodes)
-        if not validation_result["valid"]:
-            error_msg = validation_result["message"]
-            logger.error(f"İş akışı yapı doğrulama hatası: {error_msg}")
-            return {
-                "workflow_id": workflow["id"],
-                "results": [
-                    {
-                        "node_id": "error",
-                        "agent_name": "Yapı Hatası",
-                        "output": error_msg,
-                        "processed_text": "",
-                    }
-                ],
-                "execution_time": 0,
-                "status": "failed",
-            }
-
-        # Düğümlerin sırasını loglayalım
-        node_sequence = " -> ".join([node["data"]["label"] for node in sorted_nodes])
-        logger.info(f"İşlem sırası: {node_sequence}")
+        sorted_nodes = _prepare_workflow_nodes(workflow)
+        if isinstance(sorted_nodes, dict):
+            return _observe_run(sorted_nodes)
 
         # Her düğümü sırayla işle
         current_text = input_text
         agent_chain = []
         previous_agents = []
 
-        # İşlenecek toplam düğüm sayısını loglama
-        logger.info(f"Toplam işlenecek düğüm sayısı: {len(sorted_nodes)}")
+        # Düğüm ayrıntı logları yürütme başına örneklenir
+        with sample_node_logs():
+            for i, node in enumerate(sorted_nodes):
+                log_node_event(
+                    logger,
+                    "Düğüm işleniyor (%d/%d): %s",
+                    i + 1,
+                    len(sorted_nodes),
+                    node["data"]["label"],
+                )
+
+                # Düğümü işle
+                node_start = time.perf_counter()
+                result = process_workflow_node(
+                    node=node,
+                    input_text=current_text,
+                    agent_chain=agent_chain,
+                    previous_agents=previous_agents,
+                    db=db,
+                    openai_client=openai_client,
+                    openai_api_key=openai_api_key,
+                    process_with_agent_fn=process_with_agent_fn,
+                )
+                input_from = [sorted_nodes[i - 1]["id"]] if i else []
+                record = _record_node_result(
+                    node, current_text, result, results, input_from
+                )
+                record.execution_time = time.perf_counter() - node_start
+                current_text = record.text
+
+        execution_time = time.perf_counter() - start_time
+
+        logger.info(
+            "İş akışı tamamlandı: %s, Süre: %.2f saniye",
+            workflow["name"],
+            execution_time,
+        )
+
+        return _observe_run(
+            {
+                "workflow_id": workflow["id"],
+                "results": [record.to_dict(verbose) for record in results],
+                "execution_time": execution_time,
+                "status": "success",
+            }
+        )
+
+    except Exception as e:
+        execution_time = time.perf_counter() - start_time
+
+        error_msg = f"İş akışı yürütme hatası: {str(e)}"
+        logger.error(error_msg)
+        return _observe_run(
+            _failed_result(workflow["id"], "Error", error_msg, execution_time)
+        )
+
+
+def _observe_run(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Yürütme sonucunun durumunu ve süresini ölçümlere kaydeder."""
+    status = result["status"]
+    WORKFLOW_RUNS.labels(status).inc()
+    WORKFLOW_RUN_SECONDS.labels(status).observe(result["execution_time"])
+    return result
+
+
+def _prepare_workflow_plan(
+    workflow: Dict[str, Any],
+    db: InMemoryStore,
+    plan: Optional[ExecutionPlan] = None,
+) -> Union[ExecutionPlan, Dict[str, Any]]:
+    """
+    Yürütme planını hazırlar; plan verilmemişse iş akışını derler.
+
+    Returns:
+        Geçerli yürütme planı ya da hata durumunda başarısız sonuç sözlüğü
+    """
+    logger.info("İş akışı yürütülüyor: %s (ID: %s)", workflow["name"], workflow["id"])
+
+    if plan is None:
+        plan = compile_execution_plan(
+            workflow, lambda agent_id: _find_agent(db, agent_id)
+        )
+
+    if not plan.valid:
+        error_msg = plan.validation["message"]
+        logger.error("İş akışı yapı doğrulama hatası: %s", error_msg)
+        agent_name = "Yapı Hatası" if plan.graph.nodes else "Error"
+        return _failed_result(workflow["id"], agent_name, error_msg)
+
+    return plan
 
-        for i, node in enumerate(sorted_nodes):
-            logger.info(
-                f"Düğüm işleniyor ({i+1}/{len(sorted_nodes)}): {node['data']['label']}"
+
+def _node_output_text(result: Union[str, AgentOutput]) -> str:
+    """Düğüm sonucundan sonraki düğümlere aktarılacak metni çıkarır."""
+    if isinstance(result, AgentOutput):
+        return result.text
+    return result
+
+
+def _selected_successors(result: Union[str, AgentOutput]) -> Optional[List[str]]:
+    """Yönlendirici düğümünün seçtiği ardılları döndürür; diğer düğümler için None."""
+    if isinstance(result, AgentOutput):
+        return selected_targets(result.info)
+    return None
+
+
+def _branch_report(graph: WorkflowPlan, states: WorkflowRun) -> List[Dict[str, Any]]:
+    """
+    Yönlendirici düğümlerinin dal bazında raporunu oluşturur.
+
+    Bir dalın düğümleri, yönlendiricinin o ardılından ulaşılabilen ve diğer
+    ardıllarından ulaşılamayan düğümlerdir (dalların birleştiği düğümler hiçbir
+    dala sayılmaz). Dal süresi, dalda çalışan ilk düğümün başlangıcından son
+    düğümün bitişine kadar geçen süredir.
+    """
+    report = []
+    for node_id in graph.order:
+        state = states.get(node_id)
+        if state is None or not isinstance(state.result, AgentOutput):
+            continue
+        route = (state.result.info or {}).get("route")
+        if route is None:
+            continue
+
+        successors = graph.successors[node_id]
+        reach = {target: reachable_from(graph, target) for target in successors}
+        branches = []
+        for target in successors:
+            shared = set()
+            for other in successors:
+                if other != target:
+                    shared |= reach[other]
+            nodes = [n for n in graph.order if n in reach[target] and n not in shared]
+            executed = [states[n] for n in nodes if n in states]
+            branches.append(
+                {
+                    "target": target,
+                    "selected": target in route["selected"],
+                    "nodes": nodes,
+                    "execution_time": (
+                        max(s.finished_at for s in executed)
+                        - min(s.started_at for s in executed)
+                        if executed
+                        else 0.0
+                    ),
+                }
             )
+        report.append(
+            {
+                "router_node_id": node_id,
+                "rule": route["rule"],
+                "reason": route["reason"],
+                "branches": branches,
+            }
+        )
+    return report
+
+
+def _total_usage(node_usage: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+    """Düğümlerin LLM kullanımını (bağlam özetleri dahil) toplar."""
+    totals = {
+        "calls": 0,
+        "cached_calls": 0,
+        "coalesced_calls": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "total_tokens": 0,
+    }
+    for usage in node_usage:
+        for source in (usage, usage.get("context", {}).get("usage", {})):
+            for field in totals:
+                totals[field] += source.get(field, 0)
+    return totals
+
+
+async def _run_node_with_events(
+    node: Dict[str, Any],
+    node_input: str,
+    agent_chain: List[str],
+    previous_agents: List[Dict[str, Any]],
+    process_node: Callable[..., Awaitable[Union[str, AgentOutput]]],
+    on_event: Callable[[str, Dict[str, Any]], None],
+    usage: Optional[UsageRecorder] = None,
+) -> Union[str, AgentOutput]:
+    """Düğümü çalıştırır; başlangıç, token ve bitiş olaylarını yayar."""
+    node_id = node["id"]
+    agent_name = node["data"]["label"]
+    on_event("node_started", {"node_id": node_id, "agent_name": agent_name})
+
+    def on_token(delta: str) -> None:
+        on_event("token", {"node_id": node_id, "delta": delta})
+
+    start_time = time.perf_counter()
+    # Her düğüm kendi görevinde çalışır; akış hedefi yalnızca bu düğüme uygulanır
+    with stream_llm_tokens(on_token):
+        result = await process_node(node, node_input, agent_chain, previous_agents)
+
+    on_event(
+        "node_finished",
+        {
+            "node_id": node_id,
+            "agent_name": agent_name,
+            "execution_time": time.perf_counter() - start_time,
+            "output": _node_output_text(result),
+            "usage": usage.as_dict() if usage is not None else None,
+        },
+    )
+    return result
+
 
-            # Düğümü işle
-            result = process_workflow_node(
+async def execute_workflow_pipeline_async(
+    workflow: Dict[str, Any],
+    input_text: str,
+    db: InMemoryStore,
+    openai_client: Any,
+    openai_api_key: str,
+    process_with_agent_fn: Callable[..., Awaitable[Union[str, AgentOutput]]],
+    max_concurrency: Optional[int] = None,
+    plan: Optional[ExecutionPlan] = None,
+    on_event: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    context_budget: Optional[ContextBudget] = None,
+    verbose: bool = False,
+) -> Dict[str, Any]:
+    """
+    İş akışını asenkron olarak yürütür.
+
+    Düğümler kenar listesinden kurulan bağımlılık grafiğine göre zamanlanır:
+    öncülleri biten her düğüm hemen başlar, bağımsız dallar paralel çalışır ve
+    birden fazla ebeveyni olan düğümler ebeveyn çıktılarının birleşimini alır.
+    LLM çağrıları beklenirken olay döngüsü serbest kalır; böylece tek bir
+    uvicorn işçisi aynı anda çok sayıda iş akışını yürütebilir.
+
+    Args:
+        workflow: İş akışı
+        input_text: Giriş metni
+        db: Veritabanı deposu (ajan koleksiyonu kimliğe göre erişim sağlar)
+        openai_client: AsyncOpenAI istemcisi
+        openai_api_key: OpenAI API anahtarı
+        process_with_agent_fn: Beklenebilir ajan işleme fonksiyonu
+        max_concurrency: Bu yürütmede aynı anda çalışabilecek en fazla düğüm
+        plan: Önceden derlenmiş yürütme planı; verilirse sıralama, doğrulama
+            ve ajan arama adımları atlanır
+        on_event: Verilirse düğüm olayları (`node_started`, `token`,
+            `node_finished`) yürütme sırasında bu fonksiyona gönderilir
+        context_budget: Düğümler arasında aktarılan metnin token bütçesi;
+            verilmezse ortam değişkenlerinden okunur
+        verbose: Sonuçları ayrıntılı rapor biçiminde döndür (bkz. `NodeResult`)
+
+    Returns:
+        İş akışı sonuçları (düğüm ve yürütme bazında token kullanımıyla)
+    """
+    start_time = time.perf_counter()
+
+    try:
+        plan = _prepare_workflow_plan(workflow, db, plan)
+        if isinstance(plan, dict):
+            return _observe_run(plan)
+
+        async def process_node(node, node_input, agent_chain, previous_agents):
+            return await process_workflow_node_async(
                 node=node,
-                input_text=current_text,
+                input_text=node_input,
                 agent_chain=agent_chain,
                 previous_agents=previous_agents,
                 db=db,
                 openai_client=openai_client,
                 openai_api_key=openai_api_key,
                 process_with_agent_fn=process_with_agent_fn,
+                plan=plan,
             )
 
-            # Sonuç girişi oluştur
-            result_entry = {
-                "node_id": node["id"],
-                "agent_name": node["data"]["label"],
-                "processed_text": current_text,
-            }
+        budget = context_budget or ContextBudget.from_env()
+        node_usage: Dict[str, Dict[str, Any]] = {}
+
+        async def prepare_input(node, node_input):
+            with record_llm_usage() as usage:
+                node_input, report = await budget.apply(node_input, openai_client)
+            if usage.calls:
+                report["usage"] = usage.as_dict()
+            node_usage[node["id"]] = {"context": report}
+            return node_input
+
+        async def run_node(node, node_input, agent_chain, previous_agents):
+            with record_llm_usage() as usage:
+                if on_event is None:
+                    result = await process_node(
+                        node, node_input, agent_chain, previous_agents
+                    )
+                else:
+                    result = await _run_node_with_events(
+                        node,
+                        node_input,
+                        agent_chain,
+                        previous_agents,
+                        process_node,
+                        on_event,
+                        usage,
+                    )
+            entry = node_usage.setdefault(node["id"], {})
+            entry.update(usage.as_dict(), input_tokens=estimate_tokens(node_input))
+            return result
 
-            # Sonraki adıma geçmek için çıktı metnini güncelle
-            if isinstance(result, dict) and "gpt_response" in result:
-                current_text = result["gpt_response"]
-                result_entry["output"] = result["output_text"]
-                results.append(result_entry)
-                logger.info(
-                    f"Düğüm işlendi, sonraki metne geçiliyor (GPT yanıtı): {node['data']['label']}"
-                )
-            else:
-                current_text = result
-                result_entry["output"] = result
-                results.append(result_entry)
-                logger.info(
-                    f"Düğüm işlendi, sonraki metne geçiliyor (metin yanıtı): {node['data']['label']}"
-                )
+        # Düğüm ayrıntı logları yürütme başına örneklenir
+        with sample_node_logs():
+            states = await run_workflow_plan(
+                plan.graph,
+                input_text,
+                run_node,
+                _node_output_text,
+                max_concurrency=max_concurrency,
+                prepare_input=prepare_input,
+                select_successors=_selected_successors,
+            )
+
+        # Sonuçları topolojik sırada oluştur (atlanan düğümler hariç)
+        results = []
+        for node in plan.graph.nodes:
+            state = states.get(node["id"])
+            if state is None:
+                continue
+            record = _record_node_result(
+                node, state.input_text, state.result, results, state.parents
+            )
+            record.usage = node_usage.get(node["id"])
+            record.execution_time = state.execution_time
 
-        end_time = time.time()
-        execution_time = end_time - start_time
+        execution_time = time.perf_counter() - start_time
 
         logger.info(
-            f"İş akışı tamamlandı: {workflow['name']}, Süre: {execution_time:.2f} saniye"
+            "İş akışı tamamlandı: %s, Süre: %.2f saniye",
+            workflow["name"],
+            execution_time,
         )
 
-        return {
-            "workflow_id": workflow["id"],
-            "results": results,
-            "execution_time": execution_time,
-            "status": "success",
-        }
+        return _observe_run(
+            {
+                "workflow_id": workflow["id"],
+                "results": [record.to_dict(verbose) for record in results],
+                "execution_time": execution_time,
+                "status": "success",
+                "usage": _total_usage(node_usage.values()),
+                "skipped_nodes": states.skipped,
+                "branches": _branch_report(plan.graph, states),
+            }
+        )
 
+    except asyncio.CancelledError:
+        raise
     except Exception as e:
-        end_time = time.time()
-        execution_time = end_time - start_time
+        execution_time = time.perf_counter() - start_time
 
         error_msg = f"İş akışı yürütme hatası: {str(e)}"
         logger.error(error_msg)
-
-        return {
-            "workflow_id": workflow["id"],
-            "results": [
-                {
-                    "node_id": "error",
-                    "agent_name": "Error",
-                    "output": error_msg,
-                    "processed_text": "",
-                }
-            ],
-            "execution_time": execution_time,
-            "status": "failed",
-        }
+        return _observe_run(
+            _failed_result(workflow["id"], "Error", error_msg, execution_time)
+        )
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from src.ratelimit import CircuitBreaker, CircuitOpenError, LLMScheduler
+
+REQUEST = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "a"}]}
+
+
+def _half_open_scheduler(monkeypatch) -> LLMScheduler:
+    monkeypatch.setenv("LLM_BREAKER_THRESHOLD", "1")
+    monkeypatch.setenv("LLM_BREAKER_RESET", "0")
+    scheduler = LLMScheduler()
+    breaker = scheduler._lane("key", REQUEST["model"]).breaker
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    return scheduler
+
+
+def test_cancelled_probe_releases_half_open_breaker(monkeypatch):
+    scheduler = _half_open_scheduler(monkeypatch)
+    breaker = scheduler._lane("key", REQUEST["model"]).breaker
+
+    async def scenario():
+        started = asyncio.Event()
+
+        async def hang():
+            started.set()
+            await asyncio.Event().wait()
+
+        probe = asyncio.create_task(scheduler.acall("key", REQUEST, hang))
+        await started.wait()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            await scheduler.acall("key", REQUEST, hang)
+
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        async def ok():
+            return "ok"
+
+        return await scheduler.acall("key", REQUEST, ok)
+
+    assert asyncio.run(scenario()) == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_interrupted_sync_probe_releases_half_open_breaker(monkeypatch):
+    scheduler = _half_open_scheduler(monkeypatch)
+    breaker = scheduler._lane("key", REQUEST["model"]).breaker
+
+    def interrupt():
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        scheduler.call("key", REQUEST, interrupt)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
@@ -1,7 +1,7 @@
 import React, { useState } from 'react'
 import { X, Play, Clock, CheckCircle, XCircle, FileText } from 'lucide-react'
 import { Button } from '@/components/ui/button'
-import type { WorkflowExecutionResult } from '@/types/workflow'
+import type { WorkflowExecutionResult, WorkflowNodeResult } from '@/types/workflow'
 
 interface WorkflowExecutionModalProps {
   isOpen: boolean
@@ -72,6 +72,19 @@ function formatAgentOutput(output: any): React.ReactNode {
   return <span>{String(output)}</span>
 }
 
+// Resolve a step's input text: verbose results carry it, lean results
+// point at the parent steps whose outputs were passed in
+function stepInputText(
+  result: WorkflowNodeResult,
+  outputs: Map<string, string>
+): string | undefined {
+  if (result.processed_text) return result.processed_text
+  const inputs = (result.input_from ?? [])
+    .map(nodeId => outputs.get(nodeId))
+    .filter((text): text is string => Boolean(text))
+  return inputs.length > 0 ? inputs.join('\n\n') : undefined
+}
+
 export const WorkflowExecutionModal = ({
   isOpen,
   onClose,
@@ -94,6 +107,10 @@ export const WorkflowExecutionModal = ({
     onClose()
   }
 
+  const stepOutputs = new Map(
+    (executionResult?.results ?? []).map(result => [result.node_id, result.output])
+  )
+
   const formatExecutionTime = (seconds: number) => {
     return `${seconds.toFixed(2)}s`
   }
@@ -223,36 +240,39 @@ export const WorkflowExecutionModal = ({
               {/* Step Results */}
               <div className="space-y-4 max-h-96 overflow-y-auto">
                 <h4 className="font-semibold text-gray-900">Step Results:</h4>
-                {executionResult.results.map((result, index) => (
-                  <div key={result.node_id} className="border rounded-lg p-4 bg-gray-50">
-                    <div className="flex items-center gap-2 mb-2">
-                      <div className="w-6 h-6 bg-blue-500 text-white rounded-full flex items-center justify-center text-sm font-medium">
-                        {index + 1}
+                {executionResult.results.map((result, index) => {
+                  const processedText = stepInputText(result, stepOutputs)
+                  return (
+                    <div key={result.node_id} className="border rounded-lg p-4 bg-gray-50">
+                      <div className="flex items-center gap-2 mb-2">
+                        <div className="w-6 h-6 bg-blue-500 text-white rounded-full flex items-center justify-center text-sm font-medium">
+                          {index + 1}
+                        </div>
+                        <h4 className="font-medium text-gray-900">
+                          Step {index + 1}: {result.agent_name}
+                        </h4>
                       </div>
-                      <h4 className="font-medium text-gray-900">
-                        Step {index + 1}: {result.agent_name}
-                      </h4>
-                    </div>
                     
-                    <div className="space-y-3">
-                      {result.processed_text && (
-                        <div>
-                          <span className="text-sm font-medium text-gray-600">Input Text:</span>
-                          <p className="text-sm text-gray-800 mt-1 p-3 bg-white rounded border">
-                            {result.processed_text}
-                          </p>
-                        </div>
-                      )}
+                      <div className="space-y-3">
+                        {processedText && (
+                          <div>
+                            <span className="text-sm font-medium text-gray-600">Input Text:</span>
+                            <p className="text-sm text-gray-800 mt-1 p-3 bg-white rounded border">
+                              {processedText}
+                            </p>
+                          </div>
+                        )}
                       
-                      <div>
-                        <span className="text-sm font-medium text-gray-600">Agent Output:</span>
-                        <div className="text-sm text-gray-800 mt-1 p-3 bg-white rounded border">
-                          {formatAgentOutput(result.output)}
+                        <div>
+                          <span className="text-sm font-medium text-gray-600">Agent Output:</span>
+                          <div className="text-sm text-gray-800 mt-1 p-3 bg-white rounded border">
+                            {formatAgentOutput(result.output)}
+                          </div>
                         </div>
                       </div>
                     </div>
-                  </div>
-                ))}
+                  )
+                })}
               </div>
 
               {/* Actions */}
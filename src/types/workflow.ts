@@ -28,13 +28,17 @@ export interface WorkflowExecutionResult {
   results: WorkflowNodeResult[]
   execution_time: number
   status: 'success' | 'failed'
+  // Nodes on branches a ROUTER node did not select
+  skipped_nodes?: string[]
 }
 
 export interface WorkflowNodeResult {
   node_id: string
   agent_name: string
   output: string
-  processed_text: string
+  // Only present in verbose results; lean results refer to inputs by node id
+  processed_text?: string
+  input_from?: string[]
 }
 
 // For API calls to agent-workflow backend